@@ -0,0 +1,143 @@
+"""
+This calculates gravity with a Barnes-Hut octree, which groups far away bodies together and treats them as a single mass at their centre of mass.
+It takes O(N log N) time instead of the O(N^2) of the all-pairs calculation in gravity.py, at the cost of some accuracy.
+The opening angle theta controls the trade-off: a group of bodies is only treated as one mass if its size divided by its distance is less than theta.
+"""
+
+from __future__ import division #does fun stuff
+import numpy as np
+
+import constants as c #gives useful physics constants
+import gravity #exact all-pairs gravity, used to measure the error
+
+#a cube of space and the bodies inside of it
+class Node(object):
+	#constructor
+	"""
+	center is the centre of the cube
+	halfSize is half of the length of a side of the cube
+	indices are the indices of the bodies inside of the cube
+	pos and mass are the positions and masses of all of the bodies
+	leafSize is the largest number of bodies that a node will hold without being split up
+	depth is how many times the space has been split up to get to this node
+	"""
+	def __init__(self, center, halfSize, indices, pos, mass, leafSize, depth=0):
+		self.center = center
+		self.halfSize = halfSize
+		self.mass = mass[indices].sum()
+		if self.mass > 0:
+			self.com = np.dot(mass[indices], pos[indices])/self.mass
+		else:
+			self.com = pos[indices].mean(axis=0)
+		self.children = list()
+		self.indices = None
+		#bodies at the same point can never be split up, so the depth is limited
+		if len(indices) <= leafSize or depth >= Octree.maxDepth:
+			self.indices = indices
+			return
+
+		#sorts the bodies into the eight octants of the cube
+		octant = np.dot(pos[indices] > center, (1, 2, 4))
+		for o in range(0, 8):
+			sub = indices[octant == o]
+			if len(sub) > 0:
+				offset = np.array([1 if o & bit else -1 for bit in (1, 2, 4)])*halfSize/2
+				self.children.append(Node(center + offset, halfSize/2, sub, pos, mass, leafSize, depth + 1))
+
+	#true if the position is inside of the cube
+	def contains(self, pos):
+		return np.all(np.abs(pos - self.center) <= self.halfSize, axis=1)
+
+#an octree built over a set of bodies
+class Octree(object):
+	maxDepth = 32
+
+	#constructor
+	"""
+	pos is an (N, 3) array of positions
+	mass is an array of the N masses
+	leafSize is the largest number of bodies that are summed directly instead of being split up
+	"""
+	def __init__(self, pos, mass, leafSize=8):
+		self.pos = np.asarray(pos, dtype=float)
+		self.mass = np.asarray(mass, dtype=float)
+		lo = self.pos.min(axis=0)
+		hi = self.pos.max(axis=0)
+		halfSize = max(np.max(hi - lo)/2, 1.0)*(1 + 1e-9)
+		self.root = Node((lo + hi)/2, halfSize, np.arange(len(self.pos)), self.pos, self.mass, leafSize)
+
+	#returns the acceleration of every body due to the gravity of all of the others
+	"""
+	at is an optional (M, 3) array of other points to find the acceleration at, eg of test particles that aren't in the tree
+	potential also returns the gravitational potential at every point, the same way as gravity.accelerations
+	"""
+	def accelerations(self, theta=0.5, softening=0, G=c.gravitationalConstant, at=None, potential=False):
+		if at is None:
+			at = self.pos
+		acc = np.zeros(at.shape)
+		phi = np.zeros(len(at)) if potential else None
+		self.walk(self.root, np.arange(len(at)), at, acc, theta, softening, G, phi)
+		if potential:
+			return acc, phi
+		return acc
+
+	#adds the pull of everything in node onto the targets at positions at[targets], opening up the node wherever it is too close to treat as a single mass
+	"""
+	phi is an array that the potential is added to, or None to skip it
+	"""
+	def walk(self, node, targets, at, acc, theta, softening, G, phi=None):
+		if node.indices is not None:
+			#few enough bodies to add up directly
+			sep = self.pos[node.indices][np.newaxis, :, :] - at[targets][:, np.newaxis, :]
+			dist2 = np.einsum('ijk,ijk->ij', sep, sep) + softening**2
+			with np.errstate(divide='ignore'):
+				invDist3 = np.where(dist2 > 0, dist2**-1.5, 0)
+			acc[targets] += G*np.einsum('ij,ijk->ik', invDist3*self.mass[node.indices][np.newaxis, :], sep)
+			if phi is not None:
+				phi[targets] -= G*np.dot(invDist3*dist2, self.mass[node.indices])
+			return
+
+		sep = node.com - at[targets]
+		dist2 = np.einsum('ij,ij->i', sep, sep) + softening**2
+		#a node is far enough away if it looks smaller than theta; targets inside of the node always open it
+		far = ((2*node.halfSize)**2 < theta**2*dist2) & ~node.contains(at[targets])
+		if np.any(far):
+			acc[targets[far]] += G*node.mass*sep[far]*(dist2[far]**-1.5)[:, np.newaxis]
+			if phi is not None:
+				phi[targets[far]] -= G*node.mass*dist2[far]**-0.5
+		near = targets[~far]
+		if len(near) > 0:
+			for child in node.children:
+				self.walk(child, near, at, acc, theta, softening, G, phi)
+
+#returns the acceleration of every body using a Barnes-Hut octree
+"""
+sources is an optional array of indices of the bodies that are put in the tree; the rest are test particles, which feel gravity but don't pull on anything
+potential also returns the gravitational potential at every body, as in gravity.accelerations
+"""
+def accelerations(pos, mass, theta=0.5, softening=0, G=c.gravitationalConstant, leafSize=8, sources=None, potential=False):
+	pos = np.asarray(pos, dtype=float)
+	if len(pos) == 0 or (sources is not None and len(sources) == 0):
+		if potential:
+			return np.zeros((len(pos), 3)), np.zeros(len(pos))
+		return np.zeros((len(pos), 3))
+	if sources is None:
+		return Octree(pos, mass, leafSize).accelerations(theta, softening, G, potential=potential)
+	return Octree(pos[sources], np.asarray(mass)[sources], leafSize).accelerations(theta, softening, G, at=pos, potential=potential)
+
+#compares the tree accelerations against the exact all-pairs sum
+"""
+sample is the number of bodies to check; the exact sum is only calculated for them so that this stays cheap for thousands of bodies
+returns a dictionary with the largest and average relative error, and the accelerations from the tree
+"""
+def errorReport(pos, mass, theta=0.5, softening=0, G=c.gravitationalConstant, sample=256):
+	pos = np.asarray(pos, dtype=float)
+	acc = accelerations(pos, mass, theta, softening, G)
+	targets = np.arange(len(pos))
+	if sample is not None and sample < len(pos):
+		targets = np.random.RandomState(0).choice(len(pos), sample, replace=False)
+	exact = gravity.accelerations(pos, mass, softening, G, targets=targets)
+	error = np.sqrt(np.sum((acc[targets] - exact)**2, axis=1))
+	size = np.sqrt(np.sum(exact**2, axis=1))
+	relError = error/np.where(size > 0, size, 1)
+	return {"theta": theta, "maxError": np.max(relError), "meanError": np.mean(relError), "accelerations": acc}
@@ -0,0 +1,181 @@
+"""
+This measures how fast the physics runs as the number of bodies grows, so that changes to it can be compared between versions.
+Every scenario is a cloud of bodies in a box; it is stepped with Engine.step for a while, and the time taken by each phase of a step is read from the engine's PhaseTimer:
+	collide is finding and resolving collisions (Engine.collide)
+	gravity is adding up the gravitational forces, inside integrate
+	integrate is moving the bodies, not counting gravity (Engine.integrate)
+	sweep is checking the paths of fast bodies for collisions that happened between steps (Engine.sweep)
+	coast, debris, droppedForce, treeError and conservation are the other phases of Engine.step, which only take time when they are turned on
+	trails is adding the new position of every body to its trail (Trail.add), which is done after each step
+Scenarios are every combination of the number of bodies, how crowded they are (sparse or dense), whether every collision is elastic or half of the bodies stick together (mixed), and whether trails are kept.
+The results are written as json, eg
+	python benchmark.py --bodies 10 100 1000 --output before.json
+	python benchmark.py --bodies 10 100 1000 --output after.json --compare before.json
+Nothing here imports VPython or wx.
+"""
+
+from __future__ import division #does fun stuff
+import argparse
+import csv
+import itertools
+import json
+import platform
+import time
+import numpy as np
+
+import engine #the physics, without any graphics
+import integrators #moves the bodies forward in time
+import trails #trails of the bodies
+
+bodyCounts = [10, 100, 1000, 10000]
+densities = {"sparse": 1e-6, "dense": 0.05} #fraction of the box taken up by bodies
+collisionMixes = ["elastic", "mixed"]
+phases = ["collide", "gravity", "integrate", "sweep", "coast", "debris", "droppedForce", "treeError", "conservation", "trails"]
+
+boxSize = 1e9 #side of the box the bodies start in, m
+bodyMass = 1e18 #kg; small enough that the cloud doesn't collapse while it is measured
+bodySpeed = 1e3 #largest starting speed, m/s
+
+#returns an Engine holding a random cloud of bodies
+"""
+bodies is the number of bodies
+density is the fraction of the box taken up by bodies; the radius of the bodies is picked to give it
+mix is "elastic" for only elastic collisions, or "mixed" for every other body being inelastic
+"""
+def makeScenario(bodies, density, mix, seed=0, treeGravity=False):
+	generator = np.random.RandomState(seed)
+	sim = engine.Engine(integrator=integrators.Leapfrog(), treeGravity=treeGravity)
+	sim.random.seed(seed)
+	radius = (3*density*boxSize**3/(4*np.pi*bodies))**(1/3)
+	positions = generator.uniform(0, boxSize, (bodies, 3))
+	velocities = generator.uniform(-bodySpeed, bodySpeed, (bodies, 3))
+	sim.bodies.reserve(bodies)
+	for k in range(0, bodies):
+		collisionType = "inelastic" if mix == "mixed" and k % 2 else "elastic"
+		sim.bodies.add(positions[k], velocities[k], bodyMass, radius, collisionType, "asteroid")
+	return sim
+
+#runs one scenario and returns a row of results
+"""
+minTime is the least number of real seconds to step for, and minSteps and maxSteps are the least and most steps to take
+dt is the step size, in simulated seconds
+"""
+def runScenario(bodies, density, mix, trailsOn, minTime=1., minSteps=3, maxSteps=1000, dt=60., seed=0, treeGravity=False):
+	sim = makeScenario(bodies, densities[density], mix, seed, treeGravity)
+	b = sim.bodies
+	timer = sim.timer
+	timer.interval = float("inf") #one sample for the whole run
+	timer.setEnabled(True)
+	bodyTrails = [trails.Trail() for k in range(0, b.count)] if trailsOn else None
+	startCollisions = sim.collisionCount
+
+	steps = 0
+	start = time.time()
+	while steps < minSteps or (steps < maxSteps and time.time() - start < minTime):
+		sim.step(dt)
+		if bodyTrails is not None:
+			for slot in b.active():
+				bodyTrails[slot].add(b.pos[slot])
+			timer.lap("trails") #laps carry on from the last phase of the step
+		steps += 1
+	wallTime = time.time() - start
+	timer.sample()
+	sample = timer.latest()
+
+	row = {
+		"bodies": bodies,
+		"density": density,
+		"collisions": mix,
+		"trails": trailsOn,
+		"tree": treeGravity,
+		"steps": steps,
+		"wallTime": wallTime,
+		"stepsPerSecond": steps/wallTime,
+		"collisionsResolved": sim.collisionCount - startCollisions,
+		"finalBodies": len(b),
+	}
+	for phase in phases:
+		row[phase + "PerStep"] = sample.get(phase + "Ms", 0.)/1000
+	return row
+
+#runs every combination of the given settings and returns the rows of results
+def runSuite(bodyList=bodyCounts, densityList=sorted(densities), mixList=collisionMixes, trailList=(False, True), report=None, **options):
+	rows = list()
+	for bodies, density, mix, trailsOn in itertools.product(bodyList, densityList, mixList, trailList):
+		row = runScenario(bodies, density, mix, trailsOn, **options)
+		rows.append(row)
+		if report is not None:
+			report(row)
+	return rows
+
+#returns the name of a scenario, used to match up rows from different runs
+def scenarioKey(row):
+	return "%i %s %s trails=%s tree=%s" % (row["bodies"], row["density"], row["collisions"], row["trails"], row["tree"])
+
+#returns a line describing a row of results
+def describe(row):
+	perPhase = ", ".join("%s %.3g ms" % (phase, 1000*row[phase + "PerStep"]) for phase in phases if row.get(phase + "PerStep", 0) > 0)
+	return "%s: %.1f steps/s (%s)" % (scenarioKey(row), row["stepsPerSecond"], perPhase)
+
+#returns information about the computer and versions the benchmark was run with
+def environment():
+	return {
+		"python": platform.python_version(),
+		"numpy": np.__version__,
+		"machine": platform.machine(),
+		"processor": platform.processor(),
+		"system": platform.system(),
+		"time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+	}
+
+#writes the results as json, or as csv if path ends in .csv
+def writeResults(rows, path):
+	if path.endswith(".csv"):
+		with open(path, "w") as f:
+			writer = csv.DictWriter(f, fieldnames=sorted(rows[0]))
+			writer.writeheader()
+			for row in rows:
+				writer.writerow(row)
+	else:
+		with open(path, "w") as f:
+			json.dump({"environment": environment(), "results": rows}, f, indent=1, sort_keys=True)
+
+#returns lines comparing the speed of rows with the rows of an earlier run read from baselinePath
+def compare(rows, baselinePath):
+	with open(baselinePath) as f:
+		baseline = dict((scenarioKey(row), row) for row in json.load(f)["results"])
+	lines = list()
+	for row in rows:
+		old = baseline.get(scenarioKey(row))
+		if old is not None:
+			lines.append("%s: %.2fx the steps/s of %s" % (scenarioKey(row), row["stepsPerSecond"]/old["stepsPerSecond"], baselinePath))
+	return lines
+
+#runs the benchmark from the command line
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Measures the steps per second and time per phase of the physics as the number of bodies grows")
+	parser.add_argument("--bodies", type=int, nargs="+", default=bodyCounts)
+	parser.add_argument("--density", nargs="+", choices=sorted(densities), default=sorted(densities))
+	parser.add_argument("--collisions", nargs="+", choices=collisionMixes, default=collisionMixes, help="elastic for only elastic collisions, mixed for half of the bodies sticking together")
+	parser.add_argument("--trails", nargs="+", choices=["off", "on"], default=["off", "on"])
+	parser.add_argument("--min-time", type=float, default=1., help="least number of real seconds to run each scenario for")
+	parser.add_argument("--max-steps", type=int, default=1000, help="most steps to run each scenario for")
+	parser.add_argument("--dt", type=float, default=60., help="step size, in seconds")
+	parser.add_argument("--tree", action="store_true", help="use Barnes-Hut gravity")
+	parser.add_argument("--seed", type=int, default=0)
+	parser.add_argument("--output", default="benchmark.json", help="file to write the results to; json, or csv if it ends in .csv")
+	parser.add_argument("--compare", default=None, help="json results of an earlier run to compare the speed with")
+	args = parser.parse_args(argv)
+
+	def report(row):
+		print(describe(row))
+	rows = runSuite(args.bodies, args.density, args.collisions, [t == "on" for t in args.trails], report=report,
+		minTime=args.min_time, maxSteps=args.max_steps, dt=args.dt, seed=args.seed, treeGravity=args.tree)
+	writeResults(rows, args.output)
+	print("results written to %s" % args.output)
+	if args.compare is not None:
+		for line in compare(rows, args.compare):
+			print(line)
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,124 @@
+"""
+This stores the physical state of every body in the system in contiguous arrays, so that the physics can work on all of the bodies at once.
+Things and Crafts are thin views over one row (or "slot") of a BodySet; the shapes that draw them are only moved when the display is synced.
+"""
+
+from __future__ import division #does fun stuff
+import numpy as np
+
+#codes for the allowed types of collisions
+ELASTIC = 0
+INELASTIC = 1
+collisionCodes = {"elastic": ELASTIC, "inelastic": INELASTIC}
+collisionNames = {ELASTIC: "elastic", INELASTIC: "inelastic"}
+
+#holds the state of every body in struct-of-arrays form
+class BodySet(object):
+	#constructor
+	"""
+	capacity is the number of slots to allocate up front; the arrays double in size whenever they run out of room
+	"""
+	def __init__(self, capacity=16):
+		self.capacity = 0
+		self.count = 0 #number of slots that have ever been handed out
+		self.freeSlots = list() #slots of removed bodies, reused before new ones are handed out
+		self.pos = np.zeros((0, 3))
+		self.vel = np.zeros((0, 3))
+		self.forward = np.zeros((0, 3))
+		self.mass = np.zeros(0)
+		self.radius = np.zeros(0)
+		self.fuel = np.zeros(0)
+		self.collisionType = np.zeros(0, dtype=np.int8)
+		self.alive = np.zeros(0, dtype=bool)
+		self.names = list()
+		self.reserve(capacity)
+
+	#makes sure that there is room for at least capacity slots
+	def reserve(self, capacity):
+		if capacity <= self.capacity:
+			return
+		def grow(a):
+			b = np.zeros((capacity,) + a.shape[1:], dtype=a.dtype)
+			b[:self.capacity] = a
+			return b
+		self.pos = grow(self.pos)
+		self.vel = grow(self.vel)
+		self.forward = grow(self.forward)
+		self.mass = grow(self.mass)
+		self.radius = grow(self.radius)
+		self.fuel = grow(self.fuel)
+		self.collisionType = grow(self.collisionType)
+		self.alive = grow(self.alive)
+		self.names.extend([""]*(capacity - self.capacity))
+		self.capacity = capacity
+
+	#adds a body and returns the slot that it was put in
+	def add(self, position, velocity, mass, radius, collisionType="elastic", name="normal", forward=(0, 0, 1), fuel=0):
+		if self.freeSlots:
+			slot = self.freeSlots.pop()
+		else:
+			if self.count == self.capacity:
+				self.reserve(max(2*self.capacity, 1))
+			slot = self.count
+			self.count += 1
+		self.pos[slot] = (position[0], position[1], position[2])
+		self.vel[slot] = (velocity[0], velocity[1], velocity[2])
+		self.forward[slot] = (forward[0], forward[1], forward[2])
+		self.mass[slot] = mass
+		self.radius[slot] = radius
+		self.fuel[slot] = fuel
+		self.collisionType[slot] = collisionCodes[collisionType]
+		self.alive[slot] = True
+		self.names[slot] = name
+		return slot
+
+	#adds many bodies at once and returns their slots; the arguments are arrays with one row per body, and names is a list
+	"""
+	free slots are not reused, so the new bodies get consecutive slots after every slot handed out so far
+	"""
+	def addMany(self, position, velocity, mass, radius, collisionType, names, forward=None, fuel=None):
+		n = len(names)
+		start = self.count
+		self.reserve(max(start + n, 2*self.capacity) if start + n > self.capacity else self.capacity)
+		slots = np.arange(start, start + n)
+		self.pos[slots] = position
+		self.vel[slots] = velocity
+		self.forward[slots] = (0, 0, 1) if forward is None else forward
+		self.mass[slots] = mass
+		self.radius[slots] = radius
+		self.fuel[slots] = 0 if fuel is None else fuel
+		self.collisionType[slots] = collisionType
+		self.alive[slots] = True
+		self.names[start:start + n] = names
+		self.count += n
+		return slots
+
+	#removes every body and makes every slot free again, without giving back any memory
+	def clear(self):
+		self.count = 0
+		self.freeSlots = list()
+		self.alive[:] = False
+		self.names[:] = [""]*self.capacity
+
+	#removes a body; its slot will be reused by the next body that is added
+	def remove(self, slot):
+		if self.alive[slot]:
+			self.alive[slot] = False
+			self.mass[slot] = 0
+			self.vel[slot] = 0
+			self.freeSlots.append(slot)
+
+	#returns the slots of all of the bodies that still exist
+	def active(self):
+		return np.flatnonzero(self.alive[:self.count])
+
+	#number of bodies that still exist
+	def __len__(self):
+		return self.count - len(self.freeSlots)
+
+	#moves the bodies in slots with semi-implicit Euler, given their accelerations
+	def advance(self, acceleration, changeTime, slots=None):
+		if slots is None:
+			slots = self.active()
+		self.vel[slots] += np.asarray(acceleration)*changeTime
+		self.pos[slots] += self.vel[slots]*changeTime
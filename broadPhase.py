@@ -0,0 +1,115 @@
+"""
+This finds the pairs of bodies that might be touching, so that the exact (and slow) touching test only has to be run on a few pairs.
+It uses sweep and prune: every body is treated as a box of side 2r, the boxes are sorted along one axis, and only boxes that overlap along that axis are checked along the other two.
+In a sparse system, this takes close to O(N log N) time instead of checking all O(N^2) pairs.
+sweptPairs and timesOfImpact do the same for bodies that move a long way in one step, by testing the whole path of each body over the step instead of only where it ends up.
+crossPairs and sweptCrossPairs only find pairs between two different sets, eg debris and bodies, so that pairs within a dense set are never even counted.
+"""
+
+from __future__ import division #does fun stuff
+import numpy as np
+
+#returns the pairs of bodies whose bounding boxes overlap
+"""
+pos is an (N, 3) array of positions
+radius is an array of the N collision radii
+returns an (M, 2) array of index pairs (i, j) with i < j, sorted by i and then j
+"""
+def candidatePairs(pos, radius):
+	pos = np.asarray(pos, dtype=float)
+	radius = np.asarray(radius, dtype=float)
+	n = len(pos)
+	if n < 2:
+		return np.zeros((0, 2), dtype=int)
+
+	#sweeps along the axis that the bodies are most spread out along, since it prunes the most pairs
+	axis = np.argmax(np.ptp(pos, axis=0))
+	lo = pos[:, axis] - radius
+	hi = pos[:, axis] + radius
+	order = np.argsort(lo, kind='mergesort')
+	sortedLo = lo[order]
+
+	#every box overlaps the boxes after it in the sorted order up until the first one that starts after it ends
+	end = np.searchsorted(sortedLo, hi[order], side='right')
+	counts = np.maximum(end - np.arange(n) - 1, 0)
+	first = np.repeat(np.arange(n), counts)
+	#position of each partner within the run of partners for its box
+	offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+	second = first + 1 + offsets
+	a = order[first]
+	b = order[second]
+
+	#prunes the pairs that do not overlap along the other two axes
+	overlap = np.all(np.abs(pos[a] - pos[b]) <= (radius[a] + radius[b])[:, np.newaxis], axis=1)
+	a = a[overlap]
+	b = b[overlap]
+	pairs = np.column_stack((np.minimum(a, b), np.maximum(a, b)))
+	return pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+
+#returns the pairs of bodies whose paths over a step might come close enough to touch
+"""
+start and end are (N, 3) arrays of the positions at the start and end of the step
+radius is an array of the N collision radii
+each path is covered by a sphere around its middle that reaches both ends; returns the same kind of array as candidatePairs
+"""
+def sweptPairs(start, end, radius):
+	start = np.asarray(start, dtype=float)
+	end = np.asarray(end, dtype=float)
+	halfMove = np.sqrt(np.sum((end - start)**2, axis=1))/2
+	return candidatePairs((start + end)/2, np.asarray(radius, dtype=float) + halfMove)
+
+#returns the pairs (a, b) of a body in the first set and a body in the second set whose bounding boxes overlap
+"""
+posA and posB are (N, 3) and (M, 3) arrays of positions, and radiusA and radiusB the N and M radii
+returns a (K, 2) array of pairs of indices into each set
+"""
+def crossPairs(posA, radiusA, posB, radiusB):
+	posA = np.asarray(posA, dtype=float)
+	posB = np.asarray(posB, dtype=float)
+	radiusA = np.asarray(radiusA, dtype=float)
+	radiusB = np.asarray(radiusB, dtype=float)
+	if len(posA) == 0 or len(posB) == 0:
+		return np.zeros((0, 2), dtype=int)
+	axis = np.argmax(np.ptp(np.concatenate([posA, posB]), axis=0))
+
+	#the second set is sorted along the axis, and each box of the first set is looked up in it, widened by the biggest box of the second set
+	order = np.argsort(posB[:, axis], kind='mergesort')
+	sortedB = posB[order, axis]
+	reach = radiusA + np.max(radiusB)
+	start = np.searchsorted(sortedB, posA[:, axis] - reach, side='left')
+	end = np.searchsorted(sortedB, posA[:, axis] + reach, side='right')
+	counts = end - start
+	a = np.repeat(np.arange(len(posA)), counts)
+	offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+	b = order[np.repeat(start, counts) + offsets]
+
+	overlap = np.all(np.abs(posA[a] - posB[b]) <= (radiusA[a] + radiusB[b])[:, np.newaxis], axis=1)
+	return np.column_stack((a[overlap], b[overlap]))
+
+#returns the pairs between two sets whose paths over a step might come close enough to touch; see sweptPairs and crossPairs
+def sweptCrossPairs(startA, endA, radiusA, startB, endB, radiusB):
+	startA, endA, startB, endB = [np.asarray(p, dtype=float) for p in (startA, endA, startB, endB)]
+	halfA = np.sqrt(np.sum((endA - startA)**2, axis=1))/2
+	halfB = np.sqrt(np.sum((endB - startB)**2, axis=1))/2
+	return crossPairs((startA + endA)/2, np.asarray(radiusA, dtype=float) + halfA, (startB + endB)/2, np.asarray(radiusB, dtype=float) + halfB)
+
+#returns the fraction of a step at which each pair of bodies first touches, or nan if they don't touch during the step
+"""
+sep is an (M, 3) array of the separations (second minus first) at the start of the step
+move is an (M, 3) array of how far the second body moved relative to the first over the step; both are assumed to move in straight lines
+touchDist is an array of the M sums of radii
+pairs that are already touching at the start of the step get nan, since the ordinary touching test handles them
+"""
+def timesOfImpact(sep, move, touchDist):
+	sep = np.asarray(sep, dtype=float)
+	move = np.asarray(move, dtype=float)
+	#solves |sep + s*move|^2 = touchDist^2 for the smaller s
+	a = np.einsum('ij,ij->i', move, move)
+	b = 2*np.einsum('ij,ij->i', sep, move)
+	c = np.einsum('ij,ij->i', sep, sep) - np.asarray(touchDist, dtype=float)**2
+	disc = b*b - 4*a*c
+	hit = (a > 0) & (c > 0) & (disc >= 0) & (b < 0) #b < 0 means they are getting closer
+	s = np.full(len(sep), np.nan)
+	s[hit] = (-b[hit] - np.sqrt(disc[hit]))/(2*a[hit])
+	s[hit & ((s < 0) | (s > 1))] = np.nan
+	return s
@@ -1,32 +1,43 @@
 """
 This calculates the new velocities of objects after they collide
+The calculations only use indexing and arithmetic, so they work on VPython vectors and NumPy arrays alike; no graphics are needed
 """
 
 #this should calculate new trajectories after objects collide
 from __future__ import division #does fun stuff
-from visual import * #for the 3D graphics stuff
+import math
 import random
 
-#modifies the velocities of the two objects 
-def elasticCollision(o1, o2):
-	#useful things
-	v1 = o1.getVelocity()
-	m1 = o1.getMass()
-	v2 = o2.getVelocity()
-	m2 = o2.getMass()
-	diffV = v1 - v2
-	sepHat = norm(o1.getSep(o2))
+#dot product of two 3D vectors
+def dot(a, b):
+	return a[0]*b[0] + a[1]*b[1] + a[2]*b[2]
 
+#returns the velocities of two objects after they bounce off of each other
+"""
+v1, v2 are the velocities and m1, m2 are the masses of the two objects
+sepHat is the unit vector pointing from the first object to the second
+"""
+def elasticVelocities(v1, m1, v2, m2, sepHat):
+	diffV = v1 - v2
 	#from https://en.wikipedia.org/wiki/Elastic_collision
 	v1new = v1 - ((2*m2)/(m1 + m2))*dot(diffV, sepHat)*sepHat
 	v2new = v2 - ((2*m1)/(m1 + m2))*dot(-diffV, -sepHat)*(-sepHat)
+	return v1new, v2new
+
+#modifies the velocities of the two objects 
+def elasticCollision(o1, o2):
+	#useful things
+	sep = o1.getSep(o2)
+	sepHat = sep/math.sqrt(dot(sep, sep))
+	v1new, v2new = elasticVelocities(o1.getVelocity(), o1.getMass(), o2.getVelocity(), o2.getMass(), sepHat)
 
 	o1.setVelocity(v1new)
 	o2.setVelocity(v2new)
 
+#returns the velocity of two masses moving together after they stick
+def inelasticVelocity(v1, m1, v2, m2):
+	return (v1*m1 + v2*m2)/(m1 + m2)
+
 #returns the velocity of the new, combined object
 def inelasticCollision(o1, o2):
-	momentum1 = o1.getVelocity()*o1.getMass()
-	momentum2 = o2.getVelocity()*o2.getMass()
-	velocity = (momentum1 + momentum2)/(o1.getMass() + o2.getMass())
-	return velocity
\ No newline at end of file
+	return inelasticVelocity(o1.getVelocity(), o1.getMass(), o2.getVelocity(), o2.getMass())
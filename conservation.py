@@ -0,0 +1,136 @@
+"""
+This keeps a time series of the total energy, momentum and angular momentum of the system, one sample per step, and raises alerts when they drift, so that mistakes in the integrators or the collisions show up straight away.
+The potential energy comes out of the force calculation that the step does anyway (see gravity.accelerations with potential=True and Integrator.energyCall), and the rest only takes a pass over the velocities, so the checks can be left on in long runs.
+Drifts are measured from a baseline, which is moved to the current sample whenever something changes the totals on purpose: the craft thrusting, bodies sticking together or breaking up, debris, or an input such as firing or refuelling. Elastic collisions and coasting along Kepler orbits keep the baseline.
+Each drift is relative to a size that doesn't vanish when the total does:
+	energy: the kinetic energy plus the size of the potential energy
+	momentum: the sum of m|v| over the bodies
+	angular momentum: the sum of m|r||v| over the bodies, about the origin
+"""
+
+from __future__ import division #does fun stuff
+import csv
+import math
+import numpy as np
+
+sampleType = np.dtype([
+	("steps", "<i8"),
+	("t", "<f8"),			#simulated time the sample was taken at, which can be part way through a step
+	("kinetic", "<f8"),
+	("potential", "<f8"),
+	("energy", "<f8"),
+	("momentum", "<f8", (3,)),
+	("angularMomentum", "<f8", (3,)),
+	("energyDrift", "<f8"),
+	("momentumDrift", "<f8"),
+	("angularDrift", "<f8"),
+	("rebased", "?"),		#true if the baseline was moved to this sample
+	("fused", "?"),			#true if the potential energy came out of the step's own force calculation
+])
+quantities = ("energy", "momentum", "angular")
+
+#returns the length of a 3D vector
+def length(v):
+	return math.sqrt(np.dot(v, v))
+
+#keeps the totals of every step and checks them for drift
+class ConservationMonitor(object):
+	#constructor
+	"""
+	capacity is the most samples kept; the oldest are dropped first
+	energyTolerance, momentumTolerance and angularTolerance are the largest drifts allowed before an alert is raised
+	"""
+	def __init__(self, capacity=100000, energyTolerance=1e-3, momentumTolerance=1e-6, angularTolerance=1e-6):
+		self.samples = np.zeros(capacity, dtype=sampleType) #ring buffer; see series
+		self.count = 0 #number of samples ever recorded
+		self.tolerance = {"energy": energyTolerance, "momentum": momentumTolerance, "angular": angularTolerance}
+		self.baseline = None #(energy, momentum, angular momentum, energy size, momentum size, angular size) that drifts are measured from
+		self.maxDrift = dict((quantity, 0.) for quantity in quantities) #largest drift since the monitor started
+		self.alerts = list() #dictionaries of the step, time, quantity, drift and tolerance of every alert
+		self.alerted = set() #quantities that have raised an alert since the baseline last moved
+		self.fused = 0 #number of samples whose potential energy came out of the force calculation of the step
+		self.separate = 0 #number of samples that needed a force calculation of their own
+
+	#adds a sample and returns it
+	"""
+	pos, vel and mass are the state of every body, at time t, that momentum and angular momentum are worked out from
+	kinetic and potential are the energies, at the same time or at a time within the step that is just as good; see Integrator.energyTime
+	rebase moves the baseline to this sample, because something changed the totals on purpose during the step
+	fused is true if the potential energy came out of the step's own force calculation
+	"""
+	def record(self, steps, t, kinetic, potential, pos, vel, mass, rebase=False, fused=True):
+		momentum = np.dot(mass, vel)
+		angularMomentum = np.dot(mass, np.cross(pos, vel))
+		speed = np.sqrt(np.einsum('ij,ij->i', vel, vel))
+		radius = np.sqrt(np.einsum('ij,ij->i', pos, pos))
+		energy = kinetic + potential
+		if self.baseline is None or rebase:
+			self.baseline = (energy, momentum, angularMomentum, kinetic + abs(potential), np.dot(mass, speed), np.dot(mass, radius*speed))
+			self.alerted = set()
+			rebase = True
+		e0, p0, l0, eSize, pSize, lSize = self.baseline
+		drift = {
+			"energy": abs(energy - e0)/eSize if eSize > 0 else 0.,
+			"momentum": length(momentum - p0)/pSize if pSize > 0 else 0.,
+			"angular": length(angularMomentum - l0)/lSize if lSize > 0 else 0.,
+		}
+		for quantity in quantities:
+			self.maxDrift[quantity] = max(self.maxDrift[quantity], drift[quantity])
+			if drift[quantity] > self.tolerance[quantity] and quantity not in self.alerted:
+				self.alerted.add(quantity)
+				self.alerts.append({"steps": steps, "t": t, "quantity": quantity, "drift": drift[quantity], "tolerance": self.tolerance[quantity]})
+		if fused:
+			self.fused += 1
+		else:
+			self.separate += 1
+
+		sample = self.samples[self.count % len(self.samples)]
+		sample["steps"] = steps
+		sample["t"] = t
+		sample["kinetic"] = kinetic
+		sample["potential"] = potential
+		sample["energy"] = energy
+		sample["momentum"] = momentum
+		sample["angularMomentum"] = angularMomentum
+		sample["energyDrift"] = drift["energy"]
+		sample["momentumDrift"] = drift["momentum"]
+		sample["angularDrift"] = drift["angular"]
+		sample["rebased"] = rebase
+		sample["fused"] = fused
+		self.count += 1
+		return sample
+
+	#returns the newest sample, or None if there aren't any yet
+	def latest(self):
+		if self.count == 0:
+			return None
+		return self.samples[(self.count - 1) % len(self.samples)]
+
+	#returns the samples that are kept, oldest first
+	def series(self):
+		if self.count <= len(self.samples):
+			return self.samples[:self.count].copy()
+		start = self.count % len(self.samples)
+		return np.concatenate([self.samples[start:], self.samples[:start]])
+
+	#returns lines of text describing the latest drifts and any alerts
+	def describe(self):
+		sample = self.latest()
+		if sample is None:
+			return ["conservation: waiting for the first step"]
+		lines = ["conservation: %i samples, %i from the force calculation of the step" % (self.count, self.fused)]
+		lines.append("  energy: %.6g J, drift %.3g (largest %.3g)" % (sample["energy"], sample["energyDrift"], self.maxDrift["energy"]))
+		lines.append("  momentum: drift %.3g (largest %.3g)" % (sample["momentumDrift"], self.maxDrift["momentum"]))
+		lines.append("  angular momentum: drift %.3g (largest %.3g)" % (sample["angularDrift"], self.maxDrift["angular"]))
+		for alert in self.alerts:
+			lines.append("  alert at step %i (t = %g s): %s drifted by %.3g, more than %.3g" % (alert["steps"], alert["t"], alert["quantity"], alert["drift"], alert["tolerance"]))
+		return lines
+
+	#writes the samples that are kept to a csv file, one row per step
+	def writeCSV(self, path):
+		names = [name for name in sampleType.names if name not in ("momentum", "angularMomentum")]
+		with open(path, "w") as f:
+			writer = csv.writer(f)
+			writer.writerow(names + ["momentumX", "momentumY", "momentumZ", "angularMomentumX", "angularMomentumY", "angularMomentumZ"])
+			for sample in self.series():
+				writer.writerow([sample[name] for name in names] + list(sample["momentum"]) + list(sample["angularMomentum"]))
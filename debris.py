@@ -0,0 +1,110 @@
+"""
+This stores the debris thrown off when bodies break up, as plain arrays of positions, velocities and masses instead of as bodies with shapes of their own, so that tens of thousands of fragments stay cheap.
+Debris feels the gravity of the bodies but doesn't pull on anything or hit other debris; a fragment that hits a body sticks to it, giving it its mass and momentum.
+Rows are kept packed: removing fragments moves the ones after them down, so the first len(field) rows are always the live fragments.
+"""
+
+from __future__ import division #does fun stuff
+import numpy as np
+
+#holds every fragment of debris in struct-of-arrays form
+class DebrisField(object):
+	#constructor
+	"""
+	capacity is the number of rows to allocate up front; the arrays double in size whenever they run out of room
+	maxParticles is the most fragments kept at once; breakups make fewer, heavier fragments once it is reached
+	"""
+	def __init__(self, capacity=1024, maxParticles=200000):
+		self.capacity = 0
+		self.count = 0
+		self.maxParticles = maxParticles
+		self.pos = np.zeros((0, 3))
+		self.vel = np.zeros((0, 3))
+		self.mass = np.zeros(0)
+		self.reserve(capacity)
+
+	#makes sure that there is room for at least capacity fragments
+	def reserve(self, capacity):
+		if capacity <= self.capacity:
+			return
+		def grow(a):
+			b = np.zeros((capacity,) + a.shape[1:], dtype=a.dtype)
+			b[:self.count] = a[:self.count]
+			return b
+		self.pos = grow(self.pos)
+		self.vel = grow(self.vel)
+		self.mass = grow(self.mass)
+		self.capacity = capacity
+
+	#number of fragments
+	def __len__(self):
+		return self.count
+
+	#number of fragments that can still be added before maxParticles is reached
+	def room(self):
+		return max(self.maxParticles - self.count, 0)
+
+	#adds fragments; the arguments are arrays with one row per fragment
+	def add(self, position, velocity, mass):
+		n = len(mass)
+		if self.count + n > self.capacity:
+			self.reserve(max(self.count + n, 2*self.capacity))
+		self.pos[self.count:self.count + n] = position
+		self.vel[self.count:self.count + n] = velocity
+		self.mass[self.count:self.count + n] = mass
+		self.count += n
+
+	#removes the fragments whose rows are true in gone, an array of len(self) booleans
+	def remove(self, gone):
+		keep = np.flatnonzero(~gone)
+		n = len(keep)
+		self.pos[:n] = self.pos[keep]
+		self.vel[:n] = self.vel[keep]
+		self.mass[:n] = self.mass[keep]
+		self.count = n
+
+	#removes every fragment, without giving back any memory
+	def clear(self):
+		self.count = 0
+
+	#total mass and momentum of the debris
+	def totalMass(self):
+		return self.mass[:self.count].sum()
+
+	def momentum(self):
+		return np.dot(self.mass[:self.count], self.vel[:self.count])
+
+	#moves the debris forward by changeTime with a drift-kick-drift step
+	"""
+	accel is a function that takes an (N, 3) array of positions and returns the accelerations of fragments at them
+	"""
+	def step(self, accel, changeTime):
+		n = self.count
+		if n == 0:
+			return
+		pos = self.pos[:n]
+		vel = self.vel[:n]
+		pos += vel*(changeTime/2)
+		vel += accel(pos)*changeTime
+		pos += vel*(changeTime/2)
+
+#returns the positions, velocities and masses of the fragments that a body breaks into
+"""
+centre, velocity and radius are those of the body, and mass is the total mass of the fragments
+count is the number of fragments; they share the mass equally
+kickSpeed is the typical speed that the fragments fly apart at; the kicks add up to nothing, so momentum is kept
+clearance is the radius of the ball the fragments start outside of, eg what is left of the body, so that they don't land on it straight away
+generator is a numpy RandomState
+"""
+def fragments(centre, velocity, radius, mass, count, kickSpeed, generator, clearance=0):
+	direction = generator.normal(size=(count, 3))
+	direction /= np.sqrt(np.einsum('ij,ij->i', direction, direction))[:, np.newaxis]
+	#spread through the shell between the clearance and the surface (or a little outside of the clearance if it is bigger)
+	outer = max(radius, 1.1*clearance)
+	inner = min(1.05*clearance, outer)
+	distance = (generator.uniform(inner**3, outer**3, count))**(1/3)
+	pos = np.asarray(centre, dtype=float) + direction*distance[:, np.newaxis]
+	kick = direction*kickSpeed*generator.uniform(0.5, 1.5, count)[:, np.newaxis]
+	kick -= kick.mean(axis=0)
+	vel = np.asarray(velocity, dtype=float) + kick
+	return pos, vel, np.full(count, mass/count)
@@ -0,0 +1,775 @@
+"""
+This is the physics of the simulation on its own, without any graphics, so that it can be run on computers without a display.
+It works directly on a BodySet: collisions, gravity, the thrust of the craft and moving everything forward in time.
+spaceshipSimulation.py drives an Engine from its physics thread; running this file runs the simulation headlessly and reports how long it took, eg
+	python engine.py --time 86400 --dt 60 --integrator leapfrog
+Nothing here imports VPython or wx.
+"""
+
+from __future__ import division #does fun stuff
+import argparse
+import collections
+import math
+import random
+import time
+import numpy as np
+
+import constants as c #gives useful physics constants
+import bodies #array-backed physical state
+import collisions #calculates the result of a collision
+import gravity #exact all-pairs gravity
+import barnesHut #approximate gravity for large numbers of bodies
+import parallelGravity #exact gravity split across processes
+import kepler #moves coasting bodies along their orbits in closed form
+import debris #fragments thrown off when bodies break up
+import broadPhase #finds the bodies that might be touching
+import integrators #moves the bodies forward in time
+import recording #saves every step to a file
+import profiling #times the phases of a step
+import conservation as conservationChecks #checks that energy and momentum are kept; renamed since Engine takes a conservation argument
+import scenario #reads starting states from files
+
+#the inputs that steer a run, and the Engine methods that carry them out; see applyInput
+inputMethods = {
+	"thrust": "setBurnRate",
+	"exhaustSpeed": "setExhaustSpeed",
+	"turn": "turn",
+	"aim": "aim",
+	"fire": "fire",
+	"refuel": "refuel",
+	"reload": "reload",
+	"recentre": "recentre",
+	"clear": "clearProjectiles",
+}
+
+#returns v rotated by angle about axis; the same as VPython's rotate
+def rotate(v, angle, axis):
+	axis = np.asarray(axis, dtype=float)
+	axis = axis/math.sqrt(np.dot(axis, axis))
+	v = np.asarray(v, dtype=float)
+	cos, sin = math.cos(angle), math.sin(angle)
+	return v*cos + np.cross(axis, v)*sin + axis*np.dot(axis, v)*(1 - cos)
+
+#returns a direction that is to the left of forward; the same as things.leftOf, without VPython
+def leftOf(forward):
+	left = np.cross((0., 1., 0.), forward)
+	if np.dot(left, left) > 0:
+		return left
+	return np.array([-1., 0., 0.])
+
+#the physics of a system of bodies
+class Engine(object):
+	#constructor
+	"""
+	bodySet is the BodySet to simulate; an empty one is made if none is given
+	integrator is the integrator used to move the bodies; leapfrog if none is given
+	treeGravity uses a Barnes-Hut octree instead of adding up every pair, with openingAngle as its accuracy
+	continuousCollisions also checks the path of every body over each step, so that fast bodies can't pass through each other between steps
+	testParticleRatio makes every body lighter than this fraction of the heaviest body a test particle, which feels gravity but doesn't pull on anything; 0 turns it off
+	droppedForceInterval is the number of steps between measurements of the gravity lost to test particles, and of the error of tree gravity
+	workers splits exact gravity across that many processes; 0 does it all in this one
+	fastForward lets step skip ahead along Kepler orbits while nothing but the pull of one primary acts on each body; see coast
+	fragmentation lets bodies break up when they are hit hard enough, throwing off debris; see fragment
+	seed seeds the random numbers, so that a run can be repeated exactly; see inputLog.py
+	conservation keeps a time series of the energy, momentum and angular momentum of the system in a conservation.ConservationMonitor, taking the potential energy from the force calculation of each step where it can
+	"""
+	def __init__(self, bodySet=None, integrator=None, treeGravity=False, openingAngle=0.5, continuousCollisions=True, testParticleRatio=0, droppedForceInterval=100, workers=0, fastForward=False, fragmentation=False, seed=None, conservation=False):
+		if bodySet is None:
+			bodySet = bodies.BodySet()
+		if integrator is None:
+			integrator = integrators.Leapfrog()
+		self.bodies = bodySet
+		self.integrator = integrator
+		self.treeGravity = treeGravity
+		self.openingAngle = openingAngle
+		self.continuousCollisions = continuousCollisions
+		self.testParticleRatio = testParticleRatio
+		self.droppedForceInterval = droppedForceInterval
+		self.droppedForce = None #the last gravity.droppedForce report, if test particles are on
+		self.treeError = None #the last barnesHut.errorReport, if tree gravity is on
+		self.parallel = parallelGravity.ParallelGravity(workers) if workers > 0 else None
+		self.fastForward = fastForward
+		self.coastTolerance = 1e-3 #largest perturbation allowed while coasting, as a fraction of the pull of a body's primary
+		self.coastFraction = 1/16 #largest fraction of an orbit skipped at once
+		self.coastRetry = 20 #steps to wait before trying to coast again after the system couldn't
+		self.nextCoast = 0 #step at which to try coasting again
+		self.coastReason = None #why the system couldn't coast the last time it tried
+		self.coastedTime = 0 #simulated seconds skipped by coasting
+
+		#breaking up
+		self.fragmentation = fragmentation
+		self.debris = debris.DebrisField()
+		self.shatterStrength = 1e5 #impact energy per kg that breaks up a body with no gravity of its own, J/kg
+		self.minRemnant = 0.1 #a body that would keep less than this fraction of its mass turns into debris completely
+		self.fragmentsPerBreakup = 200 #most fragments made each time a body breaks up
+		self.kickFraction = 0.1 #fraction of the impact energy that goes into throwing the fragments apart
+		self.shattered = list() #(slot, fraction of its mass left) of the bodies that broke up in the last step; 0 means it turned into debris completely
+		self.t = 0 #simulated time
+		self.steps = 0
+
+		#the craft that the thrust acts on
+		self.craft = None #slot of the craft
+		self.burnRate = 0 #kg of fuel burnt per second
+		self.exhaustSpeed = 60000 #m/s
+		self.ammo = 10
+		self.left = None #direction to the left of the craft; like things.Craft, it is kept so that turning doesn't drift
+
+		#inputs waiting for the next step, and the inputLog.InputLog that applied inputs are written to, if any
+		self.inputs = collections.deque()
+		self.inputLog = None
+		self.disturbed = False #true if an input has been applied since the last step, so the totals may have changed
+
+		self.conservation = conservationChecks.ConservationMonitor() if conservation else None
+
+		self.forceInputs = None #(slots, masses, extra accelerations) of the last integrated step; see integrate
+		self.joins = list() #(absorber, absorbed) slots of the bodies that stuck together in the last step
+		self.collisionCount = 0 #number of collisions handled so far
+		self.random = random.Random(seed) #used to pick a direction for bodies that are at exactly the same point, and to break bodies up
+		self.timer = profiling.PhaseTimer("physics") #times the phases of a step when it is enabled
+
+	#returns the gravitational acceleration of bodies with masses mass at positions pos
+	"""
+	targets and freeFall are passed on to gravity.accelerations; free-fall times can't be worked out from the octree
+	sources are the bodies that pull on the others, from gravity.heavyBodies; every body if it is None
+	potential also returns the gravitational potential at every target, as a last array
+	"""
+	def gravitationalAcceleration(self, pos, mass, targets=None, freeFall=False, sources=None, potential=False):
+		if self.treeGravity:
+			if freeFall:
+				raise ValueError("free-fall times (used by block time steps) need exact gravity; turn off tree gravity")
+			result = barnesHut.accelerations(pos, mass, theta=self.openingAngle, sources=sources, potential=potential)
+			if targets is None:
+				return result
+			return (result[0][targets], result[1][targets]) if potential else result[targets]
+		if self.parallel is not None:
+			return self.parallel.accelerations(pos, mass, targets=targets, freeFall=freeFall, sources=sources, potential=potential)
+		return gravity.accelerations(pos, mass, targets=targets, freeFall=freeFall, sources=sources, potential=potential)
+
+	#measures how much gravity is lost to test particles right now, and keeps the report in droppedForce
+	def measureDroppedForce(self, sample=256):
+		b = self.bodies
+		slots = b.active()
+		mass = b.mass[slots]
+		self.droppedForce = gravity.droppedForce(b.pos[slots], mass, gravity.heavyBodies(mass, self.testParticleRatio), sample=sample)
+		return self.droppedForce
+
+	#measures how far tree gravity is from the exact sum right now, on a sample of the bodies, and keeps the report in treeError
+	def measureTreeError(self, sample=256):
+		b = self.bodies
+		slots = b.active()
+		self.treeError = barnesHut.errorReport(b.pos[slots], b.mass[slots], theta=self.openingAngle, sample=sample)
+		del self.treeError["accelerations"] #not needed, and as big as the system
+		return self.treeError
+
+	#times the parallel gravity against doing it all in this process, on the bodies as they are now; returns a parallelGravity.measureSpeedup report
+	def measureSpeedup(self, repeats=3):
+		if self.parallel is None:
+			raise ValueError("the engine has no worker processes to measure")
+		b = self.bodies
+		slots = b.active()
+		return parallelGravity.measureSpeedup(self.parallel, b.pos[slots], b.mass[slots], repeats)
+
+	#starts the random numbers over from seed
+	def reseed(self, seed):
+		self.random.seed(seed)
+
+	#stops any worker processes
+	def close(self):
+		if self.parallel is not None:
+			self.parallel.close()
+
+	#returns the separation from the body in slot a to the body in slot b, picking a random direction if they are at the same point
+	def separation(self, a, b):
+		sep = self.bodies.pos[b] - self.bodies.pos[a]
+		if not np.any(sep):
+			sep = np.array([self.random.random(), self.random.random(), self.random.random()])
+			sep /= math.sqrt(collisions.dot(sep, sep))
+		return sep
+
+	#finds the bodies that are touching, pushes them apart and either bounces them or sticks them together
+	def collide(self):
+		self.joins = list()
+		self.shattered = list()
+		b = self.bodies
+		slots = b.active()
+		self.timer.count("bodies", len(slots))
+		if len(slots) < 2:
+			return
+		pairs = broadPhase.candidatePairs(b.pos[slots], b.radius[slots])
+		self.timer.count("candidatePairs", len(pairs))
+		if len(pairs) == 0:
+			return
+		first = slots[pairs[:, 0]]
+		second = slots[pairs[:, 1]]
+		sep = b.pos[second] - b.pos[first]
+		touching = np.einsum('ij,ij->i', sep, sep) < (b.radius[first] + b.radius[second])**2
+
+		for i, j in zip(first[touching], second[touching]):
+			if not (b.alive[i] and b.alive[j]):
+				continue #already stuck to something else this step
+			sep = self.separation(i, j)
+			dist = math.sqrt(collisions.dot(sep, sep))
+			touchDist = b.radius[i] + b.radius[j]
+			if dist >= touchDist:
+				continue #pushed apart by an earlier collision this step
+
+			#gets the bodies to no longer touch; if bodies are touching for too long, they can reach the same point
+			sepHat = sep/dist
+			changePos = sepHat*(touchDist - dist)
+			total = b.mass[i] + b.mass[j]
+			b.pos[i] -= changePos*b.mass[j]/total
+			b.pos[j] += changePos*b.mass[i]/total
+			self.resolve(i, j, sepHat)
+
+	#bounces the bodies in slots i and j off each other, or sticks them together; returns the slots of the bodies that are left
+	"""
+	sepHat is the unit vector pointing from i to j
+	"""
+	def resolve(self, i, j, sepHat):
+		b = self.bodies
+		self.collisionCount += 1
+		self.timer.count("collisions", 1)
+		#energy of the impact, in the frame of the centre of mass
+		diffV = b.vel[i] - b.vel[j]
+		energy = 0.5*b.mass[i]*b.mass[j]/(b.mass[i] + b.mass[j])*collisions.dot(diffV, diffV)
+		if b.collisionType[i] == bodies.ELASTIC and b.collisionType[j] == bodies.ELASTIC:
+			b.vel[i], b.vel[j] = collisions.elasticVelocities(b.vel[i].copy(), b.mass[i], b.vel[j].copy(), b.mass[j], sepHat)
+			survivors = (i, j)
+		else:
+			#the craft always survives a join
+			if j == self.craft:
+				i, j = j, i
+			b.vel[i] = collisions.inelasticVelocity(b.vel[i], b.mass[i], b.vel[j], b.mass[j])
+			b.mass[i] += b.mass[j]
+			b.remove(j)
+			self.joins.append((i, j))
+			survivors = (i,)
+		if self.fragmentation:
+			for slot in survivors:
+				self.fragment(slot, energy)
+		return survivors
+
+	#breaks up the body in slot if energy, the energy of an impact it was in, is enough to; the craft never breaks up
+	"""
+	a body breaks up once the energy per kg reaches its strength, shatterStrength plus the energy per kg that holds it together by its own gravity
+	it keeps 1 - (energy per kg)/(2*strength) of its mass, so a body hit with exactly its strength splits in half; the rest is thrown off as debris
+	"""
+	def fragment(self, slot, energy):
+		b = self.bodies
+		mass, radius = b.mass[slot], b.radius[slot]
+		if slot == self.craft or mass <= 0 or self.debris.room() == 0:
+			return
+		perKg = energy/mass
+		strength = self.shatterStrength + 0.6*c.gravitationalConstant*mass/radius
+		if perKg < strength:
+			return
+		remnant = 1 - 0.5*perKg/strength
+		if remnant < self.minRemnant:
+			remnant = 0
+		generator = np.random.RandomState(self.random.getrandbits(32))
+		count = min(self.fragmentsPerBreakup, self.debris.room())
+		pos, vel, fragmentMass = debris.fragments(b.pos[slot], b.vel[slot], radius, mass*(1 - remnant), count, (2*self.kickFraction*perKg)**0.5, generator, radius*remnant**(1/3))
+		self.debris.add(pos, vel, fragmentMass)
+		if remnant == 0:
+			b.remove(slot)
+		else:
+			b.mass[slot] *= remnant
+			b.radius[slot] *= remnant**(1/3)
+		self.shattered.append((slot, remnant))
+		self.timer.count("breakups", 1)
+
+	#moves the debris forward by changeTime under the gravity of the bodies, and sticks any fragments that hit a body to it
+	"""
+	start is where the bodies in slots were at the start of the step
+	"""
+	def moveDebris(self, slots, start, changeTime):
+		field = self.debris
+		n = len(field)
+		if n == 0:
+			return
+		b = self.bodies
+		alive = b.alive[slots]
+		slots, start = slots[alive], start[alive]
+		end = b.pos[slots]
+		mass = b.mass[slots]
+		middle = (start + end)/2
+		sources = np.arange(len(slots))
+		#fragments are test particles, pulled by the bodies where they were half way through the step
+		def acceleration(points):
+			return self.gravitationalAcceleration(np.concatenate([middle, points]), np.concatenate([mass, np.zeros(len(points))]), targets=np.arange(len(slots), len(slots) + len(points)), sources=sources)
+		before = field.pos[:n].copy()
+		field.step(acceleration, changeTime)
+
+		#the first body on the path of each fragment takes its mass and momentum
+		after = field.pos[:n]
+		pairs = broadPhase.sweptCrossPairs(before, after, np.zeros(n), start, end, b.radius[slots])
+		self.timer.count("debris", n)
+		if len(pairs) == 0:
+			return
+		piece, body = pairs[:, 0], pairs[:, 1]
+		impact = broadPhase.timesOfImpact(start[body] - before[piece], (end[body] - start[body]) - (after[piece] - before[piece]), b.radius[slots[body]])
+		inside = np.einsum('ij,ij->i', end[body] - after[piece], end[body] - after[piece]) <= b.radius[slots[body]]**2
+		hit = ~np.isnan(impact) | inside
+		if not np.any(hit):
+			return
+		piece, body, impact = piece[hit], body[hit], np.where(np.isnan(impact[hit]), 1, impact[hit])
+		order = np.lexsort((impact, piece))
+		piece, body = piece[order], body[order]
+		first = np.concatenate([[True], piece[1:] != piece[:-1]])
+		piece, body = piece[first], body[first]
+		#momentum and mass gained by each body
+		gained = np.zeros((len(slots), 4))
+		np.add.at(gained, body, np.column_stack([field.mass[piece, np.newaxis]*field.vel[piece], field.mass[piece]]))
+		hitBodies = np.unique(body)
+		target = slots[hitBodies]
+		total = b.mass[target] + gained[hitBodies, 3]
+		b.vel[target] = (b.mass[target, np.newaxis]*b.vel[target] + gained[hitBodies, :3])/total[:, np.newaxis]
+		b.mass[target] = total
+		gone = np.zeros(n, dtype=bool)
+		gone[piece] = True
+		field.remove(gone)
+
+	#finds the bodies whose paths crossed during the last step, and resolves each collision at the moment the bodies first touched
+	"""
+	slots are the bodies that were moved, and start is where they were at the start of the step
+	the bodies are assumed to move in straight lines over the step; after a collision they move in a straight line with their new velocities for the rest of the step
+	"""
+	def sweep(self, slots, start, changeTime):
+		b = self.bodies
+		end = b.pos[slots]
+		move = end - start
+		#two bodies can only pass through each other if at least one of them moved further than its own radius
+		fast = np.einsum('ij,ij->i', move, move) > b.radius[slots]**2
+		if not np.any(fast):
+			return
+		pairs = broadPhase.sweptPairs(start, end, b.radius[slots])
+		pairs = pairs[fast[pairs[:, 0]] | fast[pairs[:, 1]]]
+		self.timer.count("sweptPairs", len(pairs))
+		if len(pairs) == 0:
+			return
+		first, second = pairs[:, 0], pairs[:, 1]
+		impact = broadPhase.timesOfImpact(start[second] - start[first], move[second] - move[first], b.radius[slots[first]] + b.radius[slots[second]])
+		hit = ~np.isnan(impact)
+		if not np.any(hit):
+			return
+
+		#earliest collisions first; a body only has its first collision of the step resolved
+		first, second, impact = first[hit], second[hit], impact[hit]
+		done = set()
+		for k in np.argsort(impact, kind='mergesort'):
+			pi, pj, s = first[k], second[k], impact[k]
+			i, j = slots[pi], slots[pj]
+			if i in done or j in done or not (b.alive[i] and b.alive[j]):
+				continue
+			done.update((i, j))
+			#puts the bodies where they touched, then moves them with their new velocities for the rest of the step
+			b.pos[i] = start[pi] + s*move[pi]
+			b.pos[j] = start[pj] + s*move[pj]
+			sep = self.separation(i, j)
+			for slot in self.resolve(i, j, sep/math.sqrt(collisions.dot(sep, sep))):
+				b.pos[slot] += b.vel[slot]*(1 - s)*changeTime
+
+	#burns fuel and returns the acceleration of the craft due to its thrust over a step of changeTime
+	def thrust(self, changeTime):
+		b = self.bodies
+		if self.craft is None or self.burnRate <= 0 or b.fuel[self.craft] <= 0:
+			return np.zeros(3)
+		#decrement fuel tank
+		burnt = min(self.burnRate*changeTime, b.fuel[self.craft])
+		b.fuel[self.craft] -= burnt
+		b.mass[self.craft] -= burnt
+		forward = b.forward[self.craft]
+		force = forward/math.sqrt(collisions.dot(forward, forward))*self.burnRate*self.exhaustSpeed
+		return force/b.mass[self.craft]
+
+	#moves every body forward by changeTime under gravity and the thrust of the craft
+	"""
+	returns the (kinetic energy, potential energy, fraction of the step they were taken at) of the system if the conservation checks are on and the integrator made a force calculation that they could be taken from, otherwise None
+	"""
+	def integrate(self, changeTime):
+		b = self.bodies
+		slots = b.active()
+		extra = np.zeros((len(slots), 3))
+		if self.craft is not None and b.alive[self.craft]:
+			extra[np.searchsorted(slots, self.craft)] = self.thrust(changeTime)
+		mass = b.mass[slots]
+		pos = b.pos[slots]
+		vel = b.vel[slots]
+		timer = self.timer
+		#the integrator may keep forces from the end of the last step (see integrators.BlockTimesteps), which are wrong if anything besides the positions changed them since
+		last = self.forceInputs
+		if last is None or not np.array_equal(last[0], slots) or not np.array_equal(last[1], mass):
+			self.integrator.invalidate() #bodies came or went, or a mass changed, so every force is different
+		elif not np.array_equal(last[2], extra):
+			self.integrator.invalidate(np.any(extra != last[2], axis=1)) #eg the craft started or stopped thrusting
+		self.forceInputs = (slots, mass, extra)
+		#the test particles are picked once per step, so that a body can't change between being a source and not part way through one
+		sources = gravity.heavyBodies(mass, self.testParticleRatio)
+		if sources is not None:
+			timer.count("testParticles", len(slots) - len(sources))
+		#the potential energy is picked up from the call that the integrator says is on the path of every body, instead of working it out again
+		energyCall = self.integrator.energyCall if self.conservation is not None else None
+		calls = [0]
+		captured = list()
+		#targets and freeFall are only used by integrators.BlockTimesteps
+		def acceleration(p, targets=None, freeFall=False):
+			timer.lap("integrate")
+			potential = energyCall is not None and energyCall in (calls[0], -1) and (targets is None or len(targets) == len(p))
+			calls[0] += 1
+			a = self.gravitationalAcceleration(p, mass, targets, freeFall, sources, potential)
+			timer.lap("gravity")
+			if potential:
+				captured[:] = [gravity.potentialEnergy(a[-1], mass, sources)]
+				a = a[:-1] if freeFall else a[0]
+			if freeFall:
+				return a[0] + (extra if targets is None else extra[targets]), a[1]
+			return a + (extra if targets is None else extra[targets])
+		startVel = vel.copy() if energyCall is not None else None
+		self.integrator.step(pos, vel, acceleration, changeTime)
+		b.pos[slots] = pos
+		b.vel[slots] = vel
+		if not captured:
+			return None
+		#the kinetic energy has to be taken at the same point of the step as the potential energy
+		fraction = self.integrator.energyTime
+		v = (1 - fraction)*startVel + fraction*vel
+		return 0.5*np.dot(mass, np.einsum('ij,ij->i', v, v)), captured[0], fraction
+
+	#moves every body along its Kepler orbit for as long as it safely can, up to maxTime; returns the time moved, a whole number of steps of changeTime, or 0 if the system has to be integrated instead
+	"""
+	the system can't coast while the craft is thrusting, while any body is pulled noticeably by more than one other body, or if any bodies could touch
+	exact moves it by exactly maxTime without checking that it is safe, to redo a skip from an input log
+	"""
+	def coast(self, changeTime, maxTime, exact=False):
+		b = self.bodies
+		if self.craft is not None and b.alive[self.craft] and self.burnRate > 0 and b.fuel[self.craft] > 0:
+			self.coastReason = "the craft is thrusting"
+			return 0
+		if len(self.debris):
+			self.coastReason = "there is debris"
+			return 0
+		slots = b.active()
+		if len(slots) < 2:
+			return 0
+		pos, vel, mass, radius = b.pos[slots], b.vel[slots], b.mass[slots], b.radius[slots]
+		hierarchy = kepler.Hierarchy(pos, vel, mass, self.coastTolerance)
+		if exact:
+			coastTime = maxTime
+		else:
+			coastTime = changeTime*math.floor(hierarchy.safeTime(pos, vel, mass, radius, maxTime, self.coastFraction)/changeTime)
+		self.coastReason = hierarchy.reason
+		if coastTime < 2*changeTime:
+			self.nextCoast = self.steps + self.coastRetry
+			return 0
+		b.pos[slots], b.vel[slots] = hierarchy.propagate(pos, vel, mass, coastTime)
+		self.coastedTime += coastTime
+		return coastTime
+
+	#moves the simulation forward by one step and returns the simulated time it moved forward by
+	"""
+	maxTime is the most time the step may skip ahead by if fastForward is on and the system is coasting; it is only ever a single step of changeTime if maxTime is None
+	coastTime makes the step skip ahead along Kepler orbits by exactly that much, whether or not fastForward is on; it is used to replay input logs
+	"""
+	def step(self, changeTime, maxTime=None, coastTime=None):
+		#inputs are only ever applied between steps, so that a run can be replayed exactly
+		while self.inputs:
+			name, arguments = self.inputs.popleft()
+			self.applyInput(name, **arguments)
+
+		#collisions are handled before the forces to try to stop singularities from happening
+		self.timer.begin()
+		self.collide()
+		self.timer.lap("collide")
+		slots = self.bodies.active()
+		start = self.bodies.pos[slots]
+		thrusting = self.hasCraft() and self.burnRate > 0 and self.bodies.fuel[self.craft] > 0
+		energy = None
+		moved = 0
+		if coastTime is not None:
+			moved = self.coast(changeTime, coastTime, exact=True)
+			self.timer.lap("coast")
+		elif self.fastForward and maxTime is not None and maxTime >= 2*changeTime and self.steps >= self.nextCoast:
+			moved = self.coast(changeTime, maxTime)
+			self.timer.lap("coast")
+		if moved == 0:
+			energy = self.integrate(changeTime)
+			self.timer.lap("integrate")
+			if self.continuousCollisions:
+				self.sweep(slots, start, changeTime)
+				self.timer.lap("sweep")
+			moved = changeTime
+		if len(self.debris):
+			self.moveDebris(slots, start, moved)
+			self.timer.lap("debris")
+		if self.inputLog is not None:
+			self.inputLog.stepped(self, changeTime, moved)
+		self.t += moved
+		self.steps += 1
+		if self.conservation is not None:
+			#thrust, sticking, breaking up, debris (which isn't counted) and inputs all change the totals on purpose
+			rebase = self.disturbed or thrusting or len(self.joins) > 0 or len(self.shattered) > 0 or len(self.debris) > 0
+			self.recordConservation(moved, energy, rebase)
+			self.timer.lap("conservation")
+		self.disturbed = False
+		if self.testParticleRatio > 0 and self.steps % self.droppedForceInterval == 0:
+			self.measureDroppedForce()
+			self.timer.lap("droppedForce")
+		if self.treeGravity and self.steps % self.droppedForceInterval == 0:
+			self.measureTreeError()
+			self.timer.lap("treeError")
+		self.timer.end()
+		return moved
+
+	#adds a sample of the totals of the system to the conservation monitor, at the end of a step
+	"""
+	moved is the time the step moved forward by
+	energy is the (kinetic energy, potential energy, fraction of the step) returned by integrate, or None to work out the energies again from the state at the end of the step, eg after coasting
+	rebase is true if something changed the totals on purpose during the step
+	"""
+	def recordConservation(self, moved, energy, rebase):
+		b = self.bodies
+		slots = b.active()
+		pos, vel, mass = b.pos[slots], b.vel[slots], b.mass[slots]
+		if energy is None:
+			sources = gravity.heavyBodies(mass, self.testParticleRatio)
+			phi = self.gravitationalAcceleration(pos, mass, sources=sources, potential=True)[-1]
+			energy = (0.5*np.dot(mass, np.einsum('ij,ij->i', vel, vel)), gravity.potentialEnergy(phi, mass, sources), 1)
+			fused = False
+		else:
+			fused = True
+		kinetic, potential, fraction = energy
+		self.conservation.record(self.steps, self.t - (1 - fraction)*moved, kinetic, potential, pos, vel, mass, rebase, fused)
+
+	#adds an input to be applied at the start of the next step; safe to call from any thread
+	"""
+	name is one of inputMethods, eg "fire", and arguments are passed on to its method, eg radius=1e5
+	"""
+	def queueInput(self, name, **arguments):
+		if name not in inputMethods:
+			raise ValueError("unknown input: %s" % name)
+		self.inputs.append((name, arguments))
+
+	#applies an input straight away and writes it to the input log; only call it between steps, eg while holding the lock that the physics thread steps under
+	"""
+	returns whatever the input's method returns, eg the slot of a fired projectile
+	"""
+	def applyInput(self, name, **arguments):
+		if name not in inputMethods:
+			raise ValueError("unknown input: %s" % name)
+		result = getattr(self, inputMethods[name])(**arguments)
+		self.disturbed = True
+		if self.inputLog is not None:
+			self.inputLog.add(self, name, arguments)
+		return result
+
+	#returns true if there is a craft that hasn't been destroyed
+	def hasCraft(self):
+		return self.craft is not None and self.bodies.alive[self.craft]
+
+	#kg of fuel burnt per second
+	def setBurnRate(self, value):
+		self.burnRate = value
+
+	def setExhaustSpeed(self, value):
+		self.exhaustSpeed = value
+
+	#turns the craft left and up by angles in radians, the same way as things.Craft.turnLeft and turnUp; returns the new forward direction
+	def turn(self, left=0, up=0):
+		if not self.hasCraft():
+			return None
+		b = self.bodies
+		forward = b.forward[self.craft]
+		#starts again from the default left if the craft has been pointed somewhere else since it last turned
+		if self.left is None or abs(np.dot(self.left, forward)) > 1e-6*math.sqrt(np.dot(forward, forward)*np.dot(self.left, self.left)):
+			self.left = leftOf(forward)
+		if left != 0:
+			axis = np.cross(forward, self.left)
+			forward = rotate(forward, left, axis)
+			self.left = rotate(self.left, left, axis)
+		if up != 0:
+			forward = rotate(forward, -up, self.left)
+		b.forward[self.craft] = forward
+		return forward
+
+	#points the craft in the direction forward, eg after the GUI has turned it with its shapes
+	def aim(self, forward):
+		if self.hasCraft():
+			self.bodies.forward[self.craft] = forward
+
+	#adds amount kg of fuel to the craft
+	def refuel(self, amount):
+		if self.hasCraft():
+			self.bodies.fuel[self.craft] += amount
+			self.bodies.mass[self.craft] += amount
+
+	def reload(self, amount=10):
+		self.ammo += amount
+
+	#places the craft back at the origin, at rest
+	def recentre(self):
+		if self.hasCraft():
+			self.bodies.pos[self.craft] = 0
+			self.bodies.vel[self.craft] = 0
+
+	#removes every projectile and all of the debris; returns the number of projectiles removed
+	def clearProjectiles(self):
+		b = self.bodies
+		removed = 0
+		for slot in b.active():
+			if b.names[slot] == "projectile":
+				b.remove(slot)
+				removed += 1
+		self.debris.clear()
+		return removed
+
+	#fires a projectile from the front of the craft and returns its slot, or None if the craft is out of ammo or there is no craft
+	def fire(self, radius, mass, speed, collisionType="elastic"):
+		if self.ammo <= 0 or self.craft is None:
+			return None
+		self.ammo -= 1
+		b = self.bodies
+		forward = b.forward[self.craft]/math.sqrt(collisions.dot(b.forward[self.craft], b.forward[self.craft]))
+		position = b.pos[self.craft] + (2*radius + 2*b.radius[self.craft])*forward #start position is further away
+		velocity = speed*forward + b.vel[self.craft]
+		slot = b.add(position, velocity, mass, radius, collisionType, "projectile", forward)
+		#the craft recoils
+		b.vel[self.craft] = (b.vel[self.craft]*b.mass[self.craft] - velocity*mass)/b.mass[self.craft]
+		return slot
+
+#adds the craft and two planets that the simulation starts with; returns the slot of the craft
+def addStartBodies(bodySet, craftMass=30e3, fuel=1e4):
+	craft = bodySet.add((0, 0, 6e7), (0, 0, 0), craftMass + fuel, 50, "elastic", "craft", (0, 0, -1), fuel)
+	bodySet.add((0, 0, 0), (0, 0, 0), .9*c.massEarth, c.radiusEarth, "elastic", "earth1", (1, 0, 0))
+	bodySet.add((2e7, 5e7, 0), (0, 0, 3e3), c.massEarth, c.radiusEarth, "elastic", "earth2", (1, 0, 0))
+	return craft
+
+#adds the options that set up an engine and its bodies to an argparse parser; shared with the simulation server
+def addEngineArguments(parser):
+	parser.add_argument("--dt", type=float, default=60, help="step size, in seconds")
+	parser.add_argument("--integrator", choices=sorted(integrators.integratorTypes), default="leapfrog")
+	parser.add_argument("--tree", action="store_true", help="use Barnes-Hut gravity")
+	parser.add_argument("--no-ccd", action="store_true", help="only check for collisions at the end of each step, so fast bodies can pass through each other")
+	parser.add_argument("--theta", type=float, default=0.5, help="opening angle for Barnes-Hut gravity")
+	parser.add_argument("--fragmentation", action="store_true", help="let bodies break up into debris when they are hit hard enough")
+	parser.add_argument("--fast-forward", action="store_true", help="skip ahead along Kepler orbits while the system is only coasting")
+	parser.add_argument("--workers", type=int, default=0, help="number of processes to split exact gravity across; 0 uses this one only")
+	parser.add_argument("--test-particles", type=float, default=0, help="bodies lighter than this fraction of the heaviest body feel gravity but don't pull on anything, eg 1e-9")
+	parser.add_argument("--burn-rate", type=float, default=0, help="fuel burnt per second by the craft, kg/s")
+	parser.add_argument("--exhaust-speed", type=float, default=60000, help="exhaust speed of the craft, m/s")
+	parser.add_argument("--projectile-radius", type=float, default=.05*c.radiusEarth)
+	parser.add_argument("--projectile-mass", type=float, default=10)
+	parser.add_argument("--projectile-speed", type=float, default=15000)
+	parser.add_argument("--collision-type", choices=sorted(bodies.collisionCodes), default="elastic", help="collision type of the projectiles")
+	parser.add_argument("--scenario", default=None, help="json file with the bodies to start with, eg scenarios/belt.json; the craft and two planets of the GUI are used if it is not given")
+	parser.add_argument("--profile", default=None, help="file to write the time taken by each phase to, every second; json, or csv if it ends in .csv")
+	parser.add_argument("--conservation", action="store_true", help="keep track of the energy, momentum and angular momentum every step, and warn if they drift")
+
+#returns an engine set up from the options added by addEngineArguments, with its bodies already added
+def makeEngine(args):
+	engine = Engine(integrator=integrators.integratorTypes[args.integrator](), treeGravity=args.tree, openingAngle=args.theta, continuousCollisions=not args.no_ccd, testParticleRatio=args.test_particles, workers=args.workers, fastForward=args.fast_forward, fragmentation=args.fragmentation,
+		conservation=args.conservation)
+	if args.scenario is not None:
+		start = time.time()
+		startScenario = scenario.load(args.scenario)
+		engine.craft = startScenario.addCraft(engine.bodies)
+		if startScenario.craft is not None:
+			engine.ammo = startScenario.craft["ammo"]
+		startScenario.populate(engine.bodies)
+		print("loaded %i bodies in %.3f s" % (len(engine.bodies), time.time() - start))
+	else:
+		engine.craft = addStartBodies(engine.bodies)
+	engine.burnRate = args.burn_rate
+	engine.exhaustSpeed = args.exhaust_speed
+	engine.timer.setEnabled(args.profile is not None)
+	return engine
+
+#runs the simulation from the command line and reports how long it took
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Runs the spaceship simulation without any graphics and reports how long it took")
+	parser.add_argument("--steps", type=int, default=1000, help="number of steps to run")
+	parser.add_argument("--time", type=float, default=None, help="simulated seconds to run; overrides --steps")
+	parser.add_argument("--fire", type=int, default=0, help="number of projectiles to fire, one per step")
+	parser.add_argument("--record", default=None, help="file to save every step to, for playback in spaceshipSimulation.py")
+	parser.add_argument("--input-log", default=None, help="file to save the seed and inputs of the run to, for replaying exactly with inputLog.py")
+	parser.add_argument("--seed", type=int, default=0, help="seed for the random numbers")
+	parser.add_argument("--conservation-csv", default=None, help="file to write the energy and momentum of every step to, with --conservation")
+	addEngineArguments(parser)
+	args = parser.parse_args(argv)
+
+	engine = makeEngine(args)
+	engine.ammo = args.fire
+	engine.reseed(args.seed)
+	inputs = None
+	if args.input_log is not None:
+		import inputLog #imported here since it imports this module
+		inputs = inputLog.InputLog(args.scenario, args.seed)
+		inputs.begin(engine)
+	steps = args.steps
+	if args.time is not None:
+		steps = int(math.ceil(args.time/args.dt))
+
+	recorder = None
+	if args.record is not None:
+		recorder = recording.Recorder(args.record)
+		recorder.record(engine.bodies, engine.t, engine.steps)
+
+	start = time.time()
+	end = steps*args.dt
+	k = 0
+	while engine.t < end - args.dt/2:
+		if k < args.fire:
+			engine.applyInput("fire", radius=args.projectile_radius, mass=args.projectile_mass, speed=args.projectile_speed, collisionType=args.collision_type)
+		engine.step(args.dt, end - engine.t if args.fast_forward else None)
+		k += 1
+		if recorder is not None:
+			recorder.record(engine.bodies, engine.t, engine.steps)
+	if recorder is not None:
+		recorder.close()
+	if inputs is not None:
+		inputs.end(engine)
+		inputs.save(args.input_log)
+	wallTime = time.time() - start
+
+	print("steps: %i" % engine.steps)
+	print("simulated time: %g s" % engine.t)
+	print("wall time: %.3f s" % wallTime)
+	if recorder is not None and recorder.dropped:
+		print("recording: dropped %i of %i steps because the disk fell behind" % (recorder.dropped, recorder.recorded))
+	print("steps per second: %.1f" % (engine.steps/wallTime if wallTime > 0 else float("inf")))
+	print("bodies: %i" % len(engine.bodies))
+	print("collisions: %i" % engine.collisionCount)
+	if args.fragmentation:
+		print("debris: %i fragments, %g kg" % (len(engine.debris), engine.debris.totalMass()))
+	if args.fast_forward:
+		print("time skipped along Kepler orbits: %g s" % engine.coastedTime)
+		if engine.coastReason is not None:
+			print("last reason for not coasting: %s" % engine.coastReason)
+	if engine.craft is not None:
+		print("craft position: %s m" % engine.bodies.pos[engine.craft])
+	if args.test_particles > 0:
+		dropped = engine.measureDroppedForce()
+		print("test particles: %i" % dropped["testParticles"])
+		print("dropped gravity: largest %.3g%% (%.3g m/s^2), average %.3g%% of the full pull" % (100*dropped["maxError"], dropped["maxDropped"], 100*dropped["meanError"]))
+	if args.tree:
+		treeError = engine.measureTreeError()
+		print("tree gravity error (theta %g): largest %.3g%%, average %.3g%% of the exact pull" % (treeError["theta"], 100*treeError["maxError"], 100*treeError["meanError"]))
+	if args.workers > 0:
+		speedup = engine.measureSpeedup()
+		print("gravity with %i workers: %.3f s vs %.3f s in one process (%.2fx)" % (speedup["workers"], speedup["parallelSeconds"], speedup["singleSeconds"], speedup["speedup"]))
+	if engine.conservation is not None:
+		for line in engine.conservation.describe():
+			print(line)
+		if args.conservation_csv is not None:
+			engine.conservation.writeCSV(args.conservation_csv)
+	engine.close()
+	if args.profile is not None:
+		engine.timer.sample() #includes the last part of a second
+		for line in engine.timer.describe():
+			print(line)
+		if args.profile.endswith(".csv"):
+			engine.timer.writeCSV(args.profile)
+		else:
+			profiling.writeJSON(args.profile, [engine.timer])
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,113 @@
+"""
+This calculates the gravitational pull of every body on every other body at once, using NumPy broadcasting instead of a Python loop over pairs.
+The pair-by-pair calculation with Thing.gravForce is kept as a reference so that the two can be compared.
+"""
+
+from __future__ import division #does fun stuff
+import numpy as np
+
+import constants as c #gives useful physics constants
+
+#number of rows of the separation matrix that are built at once; keeps memory bounded for large numbers of bodies
+blockSize = 256
+
+#returns the acceleration of every body due to the gravity of all of the others
+"""
+pos is an (N, 3) array of positions
+mass is an array of the N masses
+softening is a length added in quadrature to every separation; it keeps close passes from producing huge accelerations
+targets is an optional array of indices; if it is given, only the accelerations of those bodies are calculated and returned
+freeFall also returns, for every target, the shortest free-fall time sqrt(d^3/(G*(m1 + m2))) to any other body, as a second array
+sources is an optional array of indices of the bodies whose pull is added up; the rest are test particles, which feel gravity but don't pull on anything
+potential also returns the gravitational potential -G*sum(m/d) at every target, as a last array; it reuses the distances of the force calculation, so it costs little more than the accelerations alone
+Bodies at exactly the same point exert no force on each other, so no random nudge is needed to avoid dividing by zero
+"""
+def accelerations(pos, mass, softening=0, G=c.gravitationalConstant, targets=None, freeFall=False, sources=None, potential=False):
+	pos = np.asarray(pos, dtype=float)
+	mass = np.asarray(mass, dtype=float)
+	targetPos = pos if targets is None else pos[targets]
+	targetMass = mass if targets is None else mass[targets]
+	if sources is not None:
+		pos = pos[sources]
+		mass = mass[sources]
+	acc = np.zeros(targetPos.shape)
+	pull = np.zeros(len(targetPos)) #largest (m1 + m2)/d^3 of each target
+	phi = np.zeros(len(targetPos))
+	for start in range(0, len(targetPos), blockSize):
+		stop = min(start + blockSize, len(targetPos))
+		sep = pos[np.newaxis, :, :] - targetPos[start:stop, np.newaxis, :] #sep[i, j] points from body i to body j
+		dist2 = np.einsum('ijk,ijk->ij', sep, sep) + softening**2
+		with np.errstate(divide='ignore'):
+			invDist3 = np.where(dist2 > 0, dist2**-1.5, 0)
+		acc[start:stop] = G*np.einsum('ij,ijk->ik', invDist3*mass[np.newaxis, :], sep)
+		if freeFall and len(pos):
+			pull[start:stop] = np.max(invDist3*(targetMass[start:stop, np.newaxis] + mass[np.newaxis, :]), axis=1)
+		if potential:
+			phi[start:stop] = -G*np.dot(invDist3*dist2, mass) #1/d^3*d^2 is 1/d
+	result = (acc,)
+	if freeFall:
+		with np.errstate(divide='ignore'):
+			result += (np.where(pull > 0, 1/np.sqrt(G*pull), np.inf),)
+	if potential:
+		result += (phi,)
+	return result[0] if len(result) == 1 else result
+
+#returns the total potential energy of a system from the potential at every body, eg from accelerations with potential=True
+"""
+sources are the bodies that pull on the others, as in accelerations; the pull between two sources is counted in the potential of both, so it is halved, but test particles are only counted once
+"""
+def potentialEnergy(phi, mass, sources=None):
+	if sources is None:
+		return np.dot(mass, phi)/2
+	weight = np.ones(len(mass))
+	weight[sources] = 0.5
+	return np.dot(weight*mass, phi)
+
+#returns the indices of the bodies that are at least ratio times as heavy as the heaviest body; the rest can be treated as test particles
+"""
+returns None, meaning every body, if ratio is 0
+"""
+def heavyBodies(mass, ratio):
+	if ratio <= 0 or len(mass) == 0:
+		return None
+	return np.flatnonzero(mass >= ratio*np.max(mass))
+
+#measures how much gravity is lost by treating every body that isn't in sources as a test particle
+"""
+sample is the number of test particles to check; every source is always checked, since there are usually few of them and they are what the test particles orbit
+returns a dictionary with the number of test particles, the largest and average dropped acceleration relative to the full acceleration, and the largest dropped acceleration in m/s^2
+"""
+def droppedForce(pos, mass, sources, softening=0, G=c.gravitationalConstant, sample=256):
+	pos = np.asarray(pos, dtype=float)
+	report = {"testParticles": 0, "maxError": 0., "meanError": 0., "maxDropped": 0.}
+	if sources is None or len(pos) == 0:
+		return report
+	light = np.setdiff1d(np.arange(len(pos)), sources)
+	report["testParticles"] = len(light)
+	if sample is not None and sample < len(light):
+		light = np.random.RandomState(0).choice(light, sample, replace=False)
+	targets = np.concatenate([sources, light])
+	exact = accelerations(pos, mass, softening, G, targets=targets)
+	approx = accelerations(pos, mass, softening, G, targets=targets, sources=sources)
+	dropped = np.sqrt(np.sum((approx - exact)**2, axis=1))
+	size = np.sqrt(np.sum(exact**2, axis=1))
+	relError = dropped/np.where(size > 0, size, 1)
+	report.update(maxError=np.max(relError), meanError=np.mean(relError), maxDropped=np.max(dropped))
+	return report
+
+#returns the accelerations of a list of things using the original pair-by-pair Thing.gravForce calculation
+def referenceAccelerations(objects):
+	force = np.zeros((len(objects), 3))
+	for i in range(0, len(objects)):
+		for j in range(i, len(objects)):
+			if(i != j):
+				forceij = objects[i].gravForce(objects[j])
+				force[i] += (forceij[0], forceij[1], forceij[2])
+				force[j] -= (forceij[0], forceij[1], forceij[2])
+	return force/np.array([o.getMass() for o in objects])[:, np.newaxis]
+
+#returns the largest error of a set of accelerations relative to the exact ones, as a fraction of the size of the exact acceleration
+def maxRelativeError(acc, exact):
+	error = np.sqrt(np.sum((acc - exact)**2, axis=1))
+	size = np.sqrt(np.sum(exact**2, axis=1))
+	return np.max(error/np.where(size > 0, size, 1)) if len(exact) else 0.
@@ -0,0 +1,210 @@
+"""
+This keeps a run as the scenario it started from, a random seed and the handful of inputs that steered it, instead of the state of every body at every step, so that a long run takes a few KB instead of gigabytes.
+Inputs (thrust, turning, firing, refuelling, ...; see engine.inputMethods) are only applied by the Engine between steps, and are logged with the number of the step that they came before. Replaying the log with the same settings redoes the run bit for bit, as fast as the physics can go.
+The step size and any skips along Kepler orbits are logged as well, since they depend on how fast the computer was running when the run was made.
+A log is a json file:
+	{"scenario": "scenarios/default.json", "seed": 0, "settings": {...}, "startTime": 0, "inputs": [[step, name, arguments], ...], "steps": 1000, "startDigest": "...", "endDigest": "..."}
+The digests are hashes of the whole state at the start and end of the run, so that a replay can tell if it came out the same.
+Replays remake the integrator with its default settings.
+"""
+
+from __future__ import division #does fun stuff
+import argparse
+import hashlib
+import json
+import sys
+import time
+import numpy as np
+
+import engine as physicsEngine #the physics, without any graphics
+import integrators #moves the bodies forward in time
+import scenario #reads starting states from files
+
+#settings of an Engine that change how a run comes out, besides the ones passed to its constructor
+engineAttributes = ("coastTolerance", "shatterStrength", "minRemnant", "fragmentsPerBreakup", "kickFraction", "burnRate", "exhaustSpeed", "ammo")
+
+#returns a hash of the state of an engine: every slot, the debris, the controls of the craft and the time
+def digest(sim):
+	b = sim.bodies
+	n = b.count
+	m = len(sim.debris)
+	h = hashlib.sha1()
+	for a in (b.pos[:n], b.vel[:n], b.forward[:n], b.mass[:n], b.radius[:n], b.fuel[:n], b.collisionType[:n], b.alive[:n],
+			sim.debris.pos[:m], sim.debris.vel[:m], sim.debris.mass[:m], np.array([sim.t, sim.burnRate, sim.exhaustSpeed, sim.ammo], dtype=float)):
+		h.update(np.ascontiguousarray(a).tobytes())
+	return h.hexdigest()
+
+#returns the settings of an engine that a replay needs to match
+def settingsOf(sim):
+	settings = {
+		"integrator": [name for name, kind in integrators.integratorTypes.items() if type(sim.integrator) is kind][0],
+		"treeGravity": sim.treeGravity,
+		"openingAngle": sim.openingAngle,
+		"continuousCollisions": sim.continuousCollisions,
+		"testParticleRatio": sim.testParticleRatio,
+		"workers": 0 if sim.parallel is None else sim.parallel.workers, #changes the order that gravity is added up in
+		"fragmentation": sim.fragmentation,
+	}
+	for key in engineAttributes:
+		settings[key] = getattr(sim, key)
+	return settings
+
+#returns value as something that json can save, eg a list instead of a numpy array
+def plain(value):
+	if hasattr(value, "tolist"):
+		return value.tolist()
+	return value
+
+#the inputs of one run
+class InputLog(object):
+	#constructor
+	"""
+	scenarioPath is the scenario file that the run starts from, or None for the bodies of engine.addStartBodies
+	seed is the seed that the engine is given when the log begins
+	"""
+	def __init__(self, scenarioPath=None, seed=0):
+		self.scenarioPath = scenarioPath
+		self.seed = seed
+		self.settings = dict()
+		self.startTime = 0
+		self.inputs = list() #[step, name, arguments], in the order they were applied
+		self.steps = 0 #number of steps logged
+		self.startDigest = None
+		self.endDigest = None
+		self.firstStep = 0 #value of the engine's step count when the log began
+		self.dt = None #step size of the last step logged
+
+	#starts logging the inputs of sim, which should just have had the bodies of the scenario put in it; reseeds it
+	def begin(self, sim):
+		sim.reseed(self.seed)
+		sim.left = None
+		self.settings = settingsOf(sim)
+		self.startTime = sim.t
+		self.firstStep = sim.steps
+		self.inputs = list()
+		self.steps = 0
+		self.dt = None
+		self.startDigest = digest(sim)
+		self.endDigest = None
+		sim.inputLog = self
+
+	#called by the engine for every input it applies
+	def add(self, sim, name, arguments):
+		self.inputs.append([sim.steps - self.firstStep, name, dict((key, plain(value)) for key, value in arguments.items())])
+
+	#called by the engine at the end of every step, before it counts the step
+	def stepped(self, sim, changeTime, moved):
+		step = sim.steps - self.firstStep
+		if changeTime != self.dt:
+			self.dt = changeTime
+			self.inputs.append([step, "dt", {"value": changeTime}])
+		if moved != changeTime:
+			self.inputs.append([step, "coast", {"time": moved}])
+		self.steps = step + 1
+
+	#stops logging and notes the state that the run ended in
+	def end(self, sim):
+		self.endDigest = digest(sim)
+		if sim.inputLog is self:
+			sim.inputLog = None
+
+	def save(self, path):
+		data = {
+			"scenario": self.scenarioPath,
+			"seed": self.seed,
+			"settings": self.settings,
+			"startTime": self.startTime,
+			"inputs": self.inputs,
+			"steps": self.steps,
+			"startDigest": self.startDigest,
+			"endDigest": self.endDigest,
+		}
+		with open(path, "w") as f:
+			json.dump(data, f)
+
+#reads a log from a json file
+def load(path):
+	with open(path) as f:
+		data = json.load(f)
+	log = InputLog(data["scenario"], data["seed"])
+	log.settings = data["settings"]
+	log.startTime = data["startTime"]
+	log.inputs = data["inputs"]
+	log.steps = data["steps"]
+	log.startDigest = data["startDigest"]
+	log.endDigest = data["endDigest"]
+	return log
+
+#returns an engine in the state that the run of a log started in
+def makeEngine(log):
+	s = log.settings
+	sim = physicsEngine.Engine(integrator=integrators.integratorTypes[s["integrator"]](), treeGravity=s["treeGravity"], openingAngle=s["openingAngle"], continuousCollisions=s["continuousCollisions"],
+		testParticleRatio=s["testParticleRatio"], workers=s["workers"], fragmentation=s["fragmentation"], seed=log.seed)
+	for key in engineAttributes:
+		setattr(sim, key, s[key])
+	if log.scenarioPath is None:
+		sim.craft = physicsEngine.addStartBodies(sim.bodies)
+	else:
+		startScenario = scenario.load(log.scenarioPath)
+		sim.craft = startScenario.addCraft(sim.bodies)
+		startScenario.populate(sim.bodies)
+	sim.t = log.startTime
+	return sim
+
+#redoes the run of a log on a new engine and returns the engine
+"""
+steps is the number of steps to replay; the whole log if it is None
+"""
+def replay(log, steps=None, sim=None):
+	if sim is None:
+		sim = makeEngine(log)
+	if steps is None:
+		steps = log.steps
+	dt = None
+	i = 0
+	for k in range(0, steps):
+		coastTime = None
+		while i < len(log.inputs) and log.inputs[i][0] == k:
+			step, name, arguments = log.inputs[i]
+			i += 1
+			if name == "dt":
+				dt = arguments["value"]
+			elif name == "coast":
+				coastTime = arguments["time"]
+			else:
+				sim.applyInput(name, **arguments)
+		sim.step(dt, coastTime=coastTime)
+	return sim
+
+#replays a log from the command line and checks that it came out the same
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Replays a run from its input log, without any graphics, and checks that it ends in the same state; logs are made by spaceshipSimulation.py or engine.py --input-log")
+	parser.add_argument("log", help="input log to replay, eg inputs.json")
+	parser.add_argument("--steps", type=int, default=None, help="number of steps to replay; the whole log if it isn't given")
+	args = parser.parse_args(argv)
+
+	log = load(args.log)
+	sim = makeEngine(log)
+	if digest(sim) != log.startDigest:
+		print("warning: the scenario doesn't start in the same state as when the log was made")
+	start = time.time()
+	replay(log, args.steps, sim)
+	wallTime = time.time() - start
+	print("steps: %i" % sim.steps)
+	print("simulated time: %g s" % sim.t)
+	print("wall time: %.3f s" % wallTime)
+	print("inputs: %i" % sum(1 for entry in log.inputs if entry[1] not in ("dt", "coast")))
+	if args.steps is None or args.steps == log.steps:
+		if log.endDigest is None:
+			print("the log wasn't ended, so there is nothing to check the replay against")
+		elif digest(sim) == log.endDigest:
+			print("the replay ended in exactly the same state")
+		else:
+			print("the replay ended in a different state")
+			sim.close()
+			return 1
+	sim.close()
+	return 0
+
+if __name__ == "__main__":
+	sys.exit(main())
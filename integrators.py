@@ -0,0 +1,274 @@
+"""
+This moves bodies forward in time, given a function that calculates their accelerations.
+Every integrator has the same step method, so the simulation can switch between them:
+	SemiImplicitEuler is what Thing.autoMove always did; it is cheap but only first order
+	Leapfrog (drift-kick-drift, the same scheme as velocity Verlet) is second order and symplectic, so energy errors stay bounded instead of drifting
+	Yoshida is a fourth order symplectic method built out of three leapfrog steps
+	RK4 is the classic fourth order Runge-Kutta method; it is accurate but not symplectic
+	Adaptive wraps any of the others and splits each step into substeps that are as large as possible while keeping the estimated error below a tolerance
+	BlockTimesteps gives every body its own step size, a power of two fraction of the step, so that only the bodies in close encounters are stepped finely
+"""
+
+from __future__ import division #does fun stuff
+import numpy as np
+
+#base class for integrators
+class Integrator(object):
+	name = "integrator"
+	order = 1 #order of accuracy; used by Adaptive to pick the next step size
+	#which call of accel during a step is made at positions on the path of the bodies, for every body, and at what fraction of the step; -1 is the last call
+	#the conservation checks take the potential energy from that call instead of working it out again; None means no call is suitable
+	energyCall = None
+	energyTime = None
+
+	#moves the bodies forward by changeTime
+	"""
+	pos and vel are (N, 3) arrays of positions and velocities; they are updated in place
+	accel is a function that takes an (N, 3) array of positions and returns the (N, 3) accelerations
+	changeTime is the amount of time to move forward by
+	returns the number of times accel was called, which is most of the cost of a step
+	"""
+	def step(self, pos, vel, accel, changeTime):
+		raise NotImplementedError()
+
+	#forgets anything kept from earlier steps, eg when the simulation is reset, so that the next step is the same as the first step of a new integrator
+	def reset(self):
+		pass
+
+	#forgets the accelerations kept from the last step for the bodies that are true in stale, or for every body if it is None
+	#called when something besides the positions changed the forces since the last step, eg a mass or the thrust
+	def invalidate(self, stale=None):
+		pass
+
+#the original integrator: update the velocity, then use the new velocity to update the position
+class SemiImplicitEuler(Integrator):
+	name = "euler"
+	order = 1
+	energyCall = 0
+	energyTime = 0
+
+	def step(self, pos, vel, accel, changeTime):
+		vel += accel(pos)*changeTime
+		pos += vel*changeTime
+		return 1
+
+#second order symplectic integrator; needs one acceleration per step, like Euler
+class Leapfrog(Integrator):
+	name = "leapfrog"
+	order = 2
+	energyCall = 0
+	energyTime = 0.5 #the kick is at the middle of the step, where the velocity is the average of the old and new ones
+
+	def step(self, pos, vel, accel, changeTime):
+		pos += vel*(changeTime/2)
+		vel += accel(pos)*changeTime
+		pos += vel*(changeTime/2)
+		return 1
+
+#fourth order symplectic integrator made of three leapfrog steps of carefully chosen sizes
+class Yoshida(Integrator):
+	name = "yoshida"
+	order = 4
+	w1 = 1/(2 - 2**(1/3))
+	w0 = -2**(1/3)/(2 - 2**(1/3))
+	drifts = (w1/2, (w0 + w1)/2, (w0 + w1)/2, w1/2)
+	kicks = (w1, w0, w1)
+
+	def step(self, pos, vel, accel, changeTime):
+		for i in range(0, 3):
+			pos += vel*(Yoshida.drifts[i]*changeTime)
+			vel += accel(pos)*(Yoshida.kicks[i]*changeTime)
+		pos += vel*(Yoshida.drifts[3]*changeTime)
+		return 3
+
+#classic fourth order Runge-Kutta
+class RK4(Integrator):
+	name = "rk4"
+	order = 4
+	energyCall = 0
+	energyTime = 0
+
+	def step(self, pos, vel, accel, changeTime):
+		h = changeTime
+		k1x = vel.copy()
+		k1v = accel(pos)
+		k2x = vel + k1v*(h/2)
+		k2v = accel(pos + k1x*(h/2))
+		k3x = vel + k2v*(h/2)
+		k3v = accel(pos + k2x*(h/2))
+		k4x = vel + k3v*h
+		k4v = accel(pos + k3x*h)
+		pos += (k1x + 2*k2x + 2*k3x + k4x)*(h/6)
+		vel += (k1v + 2*k2v + 2*k3v + k4v)*(h/6)
+		return 4
+
+#takes substeps with another integrator, choosing their size from an estimate of the error
+"""
+The error is estimated by step doubling: one step of size h is compared with two steps of size h/2.
+The error of a substep is the difference between the two, relative to how far the body moved; the largest one over all of the bodies must be below tolerance.
+The last accepted substep size is remembered, so smooth motion quickly settles on large substeps.
+"""
+class Adaptive(Integrator):
+	name = "adaptive"
+
+	#constructor
+	"""
+	base is the integrator used for each substep
+	tolerance is the largest relative error allowed per substep
+	minStep is the smallest substep allowed, in seconds; substeps are not made smaller than this even if the error is too big
+	"""
+	def __init__(self, base=None, tolerance=1e-6, minStep=1e-3):
+		if base is None:
+			base = Leapfrog()
+		self.base = base
+		self.order = base.order
+		self.tolerance = tolerance
+		self.minStep = minStep
+		self.lastStep = None
+
+	def reset(self):
+		self.lastStep = None
+		self.base.reset()
+
+	def invalidate(self, stale=None):
+		self.base.invalidate(stale)
+
+	#returns the estimated error of a step, relative to how far the bodies moved
+	def error(self, start, coarse, fine):
+		moved = np.sqrt(np.sum((fine - start)**2, axis=1))
+		scale = moved + 1e-12*(np.sqrt(np.sum(start**2, axis=1)) + 1)
+		return np.max(np.sqrt(np.sum((coarse - fine)**2, axis=1))/scale) if len(start) else 0.
+
+	def step(self, pos, vel, accel, changeTime):
+		remaining = changeTime
+		h = changeTime if self.lastStep is None else self.lastStep
+		evaluations = 0
+		while remaining > 0:
+			substep = min(h, remaining)
+			coarsePos = pos.copy()
+			coarseVel = vel.copy()
+			evaluations += self.base.step(coarsePos, coarseVel, accel, substep)
+			finePos = pos.copy()
+			fineVel = vel.copy()
+			evaluations += self.base.step(finePos, fineVel, accel, substep/2)
+			evaluations += self.base.step(finePos, fineVel, accel, substep/2)
+			err = self.error(pos, coarsePos, finePos)
+
+			#scales the next substep from the error; the local error of an order p method goes as h^(p+1)
+			if err > 0:
+				factor = min(4.0, max(0.2, 0.9*(self.tolerance/err)**(1/(self.order + 1))))
+			else:
+				factor = 4.0
+			newH = max(substep*factor, self.minStep)
+			if err <= self.tolerance or substep <= self.minStep:
+				pos[:] = finePos
+				vel[:] = fineVel
+				remaining -= substep
+				if remaining < 1e-12*changeTime:
+					remaining = 0
+				#a substep cut short by the end of the step says nothing bad about h
+				if substep < h:
+					newH = max(h, newH)
+			h = newH
+		self.lastStep = h
+		return evaluations
+
+#kick-drift-kick leapfrog where every body has its own step size of changeTime/2^level
+"""
+Time within the step is counted in ticks of changeTime/2^maxLevel. All of the bodies drift together from one tick where some body's own step ends to the next, but only the bodies whose own step ends get a new acceleration and a kick.
+A body's level is picked from the shortest free-fall time to any other body, which is small when it is close to something or is being pulled hard: its own step is at most eta times that.
+Levels can only change at the start of a body's own step. A body can go as fine as maxLevel at any of them, eg when it closes in on another body part way through the step, but it can only move to a coarser level when the tick lines up with the coarser step, so that every body ends the step at the same time.
+accel must take (pos, targets, freeFall) and return the accelerations of the targets and, when freeFall is true, their free-fall times as well; see gravity.accelerations.
+The accelerations and free-fall times at the end of a step are kept, and reused at the start of the next step for every body that hasn't been moved since.
+"""
+class BlockTimesteps(Integrator):
+	name = "block"
+	order = 2
+	energyCall = -1 #every body is kicked at the end of the step
+	energyTime = 1
+
+	#constructor
+	"""
+	eta is the largest fraction of its free-fall time that a body can move in one of its own steps
+	maxLevel is the finest level allowed, so the smallest step is changeTime/2^maxLevel
+	"""
+	def __init__(self, eta=0.01, maxLevel=8):
+		self.eta = eta
+		self.maxLevel = maxLevel
+		self.levels = np.zeros(0, dtype=int) #level of each body at the end of the last step
+		self.cachePos = None
+		self.cacheAcc = None
+		self.cacheFreeFall = None
+
+	def reset(self):
+		self.levels = np.zeros(0, dtype=int)
+		self.cachePos = None
+		self.cacheAcc = None
+		self.cacheFreeFall = None
+
+	def invalidate(self, stale=None):
+		if stale is None or self.cachePos is None or len(stale) != len(self.cachePos):
+			self.cachePos = None
+		else:
+			self.cachePos[stale] = np.nan #never equal to a position, so they are worked out again
+
+	#returns the level that each body would like to be at, given their free-fall times
+	def chooseLevels(self, freeFall, changeTime):
+		with np.errstate(divide='ignore'):
+			wanted = np.ceil(np.log2(changeTime/(self.eta*freeFall)))
+		return np.clip(wanted, 0, self.maxLevel).astype(int)
+
+	#returns the accelerations and free-fall times at the start of a step, reusing the ones from the end of the last step where possible
+	def startingAccelerations(self, pos, accel):
+		n = len(pos)
+		acc = np.zeros((n, 3))
+		freeFall = np.full(n, np.inf)
+		stale = np.ones(n, dtype=bool)
+		if self.cachePos is not None and len(self.cachePos) == n:
+			stale = np.any(pos != self.cachePos, axis=1)
+			acc[~stale] = self.cacheAcc[~stale]
+			freeFall[~stale] = self.cacheFreeFall[~stale]
+		targets = np.flatnonzero(stale)
+		if len(targets):
+			acc[targets], freeFall[targets] = accel(pos, targets, True)
+		return acc, freeFall, len(targets)
+
+	#returns the number of full accelerations that the step cost, since most calls only work out a few bodies
+	def step(self, pos, vel, accel, changeTime):
+		n = len(pos)
+		if n == 0:
+			return 0
+		acc, freeFall, evaluated = self.startingAccelerations(pos, accel)
+		levels = self.chooseLevels(freeFall, changeTime)
+		ticks = 2**self.maxLevel
+		h = changeTime/ticks
+		size = 2**(self.maxLevel - levels) #number of ticks in each body's own step
+		end = size.copy() #tick that each body's own step ends at
+		starting = np.arange(n)
+
+		s = 0
+		while s < ticks:
+			vel[starting] += acc[starting]*(size[starting]*h/2)[:, np.newaxis]
+			nextEnd = int(end.min())
+			pos += vel*((nextEnd - s)*h)
+			s = nextEnd
+			ending = np.flatnonzero(end == s)
+			acc[ending], freeFall[ending] = accel(pos, ending, True)
+			evaluated += len(ending)
+			vel[ending] += acc[ending]*(size[ending]*h/2)[:, np.newaxis]
+			if s < ticks:
+				#the next step of each body that just ended can be finer, or coarser if s lines up with the coarser step
+				aligned = self.maxLevel - int(np.log2(s & -s)) #coarsest level that lines up with tick s
+				starting = ending
+				levels[starting] = np.clip(self.chooseLevels(freeFall[starting], changeTime), aligned, self.maxLevel)
+				size[starting] = 2**(self.maxLevel - levels[starting])
+				end[starting] = s + size[starting]
+
+		self.levels = levels
+		self.cachePos = pos.copy()
+		self.cacheAcc = acc
+		self.cacheFreeFall = freeFall
+		return evaluated/n
+
+#integrators that can be picked by name
+integratorTypes = {"euler": SemiImplicitEuler, "leapfrog": Leapfrog, "yoshida": Yoshida, "rk4": RK4, "adaptive": Adaptive, "block": BlockTimesteps}
@@ -0,0 +1,280 @@
+"""
+This moves bodies along their Kepler orbits in closed form, so that a system that is only coasting can be skipped forward by a long time in one step.
+Orbits are solved with the universal variable formulation, which works the same way for elliptic, parabolic and hyperbolic orbits, for many bodies at once.
+Hierarchy decides whether a whole system can be treated as Kepler orbits: every body is pulled mostly by one other body (its primary), and what is left over (the perturbation) is small.
+Two bodies that are each other's primary are a binary, whose centre of mass moves in a straight line; every other body orbits its primary, which can itself be orbiting something else.
+A body whose primary is in a binary orbits the centre of mass of the binary instead, if that leaves a smaller perturbation, eg a craft far away from two planets that orbit each other.
+"""
+
+from __future__ import division #does fun stuff
+import math
+import numpy as np
+
+import constants as c #gives useful physics constants
+import broadPhase #finds the bodies that might be touching
+
+#number of rows of the separation matrix that are built at once
+blockSize = 256
+
+#returns the Stumpff functions C(z) and S(z), which turn the universal anomaly into positions
+def stumpff(z):
+	z = np.asarray(z, dtype=float)
+	C = np.empty(z.shape)
+	S = np.empty(z.shape)
+	small = np.abs(z) < 1e-6
+	pos = (z > 0) & ~small
+	neg = (z < 0) & ~small
+	root = np.sqrt(z[pos])
+	C[pos] = (1 - np.cos(root))/z[pos]
+	S[pos] = (root - np.sin(root))/root**3
+	root = np.sqrt(-z[neg])
+	C[neg] = (np.cosh(root) - 1)/-z[neg]
+	S[neg] = (np.sinh(root) - root)/root**3
+	#series expansions, since the closed forms lose all of their precision near 0
+	zs = z[small]
+	C[small] = 1/2 - zs/24 + zs**2/720
+	S[small] = 1/6 - zs/120 + zs**2/5040
+	return C, S
+
+#returns the positions and velocities of bodies after coasting for changeTime on Kepler orbits
+"""
+pos and vel are (K, 3) arrays of positions and velocities relative to what each body orbits
+mu is an array of the K gravitational parameters G*(m1 + m2)
+changeTime is the time to move forward by
+"""
+def propagate(pos, vel, mu, changeTime, tolerance=1e-12, maxIterations=50):
+	pos = np.asarray(pos, dtype=float)
+	vel = np.asarray(vel, dtype=float)
+	mu = np.asarray(mu, dtype=float)
+	r0 = np.sqrt(np.einsum('ij,ij->i', pos, pos))
+	v2 = np.einsum('ij,ij->i', vel, vel)
+	rv = np.einsum('ij,ij->i', pos, vel)
+	alpha = 2/r0 - v2/mu #1/a; positive for bound orbits
+	rootMu = np.sqrt(mu)
+	dt = np.full(len(pos), float(changeTime))
+
+	#whole orbits don't change anything, so bound bodies only need to go round the last part of one
+	bound = alpha > 1e-12/r0
+	period = np.full(len(pos), np.inf)
+	period[bound] = 2*math.pi/np.sqrt(mu[bound]*alpha[bound]**3)
+	dt[bound] = np.fmod(dt[bound], period[bound])
+
+	#first guesses for the universal anomaly
+	chi = rootMu*np.abs(alpha)*dt
+	unbound = ~bound & (np.abs(alpha) > 1e-12/r0)
+	if np.any(unbound):
+		a = 1/alpha[unbound]
+		guess = np.sign(dt[unbound])*np.sqrt(-a)*np.log(np.maximum(-2*mu[unbound]*alpha[unbound]*dt[unbound]/(rv[unbound] + np.sign(dt[unbound])*np.sqrt(-mu[unbound]*a)*(1 - r0[unbound]*alpha[unbound])), 1 + 1e-12))
+		chi[unbound] = guess
+	parabolic = ~bound & ~unbound
+	chi[parabolic] = rootMu[parabolic]*dt[parabolic]/r0[parabolic]
+
+	#Newton's method on the universal Kepler equation; its derivative is the distance, which is always positive
+	for k in range(0, maxIterations):
+		z = alpha*chi**2
+		C, S = stumpff(z)
+		r = chi**2*C + rv/rootMu*chi*(1 - z*S) + r0*(1 - z*C)
+		t = (chi**3*S + rv/rootMu*chi**2*C + r0*chi*(1 - z*S))/rootMu
+		change = (dt - t)*rootMu/r
+		chi += change
+		if np.all(np.abs(change) <= tolerance*np.maximum(np.abs(chi), 1)):
+			break
+
+	z = alpha*chi**2
+	C, S = stumpff(z)
+	f = 1 - chi**2/r0*C
+	g = dt - chi**3/rootMu*S
+	newPos = f[:, np.newaxis]*pos + g[:, np.newaxis]*vel
+	r = np.sqrt(np.einsum('ij,ij->i', newPos, newPos))
+	fDot = rootMu/(r*r0)*(z*S - 1)*chi
+	gDot = 1 - chi**2/r*C
+	newVel = fDot[:, np.newaxis]*pos + gDot[:, np.newaxis]*vel
+	return newPos, newVel
+
+#returns the closest approach and the period of Kepler orbits; the period is infinite for orbits that aren't bound
+def periapsisAndPeriod(pos, vel, mu):
+	r = np.sqrt(np.einsum('ij,ij->i', pos, pos))
+	v2 = np.einsum('ij,ij->i', vel, vel)
+	h = np.cross(pos, vel)
+	p = np.einsum('ij,ij->i', h, h)/mu #semi-latus rectum
+	e = np.sqrt(np.maximum(1 + p*(v2 - 2*mu/r)/mu, 0))
+	alpha = 2/r - v2/mu
+	period = np.full(len(pos), np.inf)
+	bound = alpha > 0
+	period[bound] = 2*math.pi/np.sqrt(mu[bound]*alpha[bound]**3)
+	return p/(1 + e), period
+
+#the bodies of a system split up into Kepler orbits, if they can be
+class Hierarchy(object):
+	#constructor
+	"""
+	pos, vel and mass are the state of every body
+	tolerance is the largest perturbation allowed, as a fraction of the pull of the primary
+	"""
+	def __init__(self, pos, vel, mass, tolerance=1e-3, G=c.gravitationalConstant):
+		self.G = G
+		self.reason = None #why the system can't be treated as Kepler orbits, if it can't
+		self.perturbation = np.inf #largest perturbation, as a fraction of the pull of the primary
+		n = len(pos)
+		self.primary = np.zeros(n, dtype=int)
+		acc = np.zeros((n, 3))
+		primaryAcc = np.zeros((n, 3)) #pull of the primary alone
+		for start in range(0, n, blockSize):
+			stop = min(start + blockSize, n)
+			sep = pos[np.newaxis, :, :] - pos[start:stop, np.newaxis, :]
+			dist2 = np.einsum('ijk,ijk->ij', sep, sep)
+			with np.errstate(divide='ignore'):
+				invDist3 = np.where(dist2 > 0, dist2**-1.5, 0)
+			pull = G*invDist3*mass[np.newaxis, :]
+			acc[start:stop] = np.einsum('ij,ijk->ik', pull, sep)
+			strongest = np.argmax(pull*np.sqrt(dist2), axis=1)
+			rows = np.arange(stop - start)
+			self.primary[start:stop] = strongest
+			primaryAcc[start:stop] = pull[rows, strongest][:, np.newaxis]*sep[rows, strongest]
+		other = acc - primaryAcc #the pull of everything but the primary
+
+		#two bodies that pull on each other hardest are a binary; the lighter one is listed second
+		index = np.arange(n)
+		mutual = self.primary[self.primary] == index
+		first = index[mutual & ((mass > mass[self.primary]) | ((mass == mass[self.primary]) & (index < self.primary)))]
+		self.binaries = (first, self.primary[first])
+		self.partner = np.full(n, -1) #the other body of the binary that each body is in, if it is in one
+		self.partner[first] = self.primary[first]
+		self.partner[self.primary[first]] = first
+		self.aroundPair = np.zeros(n, dtype=bool) #true for bodies that orbit the centre of mass of the binary their primary is in
+
+		#every other body orbits its primary, which has to be moved before it can be
+		self.levels = list()
+		placed = mutual.copy()
+		while not np.all(placed):
+			level = index[~placed & placed[self.primary]]
+			if len(level) == 0:
+				self.reason = "some bodies pull on each other in a loop"
+				return
+			self.levels.append(level)
+			placed[level] = True
+
+		#the centre of mass of a binary has to move in a straight line
+		i, j = self.binaries
+		total = mass[i] + mass[j]
+		comAcc = np.zeros((n, 3)) #acceleration of the centre of mass of the binary each body is in
+		comAcc[i] = comAcc[j] = (mass[i, np.newaxis]*other[i] + mass[j, np.newaxis]*other[j])/total[:, np.newaxis]
+		comPerturbation = np.sqrt(np.sum(comAcc[i]**2, axis=1))/(G*total/np.einsum('ij,ij->i', pos[j] - pos[i], pos[j] - pos[i]))
+
+		#perturbations of the relative motion of each body and its primary, as a fraction of the pull between them; the primary is also pulled by the body, which is part of the orbit rather than a perturbation
+		sats = np.concatenate([index[~mutual], self.binaries[1]])
+		prims = self.primary[sats]
+		sep = pos[prims] - pos[sats]
+		dist2 = np.einsum('ij,ij->i', sep, sep)
+		inner = G*(mass[sats] + mass[prims])/dist2
+		pullOnPrimary = np.where(mutual[sats], 0, G*mass[sats]/dist2**1.5)[:, np.newaxis]*sep
+		perturbation = np.sqrt(np.sum((other[sats] - other[prims] - pullOnPrimary)**2, axis=1))/inner
+
+		#the same for orbiting the centre of mass of the binary that the primary is in
+		pairs = np.flatnonzero(~mutual[sats] & (self.partner[prims] >= 0))
+		if len(pairs):
+			s, p = sats[pairs], prims[pairs]
+			q = self.partner[p]
+			pairMass = mass[p] + mass[q]
+			sep = (mass[p, np.newaxis]*pos[p] + mass[q, np.newaxis]*pos[q])/pairMass[:, np.newaxis] - pos[s]
+			dist2 = np.einsum('ij,ij->i', sep, sep)
+			pull = (G*sep/dist2[:, np.newaxis]**1.5)
+			pairPerturbation = np.sqrt(np.sum((acc[s] - pairMass[:, np.newaxis]*pull - comAcc[p] - mass[s, np.newaxis]*pull)**2, axis=1))/(G*(pairMass + mass[s])/dist2)
+			better = pairPerturbation < perturbation[pairs]
+			self.aroundPair[s[better]] = True
+			perturbation[pairs[better]] = pairPerturbation[better]
+		worst = max(np.max(perturbation) if len(perturbation) else 0, np.max(comPerturbation) if len(comPerturbation) else 0)
+		self.perturbation = worst
+		if worst > tolerance:
+			self.reason = "perturbations are %.2g of the pull of the primaries" % worst
+
+	#true if the whole system can be moved along Kepler orbits
+	def coasting(self):
+		return self.reason is None
+
+	#returns the position, velocity and mass of what each of bodies orbits: its primary, or the centre of mass of the binary that its primary is in
+	def centres(self, bodies, pos, vel, mass):
+		prims = self.primary[bodies]
+		centrePos, centreVel, centreMass = pos[prims], vel[prims], mass[prims]
+		pair = self.aroundPair[bodies]
+		if np.any(pair):
+			p = prims[pair]
+			q = self.partner[p]
+			pairMass = mass[p] + mass[q]
+			centrePos[pair] = (mass[p, np.newaxis]*pos[p] + mass[q, np.newaxis]*pos[q])/pairMass[:, np.newaxis]
+			centreVel[pair] = (mass[p, np.newaxis]*vel[p] + mass[q, np.newaxis]*vel[q])/pairMass[:, np.newaxis]
+			centreMass[pair] = pairMass
+		return centrePos, centreVel, centreMass
+
+	#returns every body that orbits something, including the second body of each binary, with its position and velocity relative to what it orbits and the gravitational parameter of the orbit
+	def orbits(self, pos, vel, mass):
+		sats = np.concatenate([self.binaries[1]] + self.levels)
+		centrePos, centreVel, centreMass = self.centres(sats, pos, vel, mass)
+		return sats, pos[sats] - centrePos, vel[sats] - centreVel, self.G*(mass[sats] + centreMass)
+
+	#moves every body forward by changeTime; returns the new positions and velocities
+	def propagate(self, pos, vel, mass, changeTime):
+		newPos = np.array(pos, dtype=float)
+		newVel = np.array(vel, dtype=float)
+		i, j = self.binaries
+		if len(i):
+			total = mass[i] + mass[j]
+			com = (mass[i, np.newaxis]*pos[i] + mass[j, np.newaxis]*pos[j])/total[:, np.newaxis]
+			comVel = (mass[i, np.newaxis]*vel[i] + mass[j, np.newaxis]*vel[j])/total[:, np.newaxis]
+			relPos, relVel = propagate(pos[j] - pos[i], vel[j] - vel[i], self.G*total, changeTime)
+			com += comVel*changeTime
+			newPos[i] = com - (mass[j]/total)[:, np.newaxis]*relPos
+			newPos[j] = com + (mass[i]/total)[:, np.newaxis]*relPos
+			newVel[i] = comVel - (mass[j]/total)[:, np.newaxis]*relVel
+			newVel[j] = comVel + (mass[i]/total)[:, np.newaxis]*relVel
+		#each level orbits bodies that have already been moved
+		for level in self.levels:
+			centrePos, centreVel, centreMass = self.centres(level, pos, vel, mass)
+			relPos, relVel = propagate(pos[level] - centrePos, vel[level] - centreVel, self.G*(mass[level] + centreMass), changeTime)
+			centrePos, centreVel, centreMass = self.centres(level, newPos, newVel, mass)
+			newPos[level] = centrePos + relPos
+			newVel[level] = centreVel + relVel
+		return newPos, newVel
+
+	#returns the longest time, up to limit, that the system can coast for without any bodies touching; 0 if it can't coast at all
+	"""
+	fraction is the largest fraction of an orbit that is skipped at once, so that the perturbations are checked again regularly
+	samples is the number of points along the way at which the paths are checked for bodies coming close to each other
+	"""
+	def safeTime(self, pos, vel, mass, radius, limit, fraction=1/16, samples=4):
+		if not self.coasting():
+			return 0
+		sats, relPos, relVel, mu = self.orbits(pos, vel, mass)
+		if len(sats) == 0:
+			return 0
+		prims = self.primary[sats]
+		periapsis, period = periapsisAndPeriod(relPos, relVel, mu)
+		#unbound bodies that are getting closer will reach their periapsis; bound bodies always will; bodies that orbit a binary are checked against each of its bodies below
+		approaching = (np.einsum('ij,ij->i', relPos, relVel) < 0) | np.isfinite(period)
+		if np.any(approaching & (periapsis <= radius[sats] + np.where(self.aroundPair[sats], 0, radius[prims]))):
+			self.reason = "a body is on course to hit its primary"
+			return 0
+		#unbound orbits are skipped forward by the time it takes to go about a radian, as seen from the primary
+		dist = np.sqrt(np.einsum('ij,ij->i', relPos, relPos))
+		speed = np.sqrt(np.einsum('ij,ij->i', relVel, relVel))
+		scale = np.where(np.isfinite(period), period, 2*math.pi*dist/np.maximum(speed, 1e-300))
+		coastTime = min(limit, fraction*np.min(scale))
+
+		#checks pieces of the paths for bodies that aren't orbiting each other coming close
+		related = set(zip(sats[~self.aroundPair[sats]].tolist(), prims[~self.aroundPair[sats]].tolist()))
+		last = pos
+		for k in range(1, samples + 1):
+			now = self.propagate(pos, vel, mass, coastTime*k/samples)[0]
+			move = now - last
+			bend = np.sqrt(np.einsum('ij,ij->i', move, move))/4 #room for the path to curve away from a straight line
+			pairs = broadPhase.sweptPairs(last, now, radius + bend)
+			if len(pairs):
+				first, second = pairs[:, 0], pairs[:, 1]
+				hit = broadPhase.timesOfImpact(last[second] - last[first], move[second] - move[first], radius[first] + radius[second] + bend[first] + bend[second])
+				touching = np.einsum('ij,ij->i', last[second] - last[first], last[second] - last[first]) <= (radius[first] + radius[second] + bend[first] + bend[second])**2
+				for a, b in zip(first[~np.isnan(hit) | touching], second[~np.isnan(hit) | touching]):
+					if (a, b) not in related and (b, a) not in related:
+						self.reason = "bodies come close to each other"
+						return 0
+			last = now
+		return coastTime
@@ -0,0 +1,152 @@
+"""
+This splits the all-pairs gravity of gravity.py across several processes, so that large runs aren't limited to one core.
+The positions, masses and results live in shared memory that every worker process attaches to once, when it starts; each step only sends the workers a few numbers saying which part of the work is theirs.
+The pair space is split up by source: every worker adds up the pull (and potential) of its own slice of the bodies on every target, into its own slab of the results, and the slabs are then added together (and, for free-fall times, the smallest is taken).
+Small problems are done in this process, since handing them out costs more than it saves.
+"""
+
+from __future__ import division #does fun stuff
+import ctypes
+import multiprocessing
+import time
+import numpy as np
+
+import constants as c #gives useful physics constants
+import gravity #exact all-pairs gravity
+
+#views of the shared arrays, set up in each worker process by attach
+shared = dict()
+
+#returns numpy views of the shared arrays, for a number of slots and workers
+def views(buffers, capacity, workers):
+	pos, mass, targets, sources, acc, freeFall, phi = buffers
+	return {
+		"pos": np.frombuffer(pos, dtype=float).reshape(capacity, 3),
+		"mass": np.frombuffer(mass, dtype=float),
+		"targets": np.frombuffer(targets, dtype=np.int64),
+		"sources": np.frombuffer(sources, dtype=np.int64),
+		"acc": np.frombuffer(acc, dtype=float).reshape(workers, capacity, 3),
+		"freeFall": np.frombuffer(freeFall, dtype=float).reshape(workers, capacity),
+		"phi": np.frombuffer(phi, dtype=float).reshape(workers, capacity),
+	}
+
+#runs once in each worker process when it starts
+def attach(buffers, capacity, workers):
+	shared.update(views(buffers, capacity, workers))
+
+#adds up the pull of one slice of the sources on every target; runs in a worker process
+"""
+task is (part, n, nTargets, nSources, start, stop, softening, G, freeFall, potential)
+n is the number of bodies; nTargets and nSources are the number of indices in the shared targets and sources arrays, or -1 for every body
+start and stop are the slice of the sources that this part adds up
+"""
+def work(task):
+	part, n, nTargets, nSources, start, stop, softening, G, freeFall, potential = task
+	targets = None if nTargets < 0 else shared["targets"][:nTargets]
+	sources = np.arange(start, stop) if nSources < 0 else shared["sources"][start:stop]
+	result = gravity.accelerations(shared["pos"][:n], shared["mass"][:n], softening, G, targets, freeFall, sources, potential)
+	if not isinstance(result, tuple):
+		result = (result,)
+	m = n if nTargets < 0 else nTargets
+	shared["acc"][part, :m] = result[0]
+	if freeFall:
+		shared["freeFall"][part, :m] = result[1]
+	if potential:
+		shared["phi"][part, :m] = result[-1]
+	return part
+
+#calculates gravity with a pool of worker processes
+class ParallelGravity(object):
+	#constructor
+	"""
+	workers is the number of worker processes; the number of cores if it is None
+	capacity is the number of bodies that the shared arrays start out holding; they are made bigger when needed
+	minPairs is the least number of pairs that is worth handing out to the workers
+	"""
+	def __init__(self, workers=None, capacity=1024, minPairs=250000):
+		if workers is None:
+			workers = multiprocessing.cpu_count()
+		self.workers = max(1, int(workers))
+		self.capacity = 0
+		self.minPairs = minPairs
+		self.pool = None
+		self.shared = None
+		if self.workers > 1: #a single worker always works in this process, so it needs no pool or shared arrays
+			self.start(capacity)
+
+	#makes shared arrays big enough for capacity bodies, and starts new workers attached to them
+	def start(self, capacity):
+		self.close()
+		self.capacity = capacity
+		self.buffers = (
+			multiprocessing.RawArray(ctypes.c_double, 3*capacity),
+			multiprocessing.RawArray(ctypes.c_double, capacity),
+			multiprocessing.RawArray(ctypes.c_int64, capacity),
+			multiprocessing.RawArray(ctypes.c_int64, capacity),
+			multiprocessing.RawArray(ctypes.c_double, 3*self.workers*capacity),
+			multiprocessing.RawArray(ctypes.c_double, self.workers*capacity),
+			multiprocessing.RawArray(ctypes.c_double, self.workers*capacity),
+		)
+		self.shared = views(self.buffers, capacity, self.workers)
+		self.pool = multiprocessing.Pool(self.workers, initializer=attach, initargs=(self.buffers, capacity, self.workers))
+
+	#stops the workers
+	def close(self):
+		if self.pool is not None:
+			self.pool.terminate()
+			self.pool.join()
+			self.pool = None
+
+	#returns the acceleration of every body due to the gravity of all of the others; takes the same arguments as gravity.accelerations
+	def accelerations(self, pos, mass, softening=0, G=c.gravitationalConstant, targets=None, freeFall=False, sources=None, potential=False):
+		n = len(pos)
+		nTargets = n if targets is None else len(targets)
+		nSources = n if sources is None else len(sources)
+		if self.workers == 1 or nTargets*nSources < self.minPairs:
+			return gravity.accelerations(pos, mass, softening, G, targets, freeFall, sources, potential)
+		if n > self.capacity:
+			self.start(max(n, 2*self.capacity))
+
+		s = self.shared
+		s["pos"][:n] = pos
+		s["mass"][:n] = mass
+		if targets is not None:
+			s["targets"][:nTargets] = targets
+		if sources is not None:
+			s["sources"][:nSources] = sources
+		bounds = np.linspace(0, nSources, self.workers + 1).astype(int)
+		tasks = [(part, n, -1 if targets is None else nTargets, -1 if sources is None else nSources, bounds[part], bounds[part + 1], softening, G, freeFall, potential)
+			for part in range(0, self.workers)]
+		self.pool.map(work, tasks)
+
+		#adds up the partial sums of every worker
+		result = (s["acc"][:, :nTargets].sum(axis=0),)
+		if freeFall:
+			result += (s["freeFall"][:, :nTargets].min(axis=0),)
+		if potential:
+			result += (s["phi"][:, :nTargets].sum(axis=0),)
+		return result[0] if len(result) == 1 else result
+
+#times the single-process and parallel calculations on the same bodies
+"""
+repeats is the number of times that each is run; the fastest run of each is used
+returns a dictionary with the number of workers, the seconds taken by each, the speedup, and the largest difference between the two relative to the exact accelerations
+"""
+def measureSpeedup(parallel, pos, mass, repeats=3, **options):
+	single = list()
+	split = list()
+	for k in range(0, repeats):
+		start = time.time()
+		exact = gravity.accelerations(pos, mass, **options)
+		single.append(time.time() - start)
+		start = time.time()
+		acc = parallel.accelerations(pos, mass, **options)
+		split.append(time.time() - start)
+	return {
+		"workers": parallel.workers,
+		"bodies": len(pos),
+		"singleSeconds": min(single),
+		"parallelSeconds": min(split),
+		"speedup": min(single)/max(min(split), 1e-9),
+		"maxError": gravity.maxRelativeError(acc, exact),
+	}
@@ -0,0 +1,126 @@
+"""
+This keeps track of how long each phase of a step (or frame) takes, and counts things like the number of bodies and collisions, so that it is easy to tell what is slowing the simulation down.
+Phases are timed with laps: begin() starts a step, and lap(phase) adds the time since the last lap to phase.
+Every interval seconds, the averages per step are saved as a sample; the samples can be written out as csv or json.
+When a PhaseTimer is disabled, every method returns straight away, so it can be left in the hot paths.
+"""
+
+from __future__ import division #does fun stuff
+import collections
+import csv
+import json
+import time
+
+#times the phases of a repeated step
+class PhaseTimer(object):
+	#constructor
+	"""
+	name is used to tell timers apart when they are written out together
+	enabled turns the timing on; it can be changed at any time
+	interval is the number of real seconds that each sample averages over
+	maxSamples is the most samples kept; the oldest are dropped first
+	"""
+	def __init__(self, name="", enabled=False, interval=1., maxSamples=3600):
+		self.name = name
+		self.enabled = enabled
+		self.interval = interval
+		self.samples = collections.deque(maxlen=maxSamples)
+		self.phases = list() #names of the phases and counters in the order they were first seen
+		self.counters = list()
+		self.reset()
+
+	#forgets the current interval
+	def reset(self):
+		self.times = dict((phase, 0.) for phase in self.phases)
+		self.counts = dict((counter, 0) for counter in self.counters)
+		self.steps = 0
+		self.intervalStart = time.time()
+		self.last = self.intervalStart
+
+	#turns timing on or off; turning it on starts a new interval
+	def setEnabled(self, enabled):
+		if enabled and not self.enabled:
+			self.reset()
+		self.enabled = enabled
+
+	#starts timing a step
+	def begin(self):
+		if self.enabled:
+			self.last = time.time()
+
+	#adds the time since the last lap (or begin) to phase
+	def lap(self, phase):
+		if not self.enabled:
+			return
+		now = time.time()
+		if phase not in self.times:
+			self.times[phase] = 0.
+			self.phases.append(phase)
+		self.times[phase] += now - self.last
+		self.last = now
+
+	#adds n to the counter called counter
+	def count(self, counter, n):
+		if not self.enabled:
+			return
+		if counter not in self.counts:
+			self.counts[counter] = 0
+			self.counters.append(counter)
+		self.counts[counter] += n
+
+	#ends a step, and saves a sample if the interval is over
+	def end(self):
+		if not self.enabled:
+			return
+		self.steps += 1
+		if time.time() - self.intervalStart >= self.interval:
+			self.sample()
+
+	#saves the averages of the steps since the last sample as a new sample, even if the interval is not over
+	def sample(self):
+		if self.steps == 0:
+			return
+		now = time.time()
+		sample = collections.OrderedDict()
+		sample["time"] = now
+		sample["steps"] = self.steps
+		sample["stepsPerSecond"] = self.steps/max(now - self.intervalStart, 1e-9)
+		for phase in self.phases:
+			sample[phase + "Ms"] = 1000*self.times.get(phase, 0.)/self.steps
+		for counter in self.counters:
+			sample[counter] = self.counts.get(counter, 0)/self.steps
+		self.samples.append(sample)
+		self.reset()
+
+	#returns the newest sample, or None if there isn't one yet
+	def latest(self):
+		return self.samples[-1] if self.samples else None
+
+	#returns a line for every phase and counter in the newest sample
+	def describe(self):
+		sample = self.latest()
+		if sample is None:
+			return [self.name + ": waiting for the first sample"]
+		lines = ["%s: %.1f steps/s" % (self.name, sample["stepsPerSecond"])]
+		for phase in self.phases:
+			lines.append("  %s: %.3f ms/step" % (phase, sample.get(phase + "Ms", 0.)))
+		for counter in self.counters:
+			lines.append("  %s: %.1f per step" % (counter, sample.get(counter, 0.)))
+		return lines
+
+	#returns the names of every column of the samples
+	def columns(self):
+		return ["time", "steps", "stepsPerSecond"] + [phase + "Ms" for phase in self.phases] + list(self.counters)
+
+	#writes the samples to a csv file, one row per sample
+	def writeCSV(self, path):
+		with open(path, "w") as f:
+			writer = csv.DictWriter(f, fieldnames=self.columns(), restval=0)
+			writer.writeheader()
+			for sample in list(self.samples):
+				writer.writerow(sample)
+
+#writes the samples of several timers to a json file, as {name: [sample, ...]}
+def writeJSON(path, timers):
+	with open(path, "w") as f:
+		json.dump(dict((timer.name, list(timer.samples)) for timer in timers), f, indent=1)
@@ -0,0 +1,190 @@
+"""
+This saves the state of every body at every step to a file, and reads it back for playback without redoing any of the physics.
+A recording is an append-only file of chunks. Each chunk holds a run of steps in which the bodies did not change slots, so that every step in it has the same size:
+	file:  magic
+	chunk: header (slots, frames, length of names), names as json, then frames steps of t, steps, pos, vel, forward, mass, radius and alive
+Chunks are written whole, so a recording that was cut off part way through a chunk can still be read up to the last complete chunk.
+The steps are memory-mapped when read, so seeking to any step only reads that step from disk.
+Recorder copies each step into a buffer and hands full buffers to a writer thread, so the physics never waits on the disk.
+Only a few full buffers are kept waiting for the writer; if the disk falls further behind than that, the newest buffers are dropped and counted instead, so the memory used stays bounded.
+"""
+
+from __future__ import division #does fun stuff
+import json
+import os
+import threading
+import numpy as np
+
+try:
+	import Queue as queue #python 2
+except ImportError:
+	import queue
+
+magic = b"SSREC001"
+headerType = np.dtype([("slots", "<i8"), ("frames", "<i8"), ("namesLength", "<i8")])
+
+#returns the numpy type of one step of a recording with the given number of slots
+def frameType(slots):
+	return np.dtype([
+		("t", "<f8"),
+		("steps", "<i8"),
+		("pos", "<f8", (slots, 3)),
+		("vel", "<f8", (slots, 3)),
+		("forward", "<f8", (slots, 3)),
+		("mass", "<f8", (slots,)),
+		("radius", "<f8", (slots,)),
+		("alive", "?", (slots,)),
+	])
+
+#streams the state of a BodySet to a recording
+class Recorder(object):
+	#constructor
+	"""
+	path is the file to write to; it is overwritten
+	chunkFrames is the largest number of steps buffered before they are written
+	maxChunks is the largest number of full buffers waiting to be written; more than that are dropped
+	"""
+	def __init__(self, path, chunkFrames=256, maxChunks=16):
+		self.path = path
+		self.chunkFrames = chunkFrames
+		self.file = open(path, "wb")
+		self.file.write(magic)
+		self.queue = queue.Queue(maxsize=maxChunks)
+		self.writer = threading.Thread(target=self.write)
+		self.writer.daemon = True
+		self.writer.start()
+		self.buffer = None
+		self.fields = None
+		self.names = None
+		self.frames = 0
+		self.recorded = 0 #total number of steps recorded
+		self.dropped = 0 #number of recorded steps that were dropped because the writer fell behind
+
+	#copies the current state of bodySet into the buffer; called once per step
+	def record(self, bodySet, t, steps):
+		n = bodySet.count
+		if self.buffer is not None and (self.frames == self.chunkFrames or len(self.names) != n or bodySet.names[:n] != self.names):
+			self.flush()
+		if self.buffer is None:
+			self.buffer = np.zeros(self.chunkFrames, dtype=frameType(n))
+			self.fields = [self.buffer[name] for name in ("pos", "vel", "forward", "mass", "radius", "alive")] #looking fields up by name is slow, so it is only done once per chunk
+			self.names = list(bodySet.names[:n])
+		k = self.frames
+		self.buffer[k]["t"] = t
+		self.buffer[k]["steps"] = steps
+		for field, array in zip(self.fields, (bodySet.pos, bodySet.vel, bodySet.forward, bodySet.mass, bodySet.radius, bodySet.alive)):
+			field[k] = array[:n]
+		self.frames += 1
+		self.recorded += 1
+
+	#hands the buffered steps to the writer thread; if it is too far behind, they are dropped, unless wait is true
+	def flush(self, wait=False):
+		if self.buffer is not None and self.frames > 0:
+			try:
+				self.queue.put((self.names, self.buffer[:self.frames]), wait)
+			except queue.Full:
+				self.dropped += self.frames
+		self.buffer = None
+		self.names = None
+		self.frames = 0
+
+	#writes chunks as they come in; runs in its own thread
+	def write(self):
+		while True:
+			item = self.queue.get()
+			if item is None:
+				break
+			names, frames = item
+			namesBytes = json.dumps(names).encode("utf-8")
+			namesBytes += b" "*(-len(namesBytes) % 8) #keeps the steps 8-byte aligned
+			header = np.array([(frames.dtype["pos"].shape[0], len(frames), len(namesBytes))], dtype=headerType)
+			self.file.write(header.tobytes())
+			self.file.write(namesBytes)
+			self.file.write(frames.tobytes())
+			self.file.flush()
+
+	#writes everything that is left and closes the file
+	def close(self):
+		self.flush(True)
+		self.queue.put(None)
+		self.writer.join()
+		self.file.close()
+
+#a chunk of a recording
+class Chunk(object):
+	def __init__(self, names, frames, first):
+		self.names = names
+		self.frames = frames #memory-mapped array of steps
+		self.first = first #index of the first step of the chunk in the whole recording
+
+#reads a recording
+class Recording(object):
+	#constructor
+	"""
+	path is the file written by a Recorder; it can still be being written to, see refresh
+	"""
+	def __init__(self, path):
+		self.path = path
+		self.chunks = list()
+		self.firsts = list() #index of the first step of each chunk
+		self.offset = len(magic) #where the next unread chunk starts
+		self.length = 0
+		self.times = np.zeros(0)
+		with open(path, "rb") as f:
+			if f.read(len(magic)) != magic:
+				raise ValueError("%s is not a recording" % path)
+		self.refresh()
+
+	#reads any chunks that have been written since the recording was opened; returns the number of new steps
+	def refresh(self):
+		size = os.path.getsize(self.path)
+		before = self.length
+		times = [self.times]
+		with open(self.path, "rb") as f:
+			while self.offset + headerType.itemsize <= size:
+				f.seek(self.offset)
+				header = np.frombuffer(f.read(headerType.itemsize), dtype=headerType)[0]
+				slots, frames, namesLength = int(header["slots"]), int(header["frames"]), int(header["namesLength"])
+				dataType = frameType(slots)
+				start = self.offset + headerType.itemsize + namesLength
+				end = start + frames*dataType.itemsize
+				if end > size:
+					break #this chunk has not been completely written yet
+				names = json.loads(f.read(namesLength).decode("utf-8"))
+				chunk = Chunk(names, np.memmap(self.path, dtype=dataType, mode="r", offset=start, shape=(frames,)), self.length)
+				self.chunks.append(chunk)
+				self.firsts.append(self.length)
+				times.append(np.array(chunk.frames["t"]))
+				self.length += frames
+				self.offset = end
+		self.times = np.concatenate(times)
+		return self.length - before
+
+	def __len__(self):
+		return self.length
+
+	#returns the chunk holding step i
+	def chunkOf(self, i):
+		if i < 0:
+			i += self.length
+		if i < 0 or i >= self.length:
+			raise IndexError("step %i is not in the recording" % i)
+		return self.chunks[np.searchsorted(self.firsts, i, side="right") - 1]
+
+	#returns step i, with fields t, steps, pos, vel, forward, mass, radius and alive, and the names of its slots
+	def frame(self, i):
+		if i < 0:
+			i += self.length
+		chunk = self.chunkOf(i)
+		return chunk.frames[i - chunk.first], chunk.names
+
+	#returns the index of the last step at or before time t
+	def find(self, t):
+		return max(0, min(self.length - 1, int(np.searchsorted(self.times, t, side="right")) - 1))
+
+	#simulated time of the first and last steps
+	def startTime(self):
+		return self.times[0] if self.length else 0
+
+	def endTime(self):
+		return self.times[-1] if self.length else 0
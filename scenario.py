@@ -0,0 +1,167 @@
+"""
+This reads the starting state of a simulation from a json file, so that new systems can be set up without changing any code.
+A scenario has an optional craft, a list of bodies, and a list of belts; a belt is many small bodies on circular orbits around a point, made from a few numbers:
+	{
+		"name": "Two planets",
+		"craft": {"position": [0, 0, 6e7], "forward": [0, 0, -1], "mass": 30e3, "fuel": 1e4, "radius": 50, "ammo": 10},
+		"bodies": [{"name": "earth1", "position": [0, 0, 0], "mass": 5.3748e24, "radius": 6.371e6, "material": "earth"}],
+		"belts": [{"name": "asteroid", "count": 10000, "centre": [0, 0, 0], "centralMass": 5.3748e24, "innerRadius": 1e8, "outerRadius": 1.6e8}]
+	}
+Anything that is left out is taken from bodyDefaults, craftDefaults or beltDefaults.
+The bodies are parsed into arrays once, so the simulation can be started (or reset) by copying them into a BodySet all at once.
+Each body also keeps how it should be drawn (material and colour) and whether its shapes can wait until it is first seen ("lazy"); nothing here imports VPython.
+"""
+
+from __future__ import division #does fun stuff
+import json
+import math
+import numpy as np
+
+import constants as c #gives useful physics constants
+import bodies #array-backed physical state
+
+bodyDefaults = {
+	"name": "normal",
+	"position": [0, 0, 0],
+	"velocity": [0, 0, 0],
+	"forward": [1, 0, 0],
+	"mass": 1.,
+	"radius": c.radiusEarth,
+	"collisionType": "elastic",
+	"material": None,	#name of a VPython material, eg "earth"
+	"colour": None,		#[r, g, b], each from 0 to 1
+	"lazy": False,		#if true, the body is only drawn once it has been near the camera
+}
+
+craftDefaults = {
+	"name": "craft",
+	"position": [0, 0, 0],
+	"velocity": [0, 0, 0],
+	"forward": [0, 0, -1],
+	"mass": 30e3,		#when empty, kg
+	"fuel": 1e4,		#kg
+	"radius": 50,
+	"ammo": 10,
+}
+
+beltDefaults = {
+	"name": "asteroid",
+	"count": 1000,
+	"centre": [0, 0, 0],
+	"centreVelocity": [0, 0, 0],
+	"centralMass": c.massEarth,	#mass that the belt orbits, kg
+	"normal": [0, 1, 0],		#the belt lies in the plane at right angles to this
+	"innerRadius": 1e8,
+	"outerRadius": 1.5e8,
+	"thickness": 5e6,
+	"mass": [1e12, 1e15],		#smallest and largest mass, kg
+	"radius": [1e4, 1e5],		#smallest and largest radius, m
+	"collisionType": "elastic",
+	"material": None,
+	"colour": [.6, .55, .5],
+	"lazy": True,
+	"seed": 0,
+}
+
+#returns settings with anything missing taken from defaults
+def withDefaults(settings, defaults):
+	merged = dict(defaults)
+	merged.update(settings)
+	return merged
+
+#the parsed contents of a scenario file
+class Scenario(object):
+	#constructor
+	"""
+	data is the scenario as a dictionary, eg from json.load
+	"""
+	def __init__(self, data):
+		self.name = data.get("name", "")
+		self.craft = None
+		if data.get("craft") is not None:
+			self.craft = withDefaults(data["craft"], craftDefaults)
+
+		parts = [self.parseBodies([withDefaults(body, bodyDefaults) for body in data.get("bodies", [])])]
+		for belt in data.get("belts", []):
+			parts.append(self.makeBelt(withDefaults(belt, beltDefaults)))
+		self.pos = np.concatenate([p["pos"] for p in parts])
+		self.vel = np.concatenate([p["vel"] for p in parts])
+		self.forward = np.concatenate([p["forward"] for p in parts])
+		self.mass = np.concatenate([p["mass"] for p in parts])
+		self.radius = np.concatenate([p["radius"] for p in parts])
+		self.collisionType = np.concatenate([p["collisionType"] for p in parts]).astype(np.int8)
+		self.lazy = np.concatenate([p["lazy"] for p in parts]).astype(bool)
+		self.names = sum([p["names"] for p in parts], [])
+		self.materials = sum([p["materials"] for p in parts], [])
+		self.colours = sum([p["colours"] for p in parts], [])
+
+	#returns the arrays for a list of bodies
+	def parseBodies(self, bodyList):
+		return {
+			"pos": np.array([b["position"] for b in bodyList], dtype=float).reshape(-1, 3),
+			"vel": np.array([b["velocity"] for b in bodyList], dtype=float).reshape(-1, 3),
+			"forward": np.array([b["forward"] for b in bodyList], dtype=float).reshape(-1, 3),
+			"mass": np.array([b["mass"] for b in bodyList], dtype=float),
+			"radius": np.array([b["radius"] for b in bodyList], dtype=float),
+			"collisionType": np.array([bodies.collisionCodes[b["collisionType"]] for b in bodyList], dtype=np.int8),
+			"lazy": np.array([b["lazy"] for b in bodyList], dtype=bool),
+			"names": [b["name"] for b in bodyList],
+			"materials": [b["material"] for b in bodyList],
+			"colours": [b["colour"] for b in bodyList],
+		}
+
+	#returns the arrays for a belt of bodies on circular orbits
+	def makeBelt(self, belt):
+		n = int(belt["count"])
+		generator = np.random.RandomState(belt["seed"])
+		#two directions in the plane of the belt
+		normal = np.array(belt["normal"], dtype=float)
+		normal /= math.sqrt(np.dot(normal, normal))
+		u = np.cross(normal, (1, 0, 0) if abs(normal[0]) < .9 else (0, 1, 0))
+		u /= math.sqrt(np.dot(u, u))
+		w = np.cross(normal, u)
+
+		#spread evenly over the area of the belt
+		r = np.sqrt(generator.uniform(belt["innerRadius"]**2, belt["outerRadius"]**2, n))
+		angle = generator.uniform(0, 2*math.pi, n)
+		height = generator.uniform(-belt["thickness"]/2, belt["thickness"]/2, n)
+		cos, sin = np.cos(angle)[:, np.newaxis], np.sin(angle)[:, np.newaxis]
+		pos = np.array(belt["centre"], dtype=float) + r[:, np.newaxis]*(cos*u + sin*w) + height[:, np.newaxis]*normal
+		speed = np.sqrt(c.gravitationalConstant*belt["centralMass"]/r)[:, np.newaxis]
+		vel = np.array(belt["centreVelocity"], dtype=float) + speed*(cos*w - sin*u)
+
+		#masses and radii are spread evenly in log space, so that there are many more small ones
+		mass = np.exp(generator.uniform(math.log(belt["mass"][0]), math.log(belt["mass"][1]), n))
+		radius = np.exp(generator.uniform(math.log(belt["radius"][0]), math.log(belt["radius"][1]), n))
+		return {
+			"pos": pos,
+			"vel": vel,
+			"forward": np.tile((1., 0., 0.), (n, 1)),
+			"mass": mass,
+			"radius": radius,
+			"collisionType": np.full(n, bodies.collisionCodes[belt["collisionType"]], dtype=np.int8),
+			"lazy": np.full(n, belt["lazy"], dtype=bool),
+			"names": [belt["name"]]*n,
+			"materials": [belt["material"]]*n,
+			"colours": [belt["colour"]]*n,
+		}
+
+	#number of bodies, not counting the craft
+	def __len__(self):
+		return len(self.names)
+
+	#adds every body, not counting the craft, to bodySet at once and returns their slots, in the same order as the scenario
+	def populate(self, bodySet):
+		return bodySet.addMany(self.pos, self.vel, self.mass, self.radius, self.collisionType, self.names, self.forward)
+
+	#adds the craft to bodySet and returns its slot, or None if there is no craft
+	def addCraft(self, bodySet):
+		if self.craft is None:
+			return None
+		craft = self.craft
+		return bodySet.add(craft["position"], craft["velocity"], craft["mass"] + craft["fuel"], craft["radius"], "elastic", craft["name"], craft["forward"], craft["fuel"])
+
+#reads a scenario from a json file
+def load(path):
+	with open(path) as f:
+		return Scenario(json.load(f))
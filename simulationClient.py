@@ -0,0 +1,117 @@
+"""
+This connects to a simulation server (simulationServer.py) to send it commands and read the frames it streams, so that a viewer can run in its own process.
+Run on its own, it sends any commands given on the command line, and with --watch prints what the craft is doing a few times a second.
+"""
+
+from __future__ import division #does fun stuff
+import argparse
+import json
+import math
+import socket
+import time
+
+import simulationServer as server #the message format
+
+#a connection to a simulation server
+class SimulationClient(object):
+	#constructor
+	"""
+	path is the Unix socket that the server listens on
+	"""
+	def __init__(self, path):
+		self.connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+		self.connection.connect(path)
+		self.buffer = bytearray()
+		self.names = None #names of the slots, from the last frame that had them
+		self.frame = None #newest frame received
+		self.replies = dict() #replies that arrived while waiting for something else, by id
+		self.nextId = 0
+		self.framesReceived = 0
+		self.bytesReceived = 0
+
+	def close(self):
+		self.connection.close()
+
+	#sends a command without waiting for the reply; returns its id
+	def send(self, command, **arguments):
+		self.nextId += 1
+		request = dict(arguments)
+		request["command"] = command
+		request["id"] = self.nextId
+		self.connection.sendall((json.dumps(request) + "\n").encode("utf-8"))
+		return self.nextId
+
+	#sends a command and returns its reply, eg client.command("turn", left=math.pi/60); frames that arrive in the mean time are kept
+	def command(self, command, **arguments):
+		requestId = self.send(command, **arguments)
+		while requestId not in self.replies:
+			self.receive()
+		return self.replies.pop(requestId)
+
+	#waits for the next frame and returns it
+	def nextFrame(self):
+		received = self.framesReceived
+		while self.framesReceived == received:
+			self.receive()
+		return self.frame
+
+	#reads one message from the server
+	def receive(self):
+		kind, length = server.messageHeader.unpack(self.read(server.messageHeader.size))
+		payload = self.read(length)
+		self.bytesReceived += server.messageHeader.size + length
+		if kind == server.JSON:
+			reply = json.loads(payload.decode("utf-8"))
+			self.replies[reply.get("id")] = reply
+		elif kind == server.FRAME:
+			self.frame = server.Frame(payload, self.names)
+			self.names = self.frame.names
+			self.framesReceived += 1
+
+	#returns exactly size bytes from the connection
+	def read(self, size):
+		while len(self.buffer) < size:
+			data = self.connection.recv(max(65536, size - len(self.buffer)))
+			if not data:
+				raise EOFError("the server closed the connection")
+			self.buffer += data
+		data = bytes(self.buffer[:size])
+		del self.buffer[:size]
+		return data
+
+#returns a line describing a frame, for --watch
+def describe(frame, craft):
+	line = "t %.0f s, steps %i, bodies %i, debris %i" % (frame.t, frame.steps, frame.alive.sum(), len(frame.debris))
+	if craft is not None and craft < len(frame.alive) and frame.alive[craft]:
+		speed = math.sqrt(sum(frame.vel[craft]**2))
+		line += ", craft at (%.3g, %.3g, %.3g) m going %.1f m/s" % (tuple(frame.pos[craft]) + (speed,))
+	return line
+
+#talks to a server from the command line
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Sends commands to a simulation server and watches its frames")
+	parser.add_argument("--socket", default="spaceship.sock", help="path of the server's Unix socket")
+	parser.add_argument("commands", nargs="*", help="commands to send, as json, eg '{\"command\": \"fire\"}' or just a name, eg run")
+	parser.add_argument("--watch", type=float, default=0, help="seconds to print frames for after sending the commands")
+	args = parser.parse_args(argv)
+
+	client = SimulationClient(args.socket)
+	for text in args.commands:
+		request = json.loads(text) if text.startswith("{") else {"command": text}
+		print(json.dumps(client.command(**request)))
+	if args.watch > 0:
+		craft = client.command("state").get("craft", {}).get("slot")
+		client.command("subscribe")
+		start = time.time()
+		lastPrint = 0
+		while time.time() - start < args.watch:
+			frame = client.nextFrame()
+			if time.time() - lastPrint >= 0.5:
+				lastPrint = time.time()
+				print(describe(frame, craft))
+		wallTime = time.time() - start
+		print("%i frames in %.1f s, %.0f bytes per frame" % (client.framesReceived, wallTime, client.bytesReceived/max(client.framesReceived, 1)))
+	client.close()
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,475 @@
+"""
+This runs the simulation as a local server, so that viewers in other processes can watch it and fly the craft while the physics keeps its own pace.
+The server listens on a Unix socket. Clients send commands as lines of json, eg {"command": "fire"} or {"command": "turn", "left": 0.05}; they match the buttons and keys of spaceshipSimulation.py, and each one gets a reply.
+Commands that steer the craft are applied as engine inputs, between steps, so a run served this way can be kept as an input log (see inputLog.py) like any other.
+Every message from the server starts with a one-byte kind and a four-byte length, followed by that many bytes:
+	"J": the json reply to a command, eg {"ok": true, "command": "fire", "slot": 5}
+	"F": a state frame: header (slots, debris, length of names), the names as json if they changed since the last frame sent to that client, one recording.frameType(slots) record, then the debris positions as float32
+Frames are made once per snapshot of the simulation thread and shared by every client that subscribed to them. A client that can't keep up has frames dropped instead of holding up the physics.
+"""
+
+from __future__ import division #does fun stuff
+import argparse
+import errno
+import json
+import math
+import os
+import select
+import socket
+import stat
+import struct
+import threading
+import numpy as np
+
+import constants as c #gives useful physics constants
+import engine as physicsEngine #the physics, without any graphics
+import inputLog #keeps the inputs of a run so that it can be replayed
+import recording #the layout of a frame is the same as one step of a recording
+import simulationThread #steps the physics in the background
+
+JSON = b"J"
+FRAME = b"F"
+messageHeader = struct.Struct("<cI") #kind and length of a message
+frameHeaderType = np.dtype([("slots", "<i8"), ("debris", "<i8"), ("namesLength", "<i8")])
+retryErrors = (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR)
+
+#raised by a command that can't be carried out; its message is sent back to the client
+class CommandError(Exception):
+	pass
+
+#returns a message of the given kind
+def message(kind, payload):
+	return messageHeader.pack(kind, len(payload)) + payload
+
+#returns the bytes of the state of every slot, and of the positions of the debris
+def encodeState(bodySet, t, steps, debrisPos):
+	n = bodySet.count
+	frame = np.zeros(1, dtype=recording.frameType(n))
+	frame["t"] = t
+	frame["steps"] = steps
+	frame["pos"][0] = bodySet.pos[:n]
+	frame["vel"][0] = bodySet.vel[:n]
+	frame["forward"][0] = bodySet.forward[:n]
+	frame["mass"][0] = bodySet.mass[:n]
+	frame["radius"][0] = bodySet.radius[:n]
+	frame["alive"][0] = bodySet.alive[:n]
+	return frame.tobytes() + np.asarray(debrisPos, dtype="<f4").tobytes()
+
+#returns a frame message; names is the names as json, or empty if the client already has them
+def frameMessage(slots, debris, names, state):
+	header = np.array([(slots, debris, len(names))], dtype=frameHeaderType).tobytes()
+	return message(FRAME, header + names + state)
+
+#one frame of state, as read back by a client
+class Frame(object):
+	#constructor
+	"""
+	payload is the body of a frame message
+	names is the list of names that the client has from earlier frames; it is used if the frame doesn't have names of its own
+	"""
+	def __init__(self, payload, names=None):
+		header = np.frombuffer(payload, dtype=frameHeaderType, count=1)[0]
+		slots, debris, namesLength = int(header["slots"]), int(header["debris"]), int(header["namesLength"])
+		offset = frameHeaderType.itemsize
+		if namesLength > 0:
+			names = json.loads(payload[offset:offset + namesLength].decode("utf-8"))
+			offset += namesLength
+		self.names = names
+		dataType = recording.frameType(slots)
+		state = np.frombuffer(payload, dtype=dataType, count=1, offset=offset)[0]
+		offset += dataType.itemsize
+		self.t = float(state["t"])
+		self.steps = int(state["steps"])
+		self.pos = state["pos"]
+		self.vel = state["vel"]
+		self.forward = state["forward"]
+		self.mass = state["mass"]
+		self.radius = state["radius"]
+		self.alive = state["alive"]
+		self.debris = np.frombuffer(payload, dtype="<f4", count=3*debris, offset=offset).reshape(debris, 3)
+
+#what the server keeps about one connection
+class Client(object):
+	def __init__(self, connection):
+		self.connection = connection
+		self.incoming = b"" #part of a command that hasn't had its newline yet
+		self.outgoing = bytearray() #bytes waiting to be sent
+		self.subscribed = False
+		self.namesVersion = -1 #version of the names that were last sent to the client
+		self.framesSent = 0
+		self.framesDropped = 0
+
+#runs an engine in the background and serves it over a Unix socket
+class SimulationServer(object):
+	#constructor
+	"""
+	sim is the Engine to run, with its bodies already added
+	path is the Unix socket to listen on; an old socket at the same path is replaced
+	dt, timeScale and frameRate are passed on to the SimulationThread; frames are sent at most frameRate times per second
+	projectile is a dictionary with any of the radius, mass, speed and collisionType that fire uses when a command doesn't give its own
+	maxBacklog is the most bytes that can be waiting to be sent to a client before frames for it are dropped
+	"""
+	def __init__(self, sim, path, dt=60, timeScale=3600, frameRate=30, projectile=None, maxBacklog=1 << 22):
+		self.sim = sim
+		self.path = path
+		self.projectile = {"radius": .05*c.radiusEarth, "mass": 10, "speed": 15000, "collisionType": "elastic"}
+		if projectile is not None:
+			self.projectile.update(projectile)
+		self.maxBacklog = maxBacklog
+		self.refuelAmount = 1e4 #kg of fuel added by refuel
+		self.reloadAmount = 10 #projectiles added by reload
+		self.lock = threading.RLock()
+		self.worker = simulationThread.SimulationThread(sim.step, sim.bodies, self.lock, self.capture, dt, timeScale, frameRate)
+		self.names = None
+		self.namesVersion = 0
+		self.namesJSON = b""
+		self.lastFrame = 0 #version of the last snapshot that was sent
+		self.listener = None
+		self.clients = dict() #socket to Client
+		self.subscribers = 0 #number of clients that want frames; frames aren't made while there are none
+		self.running = False
+		self.commands = {
+			"state": self.state,
+			"subscribe": self.subscribe,
+			"run": self.run,
+			"pause": self.pause,
+			"timeScale": self.setTimeScale,
+			"thrust": self.thrust,
+			"exhaustSpeed": self.setExhaustSpeed,
+			"turn": self.turn,
+			"fire": self.fire,
+			"refuel": self.refuel,
+			"reload": self.reload,
+			"recentre": self.recentre,
+			"clear": self.clear,
+			"stop": self.stop,
+		}
+
+	#starts listening and starts the physics thread, paused
+	def start(self):
+		if not hasattr(socket, "AF_UNIX"):
+			raise RuntimeError("this system doesn't have Unix sockets")
+		if os.path.exists(self.path) and stat.S_ISSOCK(os.stat(self.path).st_mode):
+			os.remove(self.path)
+		self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+		self.listener.bind(self.path)
+		self.listener.listen(8)
+		self.listener.setblocking(False)
+		self.running = True
+		self.worker.start()
+
+	#serves clients until a client sends stop
+	def serveForever(self):
+		if self.listener is None:
+			self.start()
+		try:
+			while self.running:
+				self.poll(1/self.worker.frameRate)
+		finally:
+			self.close()
+
+	#stops the physics thread and closes every connection
+	def close(self):
+		self.running = False
+		self.worker.stop()
+		if self.worker.is_alive():
+			self.worker.join(1)
+		for client in list(self.clients.values()):
+			self.flush(client)
+			self.drop(client)
+		if self.listener is not None:
+			self.listener.close()
+			self.listener = None
+			if os.path.exists(self.path):
+				os.remove(self.path)
+
+	#handles whatever the clients sent and sends out the newest frame; waits at most timeout seconds for something to happen
+	def poll(self, timeout):
+		reading = [self.listener] + list(self.clients)
+		writing = [client.connection for client in self.clients.values() if client.outgoing]
+		try:
+			readable, writable, broken = select.select(reading, writing, [], timeout)
+		except select.error as e:
+			if e.args[0] == errno.EINTR:
+				return
+			raise
+		for connection in readable:
+			if connection is self.listener:
+				self.accept()
+			elif connection in self.clients:
+				self.receive(self.clients[connection])
+		self.sendFrames()
+		for client in list(self.clients.values()):
+			if client.outgoing:
+				self.flush(client)
+
+	def accept(self):
+		try:
+			connection, address = self.listener.accept()
+		except socket.error as e:
+			if e.args[0] in retryErrors:
+				return
+			raise
+		connection.setblocking(False)
+		self.clients[connection] = Client(connection)
+
+	def drop(self, client):
+		if self.clients.pop(client.connection, None) is not None and client.subscribed:
+			self.subscribers -= 1
+		client.connection.close()
+
+	#reads from a client and carries out every whole command it sent
+	def receive(self, client):
+		try:
+			data = client.connection.recv(65536)
+		except socket.error as e:
+			if e.args[0] in retryErrors:
+				return
+			data = b""
+		if not data:
+			self.drop(client)
+			return
+		client.incoming += data
+		while b"\n" in client.incoming:
+			line, client.incoming = client.incoming.split(b"\n", 1)
+			if line.strip():
+				reply = self.handle(client, line)
+				client.outgoing += message(JSON, json.dumps(reply).encode("utf-8"))
+		if len(client.incoming) > 65536:
+			self.drop(client) #far longer than any command
+
+	#sends as much of what is waiting for a client as the socket will take
+	def flush(self, client):
+		try:
+			sent = client.connection.send(client.outgoing)
+		except socket.error as e:
+			if e.args[0] in retryErrors:
+				return
+			self.drop(client)
+			return
+		del client.outgoing[:sent]
+
+	#returns the reply to one line of json
+	def handle(self, client, line):
+		try:
+			request = json.loads(line.decode("utf-8"))
+			name = request["command"]
+		except (ValueError, KeyError, TypeError):
+			return {"ok": False, "error": "commands are json objects with a \"command\""}
+		reply = {"ok": True, "command": name}
+		if "id" in request:
+			reply["id"] = request["id"]
+		if name not in self.commands:
+			reply.update(ok=False, error="unknown command: %s" % name)
+			return reply
+		try:
+			with self.lock:
+				result = self.commands[name](client, request)
+				if self.worker.paused and name != "state":
+					self.worker.publish() #the thread doesn't publish while paused, so changes (and new subscribers) would get no frame
+		except (CommandError, KeyError, TypeError, ValueError) as e:
+			reply.update(ok=False, error=str(e))
+			return reply
+		if result is not None:
+			reply.update(result)
+		return reply
+
+	#called by the physics thread, with the lock held, each time it makes a snapshot; returns None if no one is subscribed, since encoding a frame copies every array
+	def capture(self):
+		if self.subscribers == 0:
+			return None
+		b = self.sim.bodies
+		names = b.names[:b.count]
+		if names != self.names:
+			self.names = list(names)
+			self.namesVersion += 1
+			self.namesJSON = json.dumps(self.names).encode("utf-8")
+		debris = self.sim.debris
+		return {
+			"slots": b.count,
+			"debris": len(debris),
+			"namesVersion": self.namesVersion,
+			"names": self.namesJSON,
+			"state": encodeState(b, self.sim.t, self.sim.steps, debris.pos[:len(debris)]),
+		}
+
+	#sends the newest snapshot to every subscribed client that isn't too far behind
+	def sendFrames(self):
+		snapshot = self.worker.acquireSnapshot()
+		try:
+			if snapshot.version == self.lastFrame or snapshot.extra is None:
+				return
+			self.lastFrame = snapshot.version
+			extra = snapshot.extra
+			messages = dict() #whether the names are included to the message, so each is only made once
+			for client in self.clients.values():
+				if not client.subscribed:
+					continue
+				if len(client.outgoing) > self.maxBacklog:
+					client.framesDropped += 1
+					continue
+				withNames = client.namesVersion != extra["namesVersion"]
+				if withNames not in messages:
+					messages[withNames] = frameMessage(extra["slots"], extra["debris"], extra["names"] if withNames else b"", extra["state"])
+				client.outgoing += messages[withNames]
+				client.namesVersion = extra["namesVersion"]
+				client.framesSent += 1
+		finally:
+			self.worker.releaseSnapshot()
+
+	#raises a CommandError if the craft has been destroyed
+	def requireCraft(self):
+		if not self.sim.hasCraft():
+			raise CommandError("there is no craft")
+
+	#returns a number from a command, checking that it is in range
+	def number(self, request, key, default=None, low=None):
+		value = request.get(key, default)
+		if value is None:
+			raise CommandError("%s is needed" % key)
+		value = float(value)
+		if math.isnan(value) or (low is not None and value < low):
+			raise CommandError("%s must be at least %g" % (key, low))
+		return value
+
+	###commands; each takes the client and the request, and returns what to add to the reply
+
+	def state(self, client, request):
+		sim = self.sim
+		b = sim.bodies
+		result = {
+			"t": sim.t,
+			"steps": sim.steps,
+			"bodies": len(b),
+			"debris": len(sim.debris),
+			"collisions": sim.collisionCount,
+			"paused": self.worker.paused,
+			"timeScale": self.worker.timeScale,
+			"measuredTimeScale": self.worker.measuredTimeScale,
+			"burnRate": sim.burnRate,
+			"exhaustSpeed": sim.exhaustSpeed,
+			"ammo": sim.ammo,
+			"clients": len(self.clients),
+			"framesSent": client.framesSent,
+			"framesDropped": client.framesDropped,
+		}
+		if sim.hasCraft():
+			craft = sim.craft
+			result["craft"] = {
+				"slot": int(craft),
+				"position": b.pos[craft].tolist(),
+				"velocity": b.vel[craft].tolist(),
+				"forward": b.forward[craft].tolist(),
+				"mass": float(b.mass[craft]),
+				"fuel": float(b.fuel[craft]),
+			}
+		if sim.conservation is not None and sim.conservation.latest() is not None:
+			sample = sim.conservation.latest()
+			result["conservation"] = {
+				"energy": float(sample["energy"]),
+				"energyDrift": float(sample["energyDrift"]),
+				"momentumDrift": float(sample["momentumDrift"]),
+				"angularDrift": float(sample["angularDrift"]),
+				"alerts": sim.conservation.alerts,
+			}
+		return result
+
+	#turns frames on (or off, with "frames": false); the next frame has the names in it
+	def subscribe(self, client, request):
+		subscribed = bool(request.get("frames", True))
+		self.subscribers += subscribed - client.subscribed
+		client.subscribed = subscribed
+		client.namesVersion = -1
+		return {"slots": self.sim.bodies.count}
+
+	def run(self, client, request):
+		self.worker.paused = False
+
+	def pause(self, client, request):
+		self.worker.paused = True
+
+	#simulated seconds per real second
+	def setTimeScale(self, client, request):
+		self.worker.timeScale = self.number(request, "value", low=0)
+
+	#kg of fuel burnt per second; the same as the Fuel Burn Rate slider
+	def thrust(self, client, request):
+		self.sim.applyInput("thrust", value=self.number(request, "value", low=0))
+
+	def setExhaustSpeed(self, client, request):
+		self.sim.applyInput("exhaustSpeed", value=self.number(request, "value", low=0))
+
+	#turns the craft left and up by angles in radians, like the arrow keys (pi/60) and turn buttons (pi/12)
+	def turn(self, client, request):
+		self.requireCraft()
+		forward = self.sim.applyInput("turn", left=self.number(request, "left", 0), up=self.number(request, "up", 0))
+		return {"forward": forward.tolist()}
+
+	#fires a projectile; any of radius, mass, speed and collisionType can be given
+	def fire(self, client, request):
+		self.requireCraft()
+		settings = dict(self.projectile)
+		settings.update((key, request[key]) for key in self.projectile if key in request)
+		if settings["collisionType"] not in ("elastic", "inelastic"):
+			raise CommandError("collisionType must be elastic or inelastic")
+		slot = self.sim.applyInput("fire", radius=float(settings["radius"]), mass=float(settings["mass"]), speed=float(settings["speed"]), collisionType=settings["collisionType"])
+		if slot is None:
+			raise CommandError("out of ammo")
+		return {"slot": int(slot), "ammo": self.sim.ammo}
+
+	def refuel(self, client, request):
+		self.requireCraft()
+		self.sim.applyInput("refuel", amount=self.number(request, "amount", self.refuelAmount, low=0))
+		return {"fuel": float(self.sim.bodies.fuel[self.sim.craft])}
+
+	def reload(self, client, request):
+		self.sim.applyInput("reload", amount=int(self.number(request, "amount", self.reloadAmount, low=0)))
+		return {"ammo": self.sim.ammo}
+
+	#places the craft back to where it started
+	def recentre(self, client, request):
+		self.requireCraft()
+		self.sim.applyInput("recentre")
+
+	#deletes all projectiles and debris
+	def clear(self, client, request):
+		return {"removed": self.sim.applyInput("clear")}
+
+	#shuts the server down once the reply has been sent
+	def stop(self, client, request):
+		self.running = False
+
+#runs a server from the command line
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Runs the spaceship simulation as a server that viewers connect to over a Unix socket; see simulationClient.py")
+	parser.add_argument("--socket", default="spaceship.sock", help="path of the Unix socket to listen on")
+	parser.add_argument("--time-scale", type=float, default=3600, help="simulated seconds per real second")
+	parser.add_argument("--frame-rate", type=float, default=30, help="frames sent to viewers per second")
+	parser.add_argument("--run", action="store_true", help="start running straight away instead of waiting for a run command")
+	parser.add_argument("--input-log", default=None, help="file to save the seed and inputs of the run to when the server stops, for replaying exactly with inputLog.py")
+	parser.add_argument("--seed", type=int, default=0, help="seed for the random numbers")
+	physicsEngine.addEngineArguments(parser)
+	args = parser.parse_args(argv)
+
+	sim = physicsEngine.makeEngine(args)
+	sim.reseed(args.seed)
+	inputs = None
+	if args.input_log is not None:
+		inputs = inputLog.InputLog(args.scenario, args.seed)
+		inputs.begin(sim)
+	projectile = {"radius": args.projectile_radius, "mass": args.projectile_mass, "speed": args.projectile_speed, "collisionType": args.collision_type}
+	server = SimulationServer(sim, args.socket, args.dt, args.time_scale, args.frame_rate, projectile)
+	server.start()
+	server.worker.paused = not args.run
+	print("serving %i bodies on %s" % (len(sim.bodies), args.socket))
+	try:
+		server.serveForever()
+	except KeyboardInterrupt:
+		server.close()
+	if inputs is not None:
+		inputs.end(sim)
+		inputs.save(args.input_log)
+	sim.close()
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,143 @@
+"""
+This runs the physics in its own thread, so that it is no longer tied to the frame rate of the display.
+The thread takes as many steps as it needs to keep up with the requested time scale, and every so often copies the state of the bodies into a snapshot.
+Snapshots are double buffered: the display reads the front one while the thread fills the back one, and the two are swapped when the back one is ready.
+"""
+
+from __future__ import division #does fun stuff
+import threading
+import time
+import numpy as np
+
+#a copy of the state of the bodies at one moment
+class Snapshot(object):
+	def __init__(self):
+		self.pos = np.zeros((0, 3))
+		self.vel = np.zeros((0, 3))
+		self.radius = np.zeros(0)
+		self.alive = np.zeros(0, dtype=bool)
+		self.t = 0 #simulated time of the snapshot
+		self.steps = 0 #number of steps taken when the snapshot was made
+		self.version = 0 #goes up by one every time a snapshot is published, so the display can tell if anything changed
+		self.extra = None #whatever the capture function returned, eg the list of things to draw
+
+	#copies the state of a BodySet into the snapshot, reusing the arrays if they are big enough
+	def fill(self, bodySet, t, steps, version, extra):
+		n = bodySet.count
+		if len(self.pos) != n:
+			self.pos = np.zeros((n, 3))
+			self.vel = np.zeros((n, 3))
+			self.radius = np.zeros(n)
+			self.alive = np.zeros(n, dtype=bool)
+		self.pos[:] = bodySet.pos[:n]
+		self.vel[:] = bodySet.vel[:n]
+		self.radius[:] = bodySet.radius[:n]
+		self.alive[:] = bodySet.alive[:n]
+		self.t = t
+		self.steps = steps
+		self.version = version
+		self.extra = extra
+
+#steps the physics in the background
+class SimulationThread(threading.Thread):
+	#constructor
+	"""
+	stepFunction is called with the step size and the simulated time that is owed to move the simulation forward by one step; it returns the simulated time it moved forward by, which can be more than one step if it skipped ahead
+	bodySet is the BodySet that the snapshots are copied from
+	lock is held while stepping; anything else that changes the bodies should hold it too
+	capture is an optional function whose result is stored with each snapshot
+	dt is the step size, in simulated seconds
+	timeScale is the number of simulated seconds to run per real second
+	frameRate is the number of snapshots to make per real second
+	"""
+	def __init__(self, stepFunction, bodySet, lock=None, capture=None, dt=60, timeScale=3600, frameRate=60):
+		threading.Thread.__init__(self)
+		self.daemon = True #lets the program exit while the thread is still running
+		self.stepFunction = stepFunction
+		self.bodies = bodySet
+		if lock is None:
+			lock = threading.RLock()
+		self.lock = lock
+		self.capture = capture
+		self.dt = dt
+		self.timeScale = timeScale
+		self.frameRate = frameRate
+		self.maxLag = 0.25 #most real seconds the simulation is allowed to fall behind by before it gives up catching up
+		self.paused = True
+		self.stopped = False
+		self.t = 0
+		self.steps = 0
+		self.publishedSteps = None #value of steps when the last snapshot was published
+		self.measuredTimeScale = 0 #simulated seconds actually run per real second
+
+		self.swapLock = threading.Lock()
+		self.front = Snapshot()
+		self.back = Snapshot()
+		self.reading = None
+
+	#stops the thread after the current step
+	def stop(self):
+		self.stopped = True
+
+	#returns the newest snapshot; call releaseSnapshot when done with it so that it can be reused
+	def acquireSnapshot(self):
+		with self.swapLock:
+			self.reading = self.front
+			return self.front
+
+	def releaseSnapshot(self):
+		with self.swapLock:
+			self.reading = None
+
+	#copies the bodies into the back snapshot and swaps it to the front
+	"""
+	the thread only publishes by itself after it has taken a step, so call this after changing the bodies while paused
+	"""
+	def publish(self):
+		with self.swapLock:
+			if self.back is self.reading:
+				return False #the display is still drawing it; try again later
+		extra = None
+		if self.capture is not None:
+			extra = self.capture()
+		self.back.fill(self.bodies, self.t, self.steps, self.front.version + 1, extra)
+		with self.swapLock:
+			self.front, self.back = self.back, self.front
+		self.publishedSteps = self.steps
+		return True
+
+	def run(self):
+		owed = 0 #simulated time that still needs to be run to keep up with the time scale
+		last = time.time()
+		lastPublish = 0
+		measureStart = last
+		measureTime = 0
+		while not self.stopped:
+			now = time.time()
+			if self.paused:
+				owed = 0
+			else:
+				owed = min(owed + (now - last)*self.timeScale, self.maxLag*self.timeScale + self.dt)
+			last = now
+
+			#takes as many steps as are owed, but still makes a snapshot for every frame
+			frameEnd = now + 1/self.frameRate
+			while owed >= self.dt and not self.paused and time.time() < frameEnd:
+				with self.lock:
+					moved = self.stepFunction(self.dt, owed)
+					self.t += moved
+					self.steps += 1
+				owed -= moved
+				measureTime += moved
+
+			#nothing is published while paused or between steps, so the display doesn't redraw the same state every frame
+			if self.steps != self.publishedSteps and time.time() - lastPublish >= 1/self.frameRate:
+				with self.lock:
+					if self.publish():
+						lastPublish = time.time()
+			if time.time() - measureStart >= 1:
+				self.measuredTimeScale = measureTime/(time.time() - measureStart)
+				measureStart = time.time()
+				measureTime = 0
+			if owed < self.dt or self.paused:
+				time.sleep(min(1/self.frameRate, 0.01))
@@ -6,11 +6,24 @@ This program simulates the movement of a spaceship through a multi-body system
 from __future__ import division #does fun stuff
 from visual import * #for the 3D graphics stuff
 import math
+import os
+import threading
+import time
 import wx #for buttons/controls
+import numpy as np
 
 import things #custom class for physics modelling
 import constants as c #a few useful constants
-import collisions #
+import bodies #array-backed physical state of everything in the system
+import engine #the physics, without any graphics
+import integrators #moves the objects forward in time
+import simulationThread #runs the physics in the background
+import uiSync #updates the controls and stats only when they change
+import recording #saves runs to a file and plays them back
+import profiling #times each phase of the physics and the display
+import scenario #reads the starting bodies from a file
+import inputLog #keeps the inputs of each run so that it can be replayed exactly
+import viewCulling #works out which bodies are on screen
 
 
 ###constants
@@ -23,6 +36,28 @@ maxExhaustSpeed = 200000	#maximum exhaust speed, m/s
 
 #simulation constants
 MAX_SIMULATION_TIME = 28*24*60*60 #max number of seconds to simulate
+TREE_GRAVITY = False #if true, uses a Barnes-Hut octree for gravity instead of adding up every pair
+OPENING_ANGLE = 0.5 #accuracy of the octree; smaller is more accurate but slower
+GRAVITY_WORKERS = 0 #number of processes to split exact gravity across, for thousands of bodies on a computer with several cores; 0 does it in the physics thread
+INTEGRATOR = integrators.Leapfrog() #see integrators.py for the others; integrators.Adaptive() takes smaller substeps during close passes, and integrators.BlockTimesteps() only takes them for the bodies that need them
+TEST_PARTICLE_RATIO = 1e-9 #bodies lighter than this fraction of the heaviest body (the craft, projectiles and asteroids) feel gravity but don't pull on anything; 0 adds up every pair
+FAST_FORWARD = True #if true, the physics skips ahead along Kepler orbits at high time scales while nothing is thrusting or about to collide
+CONTINUOUS_COLLISIONS = True #if true, fast projectiles can't pass through planets between steps, even with large time steps
+SCENARIO_PATH = os.path.join("scenarios", "default.json") #the bodies to start with; try scenarios/belt.json for 10000 asteroids (with TREE_GRAVITY)
+LAZY_REACH = 3 #bodies are drawn once they come within this many zoom levels of the camera
+LAZY_LIMIT = 200 #most bodies that start being drawn at once, so that the display doesn't stall
+FRAGMENTATION = True #if true, bodies that are hit hard enough break up and throw off debris
+DEBRIS_COLOUR = (1, .6, .3) #colour of the points that debris is drawn as
+MIN_PIXELS = 2 #bodies that would be smaller than this many pixels across are drawn as points; bodies off screen aren't moved at all
+
+STATS_RATE = 4 #number of times per second that the stats text is updated
+RECORDING_PATH = "recording.rec" #file that runs are recorded to and played back from
+INPUT_LOG_PATH = "inputs.json" #the seed and inputs of each run are saved here when it is reset or the program closes; "python inputLog.py inputs.json" replays it exactly
+SEED = 0 #seed for the random numbers, so that runs can be replayed
+CONSERVATION = True #if true, the energy and momentum are checked every step, and the energy drift is shown with the stats
+LIVE, RECORD, PLAYBACK = 0, 1, 2 #modes of the mode box
+PROFILE_PATH = "profile" #the profile is exported to profile.json, profile-physics.csv and profile-display.csv
+PROFILE_LINES = 14 #number of lines of text in the profile panel
 
 #window constants
 L = 640 		#window base unit
@@ -35,13 +70,82 @@ colourChoices = ['Green', 'Blue', 'Yellow', 'Pink', 'Cyan', 'Orange'] #colour op
 
 #simulation variables
 dt = 60         # The time step for the simulation
-frameRate = 60 	#number of frames to simulate per second
-t = 0 			#time passed
+frameRate = 60 	#number of frames to draw per second
+timeScale = 3600 #number of simulated seconds to run per real second
+burnrate = 0	#fuel burn rate of the craft; set by the display and passed to the physics as an input
 objects = list()#list of all things in the system that need to be animated and modelled
+cameraChanged = True #true if the camera needs to be moved even though the craft has not
+world = bodies.BodySet() #holds the positions, velocities, etc of all of the objects
+physics = engine.Engine(world, integrator=INTEGRATOR, treeGravity=TREE_GRAVITY, openingAngle=OPENING_ANGLE, continuousCollisions=CONTINUOUS_COLLISIONS, testParticleRatio=TEST_PARTICLE_RATIO, workers=GRAVITY_WORKERS, fastForward=FAST_FORWARD, fragmentation=FRAGMENTATION, seed=SEED, conservation=CONSERVATION) #does all of the physics on world
+physicsLock = threading.RLock() #held by the physics thread while it steps; hold it when changing objects from the display
+displayTimer = profiling.PhaseTimer("display") #times each phase of drawing a frame; physics.timer times the steps
+projectilePool = things.ProjectilePool(world) #cleared projectiles are reused when firing, instead of making new shapes every shot
+startScenario = scenario.load(SCENARIO_PATH) #parsed once; resetting copies it back into world
+scenery = things.LazyBodies(startScenario, world) #draws the bodies of the scenario once they are near the camera
+recorder = None #saves every step while recording
+inputs = None #the inputs of the current run
+playback = None #the recording being played back, if any
+playbackTime = 0 #simulated time of the step being played back
+playbackCentre = None #where the craft is in the step being played back
+playbackShapes = dict() #slot: (name, shape) of the shapes that draw the recording
+drawingChanges = list() #(step, function, arguments) of the changes to shapes that stepPhysics needs; the display thread makes them once it draws that step
 
 ##function definitions
+#moves the simulation forward by one step, or more if it can skip ahead by up to owed seconds; returns the simulated time it moved forward by
+#run by the physics thread while it holds physicsLock; it only changes lists, and leaves the shapes to the display thread (see applyDrawingChanges), which may be drawing them
+def stepPhysics(changeTime, owed):
+	global objects
+	moved = physics.step(changeTime, owed)
+	step = worker.steps + 1 #the step count of the snapshots that show this step
+
+	#objects that stuck together give their shapes to the object that absorbed them
+	if physics.joins:
+		bySlot = dict((o.index, o) for o in objects)
+		for absorber, absorbed in physics.joins:
+			if absorbed in bySlot:
+				if absorber in bySlot:
+					drawingChanges.append((step, bySlot[absorber].absorb, (bySlot[absorbed],)))
+				else:
+					drawingChanges.append((step, bySlot[absorbed].clear, (True,))) #the absorber isn't being drawn yet
+			scenery.forget(absorbed)
+		objects = [o for o in objects if world.alive[o.index]]
+
+	#bodies that broke up shrink, or go away if nothing is left of them; the debris is drawn from the snapshots
+	if physics.shattered:
+		bySlot = dict((o.index, o) for o in objects)
+		for slot, remnant in physics.shattered:
+			if remnant == 0:
+				scenery.forget(slot) #even if it was never drawn, so that its slot isn't mistaken for it
+			if slot not in bySlot:
+				continue
+			if remnant > 0:
+				drawingChanges.append((step, shrinkShapes, (bySlot[slot], remnant**(1/3))))
+			elif bySlot[slot].getName() == "projectile":
+				drawingChanges.append((step, projectilePool.release, (bySlot[slot], True)))
+			else:
+				drawingChanges.append((step, bySlot[slot].clear, (True,))) #scenery.forget has stopped it being reused, so its shapes and trail would only leak
+		objects = [o for o in objects if world.alive[o.index]]
+
+	#copies the step into the recording; the writing is done by the recorder's own thread
+	if recorder is not None:
+		recorder.record(world, physics.t, physics.steps)
+	return moved
+
+#scales the shapes of a thing, eg one that lost some of its mass when it broke up
+def shrinkShapes(thing, factor):
+	for shape in thing.shapes:
+		shape.radius *= factor
+
+#makes the changes to shapes that stepPhysics queued for the steps up to steps, or all of them if steps is None; run by the display thread
+def applyDrawingChanges(steps=None):
+	with physicsLock:
+		due = [change for change in drawingChanges if steps is None or change[0] <= steps]
+		drawingChanges[:] = [change for change in drawingChanges if steps is not None and change[0] > steps]
+	for step, function, arguments in due:
+		function(*arguments)
+
 #makes a list of strings that display stats about the craft
-def makeStatsStrings(craft, ratio, time):
+def makeStatsStrings(craft, ratio, time, dropped, monitor, treeError):
 	strings = list()
 	strings.append("Orientation: " + str(craft.getForward()) + "\n")
 	strings.append("Position: " + str(craft.getPos()) + "m\n")
@@ -62,27 +166,57 @@ def makeStatsStrings(craft, ratio, time):
 	strings.append("Time Scale: %i:1"%ratio)
 	strings.append("Mass: " + str(craft.getMass()) + "kg\n")
 	strings.append("Distance From Origin: " + str(mag(craft.getPos())) + "m")
+	if dropped is not None:
+		strings.append("Gravity Dropped: %.2g%% (%i test particles)" % (100*dropped["maxError"], dropped["testParticles"]))
+	else:
+		strings.append("")
+	sample = monitor.latest() if monitor is not None else None
+	if sample is not None:
+		strings.append("Energy Drift: %.2g%%%s" % (100*sample["energyDrift"], " (alert)" if monitor.alerted else ""))
+	else:
+		strings.append("")
+	if treeError is not None:
+		strings.append("Tree Gravity Error: %.2g%%" % (100*treeError["maxError"]))
+	else:
+		strings.append("")
 
 	return strings
 
-#makes all of the starting objects in the system
+#makes the lines of the profile panel from the newest samples of the physics and display timers
+def makeProfileStrings():
+	lines = physics.timer.describe() + displayTimer.describe()
+	lines = lines[:PROFILE_LINES]
+	return lines + [""]*(PROFILE_LINES - len(lines))
+
+#makes all of the starting objects in the system from the scenario
 def makeStartObjects():
+	world.clear()
+	physics.debris.clear()
 	obs = list()
 	#spaceship
-	obs.append(things.Craft(r=50, position=vector(0,0,6e7), forward=vector(0, 0, -1), velocity=vector(0, 0, -0), mass=mCraftI, length=lCraft, fuel=mFuelI, ammo=10, exhaustSpeed=exhaustSlider.GetValue()))
+	craft = startScenario.craft
+	obs.append(things.Craft(r=craft["radius"], position=vector(*craft["position"]), forward=vector(*craft["forward"]), velocity=vector(*craft["velocity"]), mass=craft["mass"], length=lCraft, fuel=craft["fuel"], ammo=craft["ammo"], exhaustSpeed=exhaustSlider.GetValue(), bodySet=world))
 	obs[0].setTrail(True)
+	physics.craft = obs[0].index
+	physics.ammo = craft["ammo"]
 
-	#planet 1
-	planet1 = list()
-	planet1.append(sphere(pos=vector(0,0,0), material=materials.earth, radius=c.radiusEarth))
-	obs.append(things.Thing(planet1, position=planet1[0].pos, forward=vector(1,0,0), velocity=vector(0,0,0), mass=.9*c.massEarth, name="earth1"))
-
-	#planet 2
-	planet2 = list() 
-	planet2.append(sphere(pos=vector(2e7,5e7,0), material=materials.BlueMarble, radius=c.radiusEarth))
-	obs.append(things.Thing(planet2, position=planet2[0].pos, forward=vector(1,0,0), velocity=vector(0, 0, 3e3), mass=c.massEarth, name="earth2"))
+	#everything else is copied in all at once; only the bodies that aren't lazy are drawn straight away
+	obs.extend(scenery.reset())
 	return obs
 
+#starts logging the inputs of a new run, so that it can be replayed exactly
+def startInputLog():
+	global inputs
+	things.seed(SEED)
+	inputs = inputLog.InputLog(SCENARIO_PATH, SEED)
+	inputs.begin(physics)
+
+#saves the inputs of the run so far to INPUT_LOG_PATH
+def saveInputLog():
+	if inputs is not None:
+		inputs.end(physics)
+		inputs.save(INPUT_LOG_PATH)
+
 #translates a number into a colour for use with the projectile colour and craft colour radioboxes
 def translateColour(colourNumber):
 	if(colourNumber == 0):
@@ -114,7 +248,7 @@ p1 = w1.panel
 stats = list()
 for i in range(0,8):
 	stats.append(wx.StaticText(p1, pos=(1.0*L,border + i*.023*L)))
-for i in range(0,2):
+for i in range(0,5):
 	stats.append(wx.StaticText(p1, pos=(1.0*L + 2*widgetL, border + i*.024*L)))
 
 ##simulation controls
@@ -131,6 +265,9 @@ rateSlider.text = wx.StaticText(p1, pos=(1.0*L, .41*L), label='Frames Per Second
 #specifies the time slider
 timeSlider = wx.Slider(p1, pos=(L,.35*L), size = (widgetL, widgetL), style = wx.SL_LABELS | wx.SL_HORIZONTAL, minValue = 1, maxValue = 300, value = dt)
 timeSlider.text = wx.StaticText(p1, pos=(1.0*L, .31*L), label="Time Step Size (s)\n")
+#specifies how many simulated seconds to run per real second; the physics takes as many steps as it needs to keep up
+warpSlider = wx.Slider(p1, pos=(1.0*L+2*widgetL,.35*L), size = (widgetL, widgetL), style = wx.SL_LABELS | wx.SL_HORIZONTAL, minValue = 1, maxValue = 100000, value = timeScale)
+warpSlider.text = wx.StaticText(p1, pos=(1.0*L+2*widgetL, .32*L), label="Time Warp (simulated s per real s)")
 #reset the simulation
 resetButton = wx.Button(p1, pos=(L, .5*L), label="Reset Simulation")
 
@@ -212,34 +349,81 @@ collisionTypeBox.SetSelection(1)
 collisionTypeBox.text = wx.StaticText(p1, pos=(L+widgetL,0.89*L), label='Projectile Collision Type')
 
 
+##recording and playback
+#runs the simulation, runs it while saving every step, or plays back the last recording
+modeBox = wx.RadioBox(p1, pos=(L+2*widgetL,0.45*L), size=(widgetL/2,90), choices=['Live', 'Record', 'Playback'], style=wx.RA_SPECIFY_ROWS)
+#seeks through the recording; Run/Pause plays and pauses it, at the speed of the time warp
+scrubSlider = wx.Slider(p1, pos=(1.0*L+2*widgetL,0.61*L), size=(widgetL,widgetL), style=wx.SL_LABELS | wx.SL_HORIZONTAL, minValue=0, maxValue=1000, value=0)
+scrubSlider.text = wx.StaticText(p1, pos=(1.0*L+2*widgetL,0.59*L), label='Playback Position (1/1000ths)')
+
+
+##profiling
+#times each phase of the physics and the display and shows them below
+profileBox = wx.RadioBox(p1, pos=(L+5*widgetL/2,0.45*L), size=(widgetL/2,65), choices=['Profile Off', 'Profile On'], style=wx.RA_SPECIFY_ROWS)
+#saves the profile so far
+exportButton = wx.Button(p1, pos=(L+5*widgetL/2,0.56*L), label='Export Profile')
+profileLabels = list()
+for i in range(0, PROFILE_LINES):
+	profileLabels.append(wx.StaticText(p1, pos=(1.0*L+2*widgetL, 0.68*L + i*.02*L)))
+
+
+#keeps track of the controls through their events instead of reading them every frame
+controls = uiSync.Controls()
+controls.watch("frameRate", rateSlider, wx.EVT_SLIDER)
+controls.watch("timeStep", timeSlider, wx.EVT_SLIDER)
+controls.watch("timeWarp", warpSlider, wx.EVT_SLIDER)
+controls.watch("zoom", zoomSlider, wx.EVT_SLIDER)
+controls.watch("vAngle", vSlider, wx.EVT_SLIDER)
+controls.watch("hAngle", hSlider, wx.EVT_SLIDER)
+controls.watch("thrust", thrustSlider, wx.EVT_SLIDER)
+controls.watch("exhaustSpeed", exhaustSlider, wx.EVT_SLIDER)
+controls.watch("running", startStop, wx.EVT_RADIOBOX, startStop.GetSelection, startStop.SetSelection)
+controls.watch("showTrails", showTrails, wx.EVT_RADIOBOX, showTrails.GetSelection, showTrails.SetSelection)
+controls.watch("craftColour", craftColourBox, wx.EVT_RADIOBOX, craftColourBox.GetSelection, craftColourBox.SetSelection)
+controls.watch("mode", modeBox, wx.EVT_RADIOBOX, modeBox.GetSelection, modeBox.SetSelection)
+controls.watch("profile", profileBox, wx.EVT_RADIOBOX, profileBox.GetSelection, profileBox.SetSelection)
+#only rebuilds the stats a few times a second
+hud = uiSync.StatsPanel(stats, STATS_RATE)
+profilePanel = uiSync.StatsPanel(profileLabels, STATS_RATE)
+
 #creates all of the starting objects in the system
 objects = makeStartObjects()
+startInputLog()
 
 ###event handler functions
 #I know they are in an ugly spot, but with how python handles variables and function definitions, I can't really put them anywhere else
 
+#the handlers that change the physics do it through physics.applyInput, while holding physicsLock, so that the change lands between steps and goes in the input log
+
 #adds more fuel to the ship
 def refill(evt):
-	objects[0].setFuel(objects[0].getFuel() + mFuelI)
+	with physicsLock:
+		physics.applyInput("refuel", amount=mFuelI)
 
 #adds more ammo to the ship
 def reload(evt):
-	objects[0].setAmmo(objects[0].getAmmo() + 10)
+	with physicsLock:
+		physics.applyInput("reload", amount=10)
+		objects[0].setAmmo(physics.ammo)
 
 #places the craft back to where it started
 def recentre(evt):
-	objects[0].setPos(vector(0,0,0))
-	objects[0].setVelocity(vector(0,0,0))
+	with physicsLock:
+		physics.applyInput("recentre")
+		worker.publish() #so that it is drawn there even while paused
 
-#deletes all projectiles
+#deletes all projectiles and debris
 def clear(evt):
-	i = 0
-	while(i < len(objects)): #need to use while loop because length of list can change
-		if(objects[i].getName() == "projectile"):
-			objects[i].clear() #deletes shapes; works kind of like a deconstructor
-			del objects[i]
-		else:
-			i += 1
+	with physicsLock:
+		physics.applyInput("clear") #the bodies are removed here; the loop below only hides their shapes
+		i = 0
+		while(i < len(objects)): #need to use while loop because length of list can change
+			if(objects[i].getName() == "projectile"):
+				projectilePool.release(objects[i]) #hides it until it is fired again
+				del objects[i]
+			else:
+				i += 1
+		worker.publish() #so that the deleted projectiles are not drawn from an old snapshot
 
 #fires a projectile from the craft
 def fire(evt):
@@ -257,28 +441,43 @@ def fire(evt):
 		collisionType = "inelastic"
 
 	#should create a new object that flies through space
-	if(objects[0].getAmmo() > 0):
-		objects.append(objects[0].fireAmmo(colour, radius, mass, dSpeed, collisionType, trails))
+	with physicsLock:
+		slot = physics.applyInput("fire", radius=radius, mass=mass, speed=dSpeed, collisionType=collisionType)
+		if slot is not None:
+			objects.append(projectilePool.adopt(slot, colour))
+			worker.publish() #so that it is drawn even while paused
+		objects[0].setAmmo(physics.ammo)
+	if slot is not None:
 		trailsValue = False
 		if showTrails.GetSelection() == 1:
 			trailsValue = True
 		objects[len(objects) - 1].setTrail(trailsValue)
 
+#turns the craft with its shapes, and passes the direction it ends up facing on to the physics as an input
+def turnCraft(left, up):
+	with physicsLock:
+		if left != 0:
+			objects[0].turnLeft(left)
+		if up != 0:
+			objects[0].turnUp(up)
+		physics.applyInput("aim", forward=world.forward[physics.craft].copy())
+	moveCamera()
+
 #turns the craft to the left
 def turnLeft(evt):
-	objects[0].turnLeft(math.pi/12)
+	turnCraft(math.pi/12, 0)
 
 #turns the craft to the right
 def turnRight(evt):
-	objects[0].turnLeft(-math.pi/12)
+	turnCraft(-math.pi/12, 0)
 
 #turns the craft up
 def turnUp(evt):
-	objects[0].turnUp(math.pi/12)
+	turnCraft(0, math.pi/12)
 
 #turns the craft down
 def turnDown(evt):
-	objects[0].turnUp(-math.pi/12)
+	turnCraft(0, -math.pi/12)
 
 #handles a variety of text intputs
 def keyPress(evt):
@@ -286,62 +485,178 @@ def keyPress(evt):
 	keycode = evt.GetKeyCode()
 
 	if(keycode == 315): #up arrow, rotates craft upwards
-		objects[0].turnUp(math.pi/60)
+		turnCraft(0, math.pi/60)
 	elif(keycode == 317): #down arrow, rotates craft down
-		objects[0].turnUp(-math.pi/60)
+		turnCraft(0, -math.pi/60)
 	elif(keycode == 314): #left arrow, rotates craft left
-		objects[0].turnLeft(math.pi/60)
+		turnCraft(math.pi/60, 0)
 	elif(keycode == 316): #right arrow, rotates craft right
-		objects[0].turnLeft(-math.pi/60)
+		turnCraft(-math.pi/60, 0)
 	elif(keycode == 87): #w, turns camera up
-		currentAngle = vSlider.GetValue()
+		currentAngle = controls.get("vAngle")
 		if currentAngle <= 180 - 4:
-			vSlider.SetValue(currentAngle + 4)
+			controls.set("vAngle", currentAngle + 4)
 		else:
-			vSlider.SetValue(currentAngle - 360 + 4)
+			controls.set("vAngle", currentAngle - 360 + 4)
 	elif(keycode == 83): #s, turns camera down
-		currentAngle = vSlider.GetValue()
+		currentAngle = controls.get("vAngle")
 		if currentAngle >= -180 + 4:
-			vSlider.SetValue(currentAngle - 4)
+			controls.set("vAngle", currentAngle - 4)
 		else:
-			vSlider.SetValue(currentAngle + 360 - 4)
+			controls.set("vAngle", currentAngle + 360 - 4)
 	elif(keycode == 65): #a, turns camera left
-		currentAngle = hSlider.GetValue()
+		currentAngle = controls.get("hAngle")
 		if currentAngle <= 180 - 4:
-			hSlider.SetValue(currentAngle + 4)
+			controls.set("hAngle", currentAngle + 4)
 		else:
-			hSlider.SetValue(currentAngle - 360 + 4)
+			controls.set("hAngle", currentAngle - 360 + 4)
 	elif(keycode == 68): #d, turns camera right
-		currentAngle = hSlider.GetValue()
+		currentAngle = controls.get("hAngle")
 		if currentAngle >= -180 + 4:
-			hSlider.SetValue(currentAngle - 4)
+			controls.set("hAngle", currentAngle - 4)
 		else:
-			hSlider.SetValue(currentAngle + 360 - 4)
+			controls.set("hAngle", currentAngle + 360 - 4)
 	elif(keycode >= 48) and (keycode <= 57): #set thruster power using 0-9 keys
 		value = keycode - 48
-		thrustSlider.SetValue(value*1000*maxBurnRate/9)
+		controls.set("thrust", int(value*1000*maxBurnRate/9))
 	elif(keycode == 80): #p, pause/play
-		if(startStop.GetSelection() == 0):
-			startStop.SetSelection(1)
+		if(controls.get("running") == 0):
+			controls.set("running", 1)
 		else:
-			startStop.SetSelection(0)
+			controls.set("running", 0)
 	elif(keycode == 82): #r, refuel
 		refill(evt)
 	elif(keycode == 70): #f, fire
 		fire(evt)
 	elif(keycode == 76): #l, reload
 		reload(evt)
+	moveCamera() #the arrow keys turn the craft, which turns the camera
+
+#starts a new recording, overwriting the last one
+def startRecording():
+	global recorder
+	with physicsLock:
+		stopRecording()
+		recorder = recording.Recorder(RECORDING_PATH)
+		recorder.record(world, physics.t, physics.steps)
+
+#writes out the rest of the recording
+def stopRecording():
+	global recorder
+	with physicsLock:
+		if recorder is not None:
+			recorder.close()
+			recorder = None
+
+#makes a shape to draw a recorded body with
+def makeRecordedShape(name, radius):
+	if name == "craft":
+		return arrow(axis=vector(0,0,-lCraft), shaftwidth=.1*lCraft, material=materials.marble, color=translateColour(controls.get("craftColour")))
+	elif name == "earth1":
+		return sphere(radius=radius, material=materials.earth)
+	elif name == "earth2":
+		return sphere(radius=radius, material=materials.BlueMarble)
+	return sphere(radius=radius, material=materials.emissive, color=translateColour(projectileColourBox.GetSelection()))
+
+#draws step i of the recording being played back
+def drawRecordedFrame(i):
+	global playbackCentre, cameraChanged
+	frame, names = playback.frame(i)
+	pos, forward, radius, alive = frame["pos"], frame["forward"], frame["radius"], frame["alive"]
+	for slot in list(playbackShapes):
+		#the slot was reused by something else, or no longer exists
+		if slot >= len(names) or playbackShapes[slot][0] != names[slot]:
+			playbackShapes.pop(slot)[1].visible = False
+	for slot in range(0, len(names)):
+		if not alive[slot]:
+			if slot in playbackShapes:
+				playbackShapes[slot][1].visible = False
+			continue
+		if slot not in playbackShapes:
+			playbackShapes[slot] = (names[slot], makeRecordedShape(names[slot], radius[slot]))
+		shape = playbackShapes[slot][1]
+		shape.visible = True
+		shape.pos = vector(*pos[slot])
+		if names[slot] == "craft":
+			shape.axis = lCraft*norm(vector(*forward[slot]))
+			playbackCentre = shape.pos
+	cameraChanged = True
+
+#hides the live objects and shows the recording instead; the physics stays paused until playback stops
+def startPlayback():
+	global playback, playbackTime
+	stopRecording()
+	if not os.path.exists(RECORDING_PATH):
+		controls.set("mode", LIVE)
+		return
+	playback = recording.Recording(RECORDING_PATH)
+	if len(playback) == 0:
+		playback = None
+		controls.set("mode", LIVE)
+		return
+	controls.set("running", 0)
+	for o in objects:
+		o.setVisible(False)
+	playbackTime = playback.startTime()
+	scrubSlider.SetValue(0)
+	drawRecordedFrame(0)
+
+#removes the recording from the display and shows the live objects again
+def stopPlayback():
+	global playback, playbackCentre
+	for name, shape in playbackShapes.values():
+		shape.visible = False
+	playbackShapes.clear()
+	playback = None
+	playbackCentre = None
+	controls.set("running", 0)
+	for o in objects:
+		o.setVisible(True)
+		o.setTrail(trails == 1)
+	objects[0].animateTail(burnrate)
+	moveCamera()
+
+#jumps to the part of the recording picked with the scrub slider
+def scrub(evt):
+	global playbackTime
+	if playback is not None:
+		playbackTime = playback.startTime() + (playback.endTime() - playback.startTime())*scrubSlider.GetValue()/1000.
+		drawRecordedFrame(playback.find(playbackTime))
+
+#writes the profile so far as json and csv
+def exportProfile(evt):
+	physics.timer.sample()
+	displayTimer.sample()
+	profiling.writeJSON(PROFILE_PATH + ".json", [physics.timer, displayTimer])
+	physics.timer.writeCSV(PROFILE_PATH + "-physics.csv")
+	displayTimer.writeCSV(PROFILE_PATH + "-display.csv")
 
 #resets the simulation to starting conditions
 def resetSim(evt):
 	global objects
-	global t
-	#deletes all of the objects
-	for o in objects:
-		o.clear() #works kinda like a deconstructor
-		del o
-	objects = makeStartObjects() #resets objects to starting condition
-	t = 0
+	if playback is not None:
+		return #the live objects are hidden
+	with physicsLock:
+		applyDrawingChanges() #so that nothing from before the reset is changed afterwards
+		saveInputLog()
+		#deletes all of the objects; projectiles are kept to be fired again, and the bodies of the scenario are moved back by makeStartObjects
+		scenic = set(id(o) for o in scenery.things.values())
+		for o in objects:
+			if o.getName() == "projectile":
+				projectilePool.release(o)
+			elif id(o) not in scenic:
+				o.clear() #works kinda like a deconstructor
+			del o
+		objects = makeStartObjects() #resets objects to starting condition
+		setCraftColour(controls.get("craftColour"))
+		objects[0].animateTail(burnrate)
+		worker.t = 0
+		physics.t = 0
+		physics.disturbed = True #the totals start over
+		startInputLog() #the old log was saved; only the newest run is kept
+		worker.publish() #so that the deleted objects are not drawn from an old snapshot
+		if recorder is not None:
+			startRecording() #the time went back to 0, so the old recording can't be added to
 
 
 ##bind buttons to handler functions
@@ -355,105 +670,197 @@ reloadButton.Bind(wx.EVT_BUTTON, reload)
 resetButton.Bind(wx.EVT_BUTTON, resetSim)
 recentreButton.Bind(wx.EVT_BUTTON, recentre)
 clearButton.Bind(wx.EVT_BUTTON, clear)
+scrubSlider.Bind(wx.EVT_SLIDER, scrub)
+exportButton.Bind(wx.EVT_BUTTON, exportProfile)
 
 #binds keys to handler function
 p1.Bind(wx.EVT_CHAR_HOOK, keyPress) #ideally, want to replace with two functions (key down and key up) so I don't have to rely on repeating keys, etc
 
-###main loop
-while t < MAX_SIMULATION_TIME:
-	#updates rates 
-	frameRate = rateSlider.GetValue()
-	dt = timeSlider.GetValue()
+#starts the physics; it stays paused until "Run" is selected
+worker = simulationThread.SimulationThread(stepPhysics, world, lock=physicsLock, capture=lambda: (list(objects), physics.debris.pos[:len(physics.debris)].copy()), dt=dt, timeScale=timeScale, frameRate=frameRate)
+worker.start()
+
+###control listeners; these are only called when a control changes
+def setFrameRate(value):
+	global frameRate
+	frameRate = value
+	worker.frameRate = value
+
+def setTimeStep(value):
+	worker.dt = value
+
+def setTimeWarp(value):
+	worker.timeScale = value
 
+#pauses or runs the physics; during playback it plays or pauses the recording instead
+def setRunning(value):
+	worker.paused = (value == 0) or playback is not None
+
+#sets exhaust velocity
+def setExhaustSpeed(value):
+	objects[0].setExhaustSpeed(value)
+	physics.queueInput("exhaustSpeed", value=value)
+
+def setCraftColour(value):
+	objects[0].setColour(translateColour(value))
+
+#show/hide trails
+def setTrails(value):
+	global trails
+	trails = value
+	for o in objects:
+		o.setTrail(trails == 1)
+
+#switches between running live, recording and playing back
+def setMode(value):
+	if value == RECORD:
+		startRecording()
+	else:
+		stopRecording()
+	if value == PLAYBACK:
+		startPlayback()
+	elif playback is not None:
+		stopPlayback()
+
+#turns the timers on or off; they cost next to nothing when they are off
+def setProfiling(value):
+	physics.timer.setEnabled(value == 1)
+	displayTimer.setEnabled(value == 1)
+	for label in profileLabels:
+		label.Show(value == 1)
+
+#the camera is moved on the next frame
+def moveCamera(value=None):
+	global cameraChanged
+	cameraChanged = True
+
+controls.listen("frameRate", setFrameRate)
+controls.listen("timeStep", setTimeStep)
+controls.listen("timeWarp", setTimeWarp)
+controls.listen("running", setRunning)
+controls.listen("exhaustSpeed", setExhaustSpeed)
+controls.listen("craftColour", setCraftColour)
+controls.listen("showTrails", setTrails)
+controls.listen("mode", setMode, now=False)
+controls.listen("profile", setProfiling)
+for name in ("zoom", "vAngle", "hAngle"):
+	controls.listen(name, moveCamera)
+
+#points the camera at the craft
+def updateCamera():
+	global cameraChanged
+	newZoom = controls.get("zoom")
+	newV = controls.get("vAngle")*math.pi/180
+	newH = controls.get("hAngle")*math.pi/180
+	objects[0].setCameraAngle(display1, newH, newV, newZoom)
+	if playbackCentre is not None:
+		display1.center = playbackCentre #looks at the recorded craft instead
+	cameraChanged = False
+
+#starts drawing the lazy bodies of the scenario that have come near the camera
+def drawNearbyBodies():
+	global objects
+	with physicsLock:
+		new = scenery.update(display1.center, LAZY_REACH*controls.get("zoom"), LAZY_LIMIT)
+		for o in new:
+			o.setTrail(trails == 1)
+		objects = objects + new
+
+###main loop; only draws things, the physics runs in worker
+renderer = things.RenderSync(MIN_PIXELS) #only moves the shapes of the things that are on screen
+drawnVersion = -1 #version of the snapshot that is on screen
+drawnThings = list() #things in the snapshot that is on screen
+drawnPos = np.zeros((0, 3)) #positions of every slot in the snapshot that is on screen
+drawnRadius = np.zeros(0) #radii of every slot in the snapshot that is on screen
+debrisCloud = points(pos=[], size=2, color=DEBRIS_COLOUR) #every fragment of debris, drawn as one object
+lastFrame = time.time()
+lastLazyCheck = 0
+while worker.t < MAX_SIMULATION_TIME:
 	#specifies the max rate this loop will run at
+	displayTimer.begin()
 	rate(frameRate)
+	displayTimer.lap("wait")
+	now = time.time()
+	frameTime = now - lastFrame
+	lastFrame = now
+
+	#plays back the recording at the speed of the time warp; no physics is done
+	if playback is not None:
+		if controls.get("running") == 1 and playbackTime < playback.endTime():
+			playbackTime = min(playbackTime + frameTime*controls.get("timeWarp"), playback.endTime())
+			drawRecordedFrame(playback.find(playbackTime))
+			if playback.endTime() > playback.startTime():
+				scrubSlider.SetValue(int(1000*(playbackTime - playback.startTime())/(playback.endTime() - playback.startTime())))
+		if cameraChanged:
+			updateCamera()
+		displayTimer.lap("playback")
+		displayTimer.end()
+		continue
 
-	#update Camera Angle
-	newZoom = zoomSlider.GetValue()
-	newV = vSlider.GetValue()*math.pi/180
-	newH = hSlider.GetValue()*math.pi/180
-	objects[0].setCameraAngle(display1, newH, newV, newZoom)
+	#takes the newest snapshot of the physics, if it is new
+	snapshot = worker.acquireSnapshot()
+	newSnapshot = snapshot.version != drawnVersion and snapshot.extra is not None
+	if newSnapshot:
+		drawnThings, drawnDebris = snapshot.extra
+		drawnPos = snapshot.pos.copy()
+		drawnRadius = snapshot.radius.copy() #the live radii can change while this frame is drawn
+		drawnVersion = snapshot.version
+		drawnSteps = snapshot.steps
+	worker.releaseSnapshot()
+	if newSnapshot:
+		applyDrawingChanges(drawnSteps) #only the changes of steps that the snapshot shows, since its things still have their shapes
+
+	#the camera follows the craft, so the craft is moved first; then only the shapes that the camera can see are moved
+	if newSnapshot:
+		objects[0].moveShapes(vector(*drawnPos[objects[0].index]))
+	cameraMoved = newSnapshot or cameraChanged
+	if cameraChanged:
+		updateCamera()
+	displayTimer.lap("camera")
+	if cameraMoved:
+		renderer.sync(drawnThings, drawnPos, drawnRadius, display1, always=(objects[0],))
+	displayTimer.lap("shapes")
+	displayTimer.count("culled", renderer.counts[viewCulling.CULLED])
+	displayTimer.count("points", renderer.counts[viewCulling.POINT])
+	if newSnapshot:
+		debrisCloud.pos = drawnDebris
+	if newSnapshot:
+		for o in drawnThings:
+			o.updateTrail(vector(*drawnPos[o.index]), o.detail != viewCulling.CULLED)
+	displayTimer.lap("trails")
+
+	#only checks for new bodies to draw a few times a second
+	if now - lastLazyCheck >= 1/STATS_RATE:
+		drawNearbyBodies()
+		lastLazyCheck = now
+	displayTimer.lap("lazy")
 
 	#update stats
-	strings = makeStatsStrings(objects[0], frameRate*dt, t)
-	for i in range(0,len(stats)):
-		stats[i].SetLabel(strings[i])
+	hud.update(lambda: makeStatsStrings(objects[0], worker.measuredTimeScale, worker.t, physics.droppedForce, physics.conservation, physics.treeError))
+	if physics.timer.enabled:
+		profilePanel.update(makeProfileStrings)
+	displayTimer.lap("stats")
 
 	#set fuel burn rate
-	burnrate = 0
-	if(objects[0].getFuel() > 0) and (thrustSlider.GetValue() > 0):
-		burnrate = thrustSlider.GetValue()/1000.
+	newBurnrate = 0
+	if(objects[0].getFuel() > 0) and (controls.get("thrust") > 0):
+		newBurnrate = controls.get("thrust")/1000.
 	else:
-		burnrate = 0
-		thrustSlider.SetValue(0)
-	#sets exhaust velocity
-	objects[0].setExhaustSpeed(exhaustSlider.GetValue())
-
-	#show/hide trails
-	if trails != showTrails.GetSelection():
-		trails = showTrails.GetSelection()
-		trailsValue = False
-		if trails == 1:
-			trailsValue = True
-		for o in objects:
-			o.setTrail(trailsValue)
-
-	#set craft colour
-	colour = translateColour(craftColourBox.GetSelection())
-	objects[0].setColour(colour)
-
-	#if simulation is paused, loop back to start
-	checkIfRunning = startStop.GetSelection()
-	if checkIfRunning == 0:
-		continue
-
-	#update time
-	t += dt
-
-	#check for collisions and handles them. This is done before calculating forces to try to stop singularities from happening
-	i=0
-	#using while loop because length of list could change
-	while i < len(objects):
-		j=i
-		while j < len(objects):
-			if(i != j):
-				if objects[i].isTouching(objects[j]):
-					objects[i].separate(objects[j]) #gets the objects to no longer touch; if objects are touching for too long, they can reach the same point, causing a divide by zero on the gravitation
-					if objects[i].collisionType == "elastic" and objects[j].collisionType == "elastic":
-						collisions.elasticCollision(objects[i], objects[j])
-					elif objects[i].collisionType == "elastic" or objects[j].collisionType == "inelastic":
-						objects[i].join(objects[j])
-						del objects[j]
-					else:
-						objects[i].join(objects[j])
-						del objects[j]
-			j += 1
-		i += 1
-
-	#force calculations
-	force = list()
-	for i in range(0, len(objects)): #initialize to zero
-		 force.append(vector(0,0,0))
-	for i in range(0, len(objects)):
-		for j in range(i, len(objects)):
-			if(i != j):
-				forceij = objects[i].gravForce(objects[j])
-				force[i] += forceij
-				force[j] -= forceij
-	#add force of rocket
-	force[0] += objects[0].rocketForce(burnrate, dt)
-
-	#move the objects
-	for i in range(0, len(objects)):
-		objects[i].autoMove(force[i], dt)
+		controls.set("thrust", 0)
+	if newBurnrate != burnrate:
+		burnrate = newBurnrate
+		physics.queueInput("thrust", value=burnrate)
+		objects[0].animateTail(burnrate)
+	displayTimer.end()
 
+worker.stop()
+stopRecording()
+saveInputLog()
 
 #pauses output so that you can look around
 while True:
 	rate(10)
-	newZoom = zoomSlider.GetValue()
-	newV = vSlider.GetValue()*math.pi/180
-	newH = hSlider.GetValue()*math.pi/180
-	objects[0].setCameraAngle(display1, newH, newV, newZoom)
+	if cameraChanged:
+		updateCamera()
 
 
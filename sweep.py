@@ -0,0 +1,135 @@
+"""
+This runs the simulation headlessly for many different sets of parameters at once, spreading the runs over every core with a process pool.
+Each run starts from the same bodies as the GUI (see engine.addStartBodies) and returns a row of summary results; the rows are collected into one table, eg
+	python sweep.py --burn-rate 0 0.25 0.5 --exhaust-speed 20000 60000 --time 86400 --output results.csv
+"""
+
+from __future__ import division #does fun stuff
+import argparse
+import csv
+import itertools
+import multiprocessing
+import time
+import numpy as np
+
+import constants as c #gives useful physics constants
+import engine #the physics, without any graphics
+import integrators #moves the bodies forward in time
+
+#parameters of a run, and what they are if they are not given
+defaults = {
+	"burnRate": 0.,				#fuel burnt per second, kg/s
+	"exhaustSpeed": 60000.,		#m/s
+	"craftMass": 30e3,			#mass of the craft when empty, kg
+	"fuel": 1e4,				#kg
+	"projectiles": 0,			#number fired, one per step from the start
+	"projectileRadius": .05*c.radiusEarth,
+	"projectileMass": 10.,
+	"projectileSpeed": 15000.,
+	"collisionType": "elastic",
+	"dt": 60.,
+	"duration": 24*60*60.,		#simulated seconds
+	"integrator": "leapfrog",
+}
+
+#order of the columns in the results table
+columns = sorted(defaults) + ["finalX", "finalY", "finalZ", "closestApproach", "fuelUsed", "collisions", "bodies", "wallTime"]
+
+#runs one scenario and returns its parameters together with the results
+"""
+params is a dictionary of parameters; anything missing is taken from defaults
+closestApproach is the smallest distance between the surface of the craft and the surface of any of the starting bodies; it is negative if they hit
+"""
+def runScenario(params):
+	p = dict(defaults)
+	p.update(params)
+	start = time.time()
+
+	sim = engine.Engine(integrator=integrators.integratorTypes[p["integrator"]]())
+	sim.craft = engine.addStartBodies(sim.bodies, craftMass=p["craftMass"], fuel=p["fuel"])
+	sim.burnRate = p["burnRate"]
+	sim.exhaustSpeed = p["exhaustSpeed"]
+	sim.ammo = p["projectiles"]
+	b = sim.bodies
+	others = [s for s in b.active() if s != sim.craft]
+
+	closest = float("inf")
+	steps = int(np.ceil(p["duration"]/p["dt"]))
+	for k in range(0, steps):
+		if k < p["projectiles"]:
+			sim.fire(p["projectileRadius"], p["projectileMass"], p["projectileSpeed"], p["collisionType"])
+		sim.step(p["dt"])
+		alive = [s for s in others if b.alive[s]]
+		if alive:
+			gaps = np.sqrt(np.sum((b.pos[alive] - b.pos[sim.craft])**2, axis=1)) - b.radius[alive] - b.radius[sim.craft]
+			closest = min(closest, np.min(gaps))
+
+	row = dict(p)
+	row["finalX"], row["finalY"], row["finalZ"] = b.pos[sim.craft]
+	row["closestApproach"] = closest
+	row["fuelUsed"] = p["fuel"] - b.fuel[sim.craft]
+	row["collisions"] = sim.collisionCount
+	row["bodies"] = len(b)
+	row["wallTime"] = time.time() - start
+	return row
+
+#returns a list of scenarios with every combination of the given values
+"""
+each keyword is a parameter name with a list of values to try, eg grid(burnRate=[0, .5], exhaustSpeed=[2e4, 6e4]) gives four scenarios
+"""
+def grid(**values):
+	names = sorted(values)
+	return [dict(zip(names, combination)) for combination in itertools.product(*[values[n] for n in names])]
+
+#runs every scenario over a pool of processes and returns the rows of results in the same order
+"""
+processes is the number of worker processes; every core is used if it is None
+"""
+def runSweep(scenarios, processes=None):
+	if processes == 1:
+		return [runScenario(s) for s in scenarios]
+	pool = multiprocessing.Pool(processes)
+	try:
+		return pool.map(runScenario, scenarios, chunksize=1)
+	finally:
+		pool.close()
+		pool.join()
+
+#writes the rows of results to a csv file
+def writeTable(rows, path):
+	with open(path, "w") as f:
+		writer = csv.DictWriter(f, fieldnames=columns)
+		writer.writeheader()
+		for row in rows:
+			writer.writerow(row)
+
+#runs a sweep from the command line
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Runs the simulation for every combination of the given parameters in parallel and writes a table of results")
+	parser.add_argument("--burn-rate", type=float, nargs="+", default=[defaults["burnRate"]])
+	parser.add_argument("--exhaust-speed", type=float, nargs="+", default=[defaults["exhaustSpeed"]])
+	parser.add_argument("--craft-mass", type=float, nargs="+", default=[defaults["craftMass"]])
+	parser.add_argument("--fuel", type=float, nargs="+", default=[defaults["fuel"]])
+	parser.add_argument("--projectiles", type=int, nargs="+", default=[defaults["projectiles"]])
+	parser.add_argument("--projectile-radius", type=float, nargs="+", default=[defaults["projectileRadius"]])
+	parser.add_argument("--projectile-mass", type=float, nargs="+", default=[defaults["projectileMass"]])
+	parser.add_argument("--projectile-speed", type=float, nargs="+", default=[defaults["projectileSpeed"]])
+	parser.add_argument("--collision-type", nargs="+", choices=["elastic", "inelastic"], default=[defaults["collisionType"]])
+	parser.add_argument("--dt", type=float, default=defaults["dt"], help="step size, in seconds")
+	parser.add_argument("--time", type=float, default=defaults["duration"], help="simulated seconds per run")
+	parser.add_argument("--integrator", choices=sorted(integrators.integratorTypes), default=defaults["integrator"])
+	parser.add_argument("--processes", type=int, default=None, help="number of worker processes; defaults to the number of cores")
+	parser.add_argument("--output", default="sweep.csv", help="csv file to write the results to")
+	args = parser.parse_args(argv)
+
+	scenarios = grid(burnRate=args.burn_rate, exhaustSpeed=args.exhaust_speed, craftMass=args.craft_mass, fuel=args.fuel,
+		projectiles=args.projectiles, projectileRadius=args.projectile_radius, projectileMass=args.projectile_mass,
+		projectileSpeed=args.projectile_speed, collisionType=args.collision_type,
+		dt=[args.dt], duration=[args.time], integrator=[args.integrator])
+	start = time.time()
+	rows = runSweep(scenarios, args.processes)
+	writeTable(rows, args.output)
+	print("%i runs in %.2f s, written to %s" % (len(rows), time.time() - start, args.output))
+
+if __name__ == "__main__":
+	main()
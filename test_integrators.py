@@ -0,0 +1,74 @@
+"""
+Checks that block time steps only reuse the forces of the last step when nothing but the positions changed them, and that they can go finer part way through a step.
+Run with "python -m unittest test_integrators" or pytest; nothing here imports VPython or wx.
+"""
+
+from __future__ import division #does fun stuff
+import math
+import unittest
+import numpy as np
+
+import engine #the physics, without any graphics
+import integrators #moves the bodies forward in time
+
+#returns an engine with the craft and two planets of the GUI, stepped with block time steps
+def makeEngine():
+	sim = engine.Engine(integrator=integrators.BlockTimesteps())
+	sim.craft = engine.addStartBodies(sim.bodies)
+	return sim
+
+#steps two engines that start the same; the first keeps the forces from its last step, and the second has to work them all out again
+def stepBoth(kept, fresh, changeTime=60):
+	fresh.integrator.reset()
+	kept.step(changeTime)
+	fresh.step(changeTime)
+
+class BlockTimestepCacheTest(unittest.TestCase):
+	#starting to thrust changes the mass of the craft, and so every force
+	def testThrustStarting(self):
+		kept, fresh = makeEngine(), makeEngine()
+		stepBoth(kept, fresh)
+		kept.burnRate = fresh.burnRate = 100
+		stepBoth(kept, fresh)
+		np.testing.assert_array_equal(kept.bodies.pos, fresh.bodies.pos)
+		np.testing.assert_array_equal(kept.bodies.vel, fresh.bodies.vel)
+
+	#stopping leaves the masses as they were in the last step, so only the thrust of the craft is different
+	def testThrustStopping(self):
+		kept, fresh = makeEngine(), makeEngine()
+		kept.burnRate = fresh.burnRate = 100
+		stepBoth(kept, fresh)
+		stepBoth(kept, fresh)
+		kept.burnRate = fresh.burnRate = 0
+		stepBoth(kept, fresh)
+		np.testing.assert_array_equal(kept.bodies.pos, fresh.bodies.pos)
+		np.testing.assert_array_equal(kept.bodies.vel, fresh.bodies.vel)
+
+	#the forces are still reused while nothing else changes
+	def testReuse(self):
+		sim = makeEngine()
+		sim.step(60)
+		b = sim.bodies
+		acc, freeFall, evaluated = sim.integrator.startingAccelerations(b.pos[b.active()], None)
+		self.assertEqual(evaluated, 0)
+
+class BlockTimestepLevelTest(unittest.TestCase):
+	#a body that starts far from a planet at a coarse level has to go finer as it falls in, part way through the step
+	def testFinerDuringStep(self):
+		G = 6.674e-11
+		pos = np.array([[0., 0., 0.], [1e8, 0., 0.]])
+		vel = np.array([[0., 0., 0.], [-2e4, 0., 0.]])
+		mass = np.array([6e24, 1.])
+		def accel(p, targets, freeFall):
+			sep = p[0] - p[1]
+			d = math.sqrt(np.dot(sep, sep))
+			acc = np.array([-sep*G*mass[1]/d**3, sep*G*mass[0]/d**3])
+			fall = np.full(2, math.sqrt(d**3/(G*mass.sum())))
+			return acc[targets], fall[targets]
+		integrator = integrators.BlockTimesteps(eta=0.05, maxLevel=12)
+		start = integrator.chooseLevels(accel(pos, np.arange(2), True)[1], 4000)
+		integrator.step(pos, vel, accel, 4000)
+		self.assertGreater(integrator.levels.max(), start.max())
+
+if __name__ == "__main__":
+	unittest.main()
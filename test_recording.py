@@ -0,0 +1,76 @@
+"""
+Checks that a recorder whose writer falls behind drops whole chunks and counts them, instead of keeping every step in memory.
+Run with "python -m unittest test_recording" or pytest; nothing here imports VPython or wx.
+"""
+
+from __future__ import division #does fun stuff
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+import engine #the physics, without any graphics
+import recording #saves runs to a file and plays them back
+
+#a file whose writes wait until it is let go, like a disk that has stopped keeping up
+class StalledFile(object):
+	def __init__(self, f):
+		self.f = f
+		self.go = threading.Event()
+
+	def write(self, data):
+		self.go.wait()
+		return self.f.write(data)
+
+	def flush(self):
+		self.f.flush()
+
+	def close(self):
+		self.f.close()
+
+class RecorderQueueTest(unittest.TestCase):
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+		self.path = os.path.join(self.folder, "test.rec")
+
+	def tearDown(self):
+		shutil.rmtree(self.folder)
+
+	#fills the queue while the writer is stuck on its first chunk, then checks that everything past that was dropped and counted
+	def testStalledWriter(self):
+		sim = engine.Engine()
+		sim.craft = engine.addStartBodies(sim.bodies)
+		recorder = recording.Recorder(self.path, chunkFrames=4, maxChunks=2)
+		stalled = StalledFile(recorder.file)
+		recorder.file = stalled
+		for k in range(0, 40):
+			recorder.record(sim.bodies, k, k)
+		self.assertLessEqual(recorder.queue.qsize(), 2)
+		self.assertGreater(recorder.dropped, 0)
+		stalled.go.set()
+		recorder.close()
+
+		#the writer holds one chunk and the queue two more, and the last one is waited for on closing; the rest were dropped
+		written = len(recording.Recording(self.path))
+		self.assertEqual(recorder.recorded, 40)
+		self.assertEqual(written + recorder.dropped, recorder.recorded)
+		self.assertLessEqual(written, 3*4 + 4)
+
+	#nothing is dropped when the writer keeps up
+	def testKeepingUp(self):
+		sim = engine.Engine()
+		sim.craft = engine.addStartBodies(sim.bodies)
+		recorder = recording.Recorder(self.path, chunkFrames=4, maxChunks=2)
+		for k in range(0, 10):
+			recorder.record(sim.bodies, k, k)
+			recorder.flush()
+			while not recorder.queue.empty():
+				time.sleep(0.001)
+		recorder.close()
+		self.assertEqual(recorder.dropped, 0)
+		self.assertEqual(len(recording.Recording(self.path)), 10)
+
+if __name__ == "__main__":
+	unittest.main()
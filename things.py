@@ -5,16 +5,38 @@ Currently, it does not take rotational momentum into account (although it does a
 
 from __future__ import division #does fun stuff
 from visual import * #for the 3D graphics stuff
+import random as pyRandom #visual has a random of its own
+import numpy as np
 
 import constants as c #gives useful physics constants
 import collisions #calculates the result of a collision
+import bodies #array-backed physical state
+import trails #bounded storage for trails
+import viewCulling #works out which bodies are on screen
+
+#holds the state of things that are not given a BodySet of their own
+defaultBodies = bodies.BodySet()
+
+#picks directions for things that are at exactly the same point; seeded so that runs can be repeated
+nudges = pyRandom.Random(0)
+
+#starts the random directions over from value
+def seed(value):
+	nudges.seed(value)
 
 #exception for when craft is out of ammo
 class OutOfAmmoException(Exception):
 	pass
 
+#returns a direction that is to the left of forward
+def leftOf(forward):
+	if(norm(proj(forward, vector(0,1,0))) != vector(0,1,0)): #checks to make sure that left will actually give a left direction
+		return cross(vector(0,1,0), forward)
+	return vector(-1, 0, 0)
+
 #generic object with position, etc
-class Thing:
+#the physical state lives in one slot of a bodies.BodySet; the thing itself only keeps the shapes that draw it
+class Thing(object):
 	#defines the allowed types of collisions
 	collisionTypes = ("elastic", "inelastic")
 
@@ -29,35 +51,47 @@ class Thing:
 	collisionType is either "elastic" or "inelastic"; elastic objects bounce when they collide, and inelastic objects do not
 	name identifies the objects
 	trail specifies whether or not the object leaves a visible trail
+	bodySet is the BodySet that holds the physical state of the object; the shared defaultBodies is used if none is given
+	index is the slot of a body that is already in bodySet, for the thing to draw; the physical arguments are ignored if it is given
 	"""
-	def __init__(self, shapesArg, r=0, position=vector(0,0,0), forward=vector(0,0,1), velocity=vector(0,0,0), mass=1, collisionType="elastic", name="normal", trail=False):
+	def __init__(self, shapesArg, r=0, position=vector(0,0,0), forward=vector(0,0,1), velocity=vector(0,0,0), mass=1, collisionType="elastic", name="normal", trail=False, bodySet=None, index=None):
 		self.shapes = shapesArg
 		self.trail = curve(color=self.shapes[0].color)
 		self.trail.visible = trail
+		self.trailPoints = trails.Trail() #the curve is only redrawn from this when it is visible
 		if(position==vector(0,0,0)):
 			position=shapesArg[0].pos
-		self.position = position
-		self.forward = forward
-		self.left = vector(-1, 0, 0)
-		if(norm(proj(self.forward, vector(0,1,0))) != vector(0,1,0)): #checks to make sure that left will actually give a left direction
-			self.left = cross(vector(0,1,0), self.forward)
-		self.velocity = velocity
-		self.mass = mass
+		self.left = leftOf(forward)
 		if(r==0):
 			try:
 				r = self.shapes[0].radius
 			except Exception:
 				r = c.radiusEarth
-		self.r = r
+		if bodySet is None:
+			bodySet = defaultBodies
+		self.bodies = bodySet
+		if index is None:
+			index = bodySet.add(position, velocity, mass, r, collisionType, name, forward)
+		self.index = index
+		self.shapePos = vector(position) #where the shapes were last drawn
 		self.name = name
-		self.collisionType = collisionType
+		self.detail = viewCulling.FULL #how the thing is being drawn; see RenderSync
+
+	#the radius and collision type are stored with the rest of the physical state
+	@property
+	def r(self):
+		return float(self.bodies.radius[self.index])
+
+	@property
+	def collisionType(self):
+		return bodies.collisionNames[self.bodies.collisionType[self.index]]
 
 	#accessors
 	def getPos(self):
-		return self.position
+		return vector(*self.bodies.pos[self.index])
 
 	def getForward(self):
-		return norm(self.forward)
+		return norm(vector(*self.bodies.forward[self.index]))
 
 	def getLeft(self):
 		return norm(self.left)
@@ -66,10 +100,10 @@ class Thing:
 		return norm(cross(self.getForward(), self.getLeft()))
 
 	def getVelocity(self):
-		return self.velocity
+		return vector(*self.bodies.vel[self.index])
 
 	def getMass(self):
-		return self.mass
+		return float(self.bodies.mass[self.index]) #plain floats, so that multiplying a vector by a mass keeps it a vector
 
 	def getCollisionType(self):
 		return self.collisionType
@@ -80,32 +114,60 @@ class Thing:
 	def getName(self):
 		return self.name
 
-	#msets the position of new shapes
+	#sets the position of the thing; the shapes catch up the next time syncShapes is called
 	def setPos(self, position):
-		for shape in self.shapes:
-			relPos = shape.pos - self.getPos()
-			shape.pos = position + relPos
-
-		self.position = position
+		self.bodies.pos[self.index] = (position[0], position[1], position[2])
 
 	#sets the velocity of the thing
 	def setVelocity(self, velocity):
-		self.velocity = velocity
+		self.bodies.vel[self.index] = (velocity[0], velocity[1], velocity[2])
 
 	#sets the mass of the thing
 	def setMass(self, mass):
-		self.mass = mass
+		self.bodies.mass[self.index] = mass
 
 	#sets the collision type of the thing
 	def setCollisionType(self, t):
 		if t in Thing.collisionTypes:
-			self.collisionType = t
+			self.bodies.collisionType[self.index] = bodies.collisionCodes[t]
 		else:
 			print t, "is not a valid collision type"
 
 	#if true, makes a trail, if false, does not
 	def setTrail(self, makeTrail):
 		self.trail.visible = makeTrail
+		if makeTrail:
+			self.redrawTrail()
+
+	#copies the stored trail into the curve that draws it
+	def redrawTrail(self):
+		points, colours = self.trailPoints.toArrays()
+		self.trail.pos = points
+		self.trail.color = colours
+
+	#moves the last point of the curve to the head of the stored trail, without copying the rest of it
+	def moveTrailHead(self):
+		point, colour = self.trailPoints.head
+		drawn = len(self.trail.pos)
+		if drawn == len(self.trailPoints):
+			self.trail.pos[-1] = point
+			self.trail.color[-1] = colour
+		elif drawn == len(self.trailPoints) - 1:
+			self.trail.append(pos=point, color=colour)
+		else:
+			self.redrawTrail() #the curve is out of step with the stored trail, eg it was shown while points were being added
+
+	#shows or hides the shapes of the thing; the trail is hidden with them, but is left hidden when they are shown again
+	def setVisible(self, visible):
+		self.showShapes(visible)
+		self.detail = viewCulling.FULL
+		if not visible:
+			self.trail.visible = False
+
+	#shows or hides only the shapes, leaving the trail alone
+	def showShapes(self, visible):
+		for shape in self.shapes:
+			shape.visible = visible
 
 	#set the colour of the thing
 	def setColour(self, colour):
@@ -114,28 +176,55 @@ class Thing:
 
 	#rotates the thing by amount angle about the axis axis
 	def rotate(self, angle, axis):
-		self.forward = self.forward.rotate(angle, axis)
+		forward = vector(*self.bodies.forward[self.index]).rotate(angle, axis)
+		self.bodies.forward[self.index] = (forward.x, forward.y, forward.z)
 		self.left = self.left.rotate(angle, axis)
 		for shape in self.shapes:
-			shape.rotate(angle=angle, axis=axis, origin=self.position)
+			shape.rotate(angle=angle, axis=axis, origin=self.shapePos)
+
+	#moves the shapes to where the thing is (or to position, eg from a snapshot) and updates the trail; called once per frame
+	def syncShapes(self, position=None):
+		if position is None:
+			position = self.getPos()
+		self.moveShapes(position)
+		self.updateTrail()
+
+	#moves the shapes to position
+	def moveShapes(self, position):
+		if position != self.shapePos:
+			for shape in self.shapes:
+				relPos = shape.pos - self.shapePos
+				shape.pos = position + relPos
+			self.shapePos = position
+
+	#adds where the shapes are (or position, for things that aren't being drawn in full) to the trail; hidden trails are still recorded, but not drawn
+	"""
+	redraw is false to only record the point without updating the curve, eg for things that are off screen; RenderSync redraws the curve when they come back
+	"""
+	def updateTrail(self, position=None, redraw=True):
+		if position is None:
+			position = self.shapePos
+		if len(self.shapes) > 0:
+			kept = self.trailPoints.add(position, self.shapes[0].color)
+			if self.trail.visible and redraw:
+				#the whole curve is only copied when a point is kept, which may also have dropped the oldest one; otherwise only the head moved
+				if kept:
+					self.redrawTrail()
+				else:
+					self.moveTrailHead()
 
 	#get the separation between two things
 	def getSep(self, thing):
 		sep = thing.getPos() - self.getPos()
 		#prevent divide by zero
 		if sep == vector(0,0,0):
-			sep = norm(vector(random.random(), random.random(), random.random()))
+			sep = norm(vector(nudges.random(), nudges.random(), nudges.random()))
 		return sep
 
 	#automatically moves the object, given a net force and the amount of time it is acting over
 	def autoMove(self, netForce, changeTime):
 		acceleration = netForce/float(self.getMass())
-		velocity = acceleration*changeTime + self.getVelocity()
-		self.setVelocity(velocity)
-		position = velocity*changeTime + self.getPos()
-		self.setPos(position)
-		#update the trail
-		self.trail.append(pos=self.getPos(), color=self.shapes[0].color)
+		self.bodies.advance((acceleration.x, acceleration.y, acceleration.z), changeTime, self.index)
 
 	#true if the two objects are touching
 	def isTouching(self, thing):
@@ -153,23 +242,28 @@ class Thing:
 			self.setPos(self.getPos() - (changePos*thing.getMass())/(self.getMass() + thing.getMass()))
 			thing.setPos(thing.getPos() + (changePos*self.getMass())/(self.getMass() + thing.getMass()))
 
-	#joins two objects, including the momentum
+	#joins two objects, including the momentum; the other thing's slot is freed
 	def join(self, thing):
-		#adds the shape to the new one
-		for shape in thing.shapes:
-			self.shapes.append(shape)
-		thing.shapes = list()
 		#sets the new velocity
 		self.setVelocity(collisions.inelasticCollision(self, thing))
 		#sets the new mass
 		self.setMass(self.getMass() + thing.getMass())
+		self.absorb(thing)
+		thing.bodies.remove(thing.index)
+
+	#adds the shapes of a thing that has been joined to this one
+	def absorb(self, thing):
+		for shape in thing.shapes:
+			shape.visible = self.detail == viewCulling.FULL
+			self.shapes.append(shape)
+		thing.shapes = list()
 
 	#returns the gravitational force another object nearby can exert on it
 	def gravForce(self, thing):
 		sep = thing.getPos() - self.getPos()
 		#prevent divide by zero
 		if sep == vector(0,0,0):
-			randChange = norm(vector(random.random(), random.random(), random.random()))
+			randChange = norm(vector(nudges.random(), nudges.random(), nudges.random()))
 			thing.setPos(thing.getPos() + randChange)
 			return self.gravForce(thing)
 
@@ -177,12 +271,239 @@ class Thing:
 		return force
 
 	#kind of a makeshift deconstructor
-	def clear(self):
+	"""
+	removed is true if the body has already been taken out of the simulation, eg by the engine when it stuck to something; its slot may have been reused since, so it is left alone
+	"""
+	def clear(self, removed=False):
 		for shape in self.shapes:
 			shape.visible = False
 			del shape
 		self.trail.visible = false
 		del self.trail
+		if not removed:
+			self.bodies.remove(self.index)
+
+	#moves the thing back to position when the simulation is reset, and drops any shapes it picked up by absorbing other things
+	def restore(self, position):
+		for shape in self.shapes[1:]:
+			shape.visible = False
+		self.shapes = self.shapes[:1]
+		self.moveShapes(vector(position))
+		self.trailPoints.clear()
+		self.redrawTrail()
+
+	#puts a thing that was taken out of the simulation (see ProjectilePool.release) back in, reusing its shapes and trail
+	"""
+	the arguments are the same as for the constructor; the thing gets a new slot in its BodySet, which is usually the one it gave up
+	"""
+	def respawn(self, position, forward, velocity, mass, r, collisionType="elastic"):
+		self.attach(self.bodies.add(position, velocity, mass, r, collisionType, self.name, forward))
+
+	#puts a thing that was taken out of the simulation back in to draw the body that is already in slot index, eg a projectile fired by the engine
+	def attach(self, index):
+		self.index = index
+		forward = vector(*self.bodies.forward[index])
+		position = vector(*self.bodies.pos[index])
+		self.left = leftOf(forward)
+		self.moveShapes(position)
+		self.trailPoints.clear()
+		self.redrawTrail()
+		self.setVisible(True)
+
+
+#keeps projectiles that have been cleared so that their shapes, trails and slots are reused instead of being made again for every shot
+class ProjectilePool(object):
+	#constructor
+	"""
+	bodySet is the BodySet that the projectiles are simulated in
+	maxFree is the most cleared projectiles kept for reuse; any more are cleared for good
+	"""
+	def __init__(self, bodySet=None, maxFree=1000):
+		if bodySet is None:
+			bodySet = defaultBodies
+		self.bodies = bodySet
+		self.maxFree = maxFree
+		self.free = list()
+		self.made = 0 #number of projectiles that have had shapes made for them
+
+	#returns a projectile, reusing a cleared one if there is one
+	def acquire(self, position, forward, velocity, mass, radius, colour, collisionType="elastic"):
+		if self.free:
+			projectile = self.free.pop()
+			projectile.shapes[0].radius = radius
+			projectile.setColour(colour)
+			projectile.respawn(position, forward, velocity, mass, radius, collisionType)
+			return projectile
+		self.made += 1
+		shapes = [sphere(pos=position, radius=radius, material=materials.emissive, color=colour)]
+		return Thing(shapes, r=radius, position=position, forward=forward, velocity=velocity, mass=mass, collisionType=collisionType, name="projectile", bodySet=self.bodies)
+
+	#returns a projectile that draws the body in slot index, eg one fired by engine.Engine.fire; reuses a cleared projectile if there is one
+	def adopt(self, index, colour):
+		radius = float(self.bodies.radius[index])
+		if self.free:
+			projectile = self.free.pop()
+			projectile.shapes[0].radius = radius
+			projectile.setColour(colour)
+			projectile.attach(index)
+			return projectile
+		self.made += 1
+		shapes = [sphere(pos=vector(*self.bodies.pos[index]), radius=radius, material=materials.emissive, color=colour)]
+		return Thing(shapes, forward=vector(*self.bodies.forward[index]), name="projectile", bodySet=self.bodies, index=index)
+
+	#takes a projectile out of the simulation and keeps it to be reused
+	"""
+	removed is true if the engine has already taken its body out of the simulation, as for Thing.clear
+	"""
+	def release(self, projectile, removed=False):
+		if len(self.free) >= self.maxFree or len(projectile.shapes) != 1:
+			projectile.clear(removed) #too many kept, or it has picked up the shapes of something it stuck to
+			return
+		projectile.setVisible(False)
+		if not removed:
+			projectile.bodies.remove(projectile.index)
+		self.free.append(projectile)
+
+
+#keeps the shapes of things in step with the physics, but only moves the shapes of things that are on screen
+#things that are too far away to be more than a pixel or two across are drawn as points instead, all in one points object
+class RenderSync(object):
+	#constructor
+	"""
+	minPixels is the smallest size, in pixels, that a thing is drawn in full at
+	pointSize is the size of the points that far away things are drawn as, in pixels
+	"""
+	def __init__(self, minPixels=2, pointSize=2):
+		self.minPixels = minPixels
+		self.cloud = points(pos=[], size=pointSize)
+		self.pointThings = list() #things drawn as points, in the order of the points
+		self.things = list() #things of the last sync, and how each of them was drawn
+		self.state = np.zeros(0, dtype=int)
+		self.counts = [0, 0, 0] #number of things drawn in full, as points, and not at all by the last sync
+
+	#moves the shapes of things to positions, from an (N, 3) array indexed by slot, as seen from the camera of scene
+	"""
+	radius is the array of radii, indexed by slot, that decides how big each thing looks
+	always are things that are always drawn in full, eg the craft that the camera follows
+	"""
+	def sync(self, things, positions, radius, scene, always=()):
+		if len(things) == 0:
+			if self.pointThings:
+				self.cloud.pos = np.zeros((0, 3)) #nothing is left to draw as a point
+			self.pointThings = list()
+			self.things = list()
+			self.state = np.zeros(0, dtype=int)
+			self.counts = [0, 0, 0]
+			return
+		slots = np.array([o.index for o in things])
+		pos = positions[slots]
+		viewRange = scene.range
+		state = viewCulling.classify(pos, radius[slots], scene.center, scene.forward, viewRange[0], scene.fov, scene.width, self.minPixels)
+		for o in always:
+			if o in things:
+				state[things.index(o)] = viewCulling.FULL
+
+		#shapes are only shown or hidden when a thing changes how it is drawn, so only those things are looked at; every thing is looked at if the list of things changed
+		if things == self.things:
+			changed = np.flatnonzero(state != self.state)
+		else:
+			changed = np.arange(len(things))
+		self.things = list(things)
+		self.state = state
+		for k in changed:
+			o = things[k]
+			if o.detail == viewCulling.CULLED and state[k] != viewCulling.CULLED and o.trail.visible:
+				o.redrawTrail() #the curve isn't kept up to date while culled; see Thing.updateTrail
+			if state[k] == viewCulling.FULL and o.detail != viewCulling.FULL:
+				o.showShapes(True)
+			elif state[k] != viewCulling.FULL and o.detail == viewCulling.FULL:
+				o.showShapes(False)
+			o.detail = state[k]
+		#only things drawn in full are moved
+		for k in np.flatnonzero(state == viewCulling.FULL):
+			things[k].moveShapes(vector(*pos[k]))
+
+		#the far away things are drawn as one cloud of points
+		far = np.flatnonzero(state == viewCulling.POINT)
+		pointThings = [things[k] for k in far]
+		if pointThings != self.pointThings:
+			self.pointThings = pointThings
+			self.cloud.pos = pos[far]
+			self.cloud.color = [o.shapes[0].color if o.shapes else (1, 1, 1) for o in pointThings]
+		elif len(far):
+			self.cloud.pos = pos[far]
+		self.counts = [int(np.sum(state == s)) for s in (viewCulling.FULL, viewCulling.POINT, viewCulling.CULLED)]
+
+
+#draws the bodies of a scenario.Scenario, only making the shapes for a body once it has been near the camera
+#bodies that are not marked as lazy in the scenario are drawn straight away
+class LazyBodies(object):
+	#constructor
+	"""
+	scenario is the scenario.Scenario that the bodies came from
+	bodySet is the BodySet that they are simulated in
+	"""
+	def __init__(self, scenario, bodySet):
+		self.scenario = scenario
+		self.bodies = bodySet
+		self.slots = np.zeros(0, dtype=int) #slot of each body of the scenario
+		self.things = dict() #index in the scenario: thing, for the bodies that have shapes
+		self.gone = np.zeros(0, dtype=bool) #true for the bodies of the scenario that have stuck to something or broken up since the last reset, whether or not they were drawn
+
+	#makes the thing that draws body k of the scenario
+	def makeThing(self, k):
+		s = self.scenario
+		slot = self.slots[k]
+		position = vector(*self.bodies.pos[slot])
+		options = dict(pos=position, radius=s.radius[k])
+		if s.materials[k] is not None:
+			options["material"] = getattr(materials, s.materials[k])
+		if s.colours[k] is not None:
+			options["color"] = tuple(s.colours[k])
+		thing = Thing([sphere(**options)], position=position, name=s.names[k], bodySet=self.bodies, index=slot)
+		self.things[k] = thing
+		return thing
+
+	#puts the bodies of the scenario into the BodySet, all at once, and returns the things that draw them straight away
+	"""
+	things that already exist from before a reset are moved back to where they start, instead of being made again
+	"""
+	def reset(self):
+		self.slots = self.scenario.populate(self.bodies)
+		self.gone = np.zeros(len(self.slots), dtype=bool)
+		things = list()
+		for k, thing in self.things.items():
+			thing.index = self.slots[k]
+			thing.restore(vector(*self.scenario.pos[k]))
+			thing.shapes[0].radius = self.scenario.radius[k] #it may have been chipped smaller
+			things.append(thing)
+		for k in np.flatnonzero(~self.scenario.lazy):
+			if k not in self.things:
+				things.append(self.makeThing(k))
+		return things
+
+	#stops drawing the body in slot, eg because it stuck to something else, and stops it from being drawn later if it hasn't been yet
+	"""
+	call it for every slot that is freed, since the slot of a body that was never drawn can be reused by a projectile
+	"""
+	def forget(self, slot):
+		for k in np.flatnonzero(self.slots == slot):
+			self.gone[k] = True
+			self.things.pop(k, None)
+
+	#makes the things for up to limit lazy bodies that are within reach of centre, closest first, and returns them
+	def update(self, centre, reach, limit=200):
+		waiting = np.flatnonzero(self.scenario.lazy)
+		if len(self.things):
+			waiting = waiting[~np.isin(waiting, list(self.things))]
+		waiting = waiting[~self.gone[waiting]] #their slots may have been reused, so alive can't be trusted
+		if len(waiting) == 0:
+			return list()
+		sep = self.bodies.pos[self.slots[waiting]] - (centre[0], centre[1], centre[2])
+		dist2 = np.einsum('ij,ij->i', sep, sep)
+		near = np.flatnonzero(dist2 < reach**2)
+		near = near[np.argsort(dist2[near])][:limit]
+		return [self.makeThing(k) for k in waiting[near]]
 
 
 #a type of thing that looks like a spaceship ...kinda
@@ -198,21 +519,23 @@ class Craft(Thing):
 	fuel is the initial mass of the fuel
 	ammo is the initial number of projectiles
 	exhaustSpeed is the exhaust speed of the craft
+	bodySet is the BodySet that holds the physical state of the craft
 	"""
-	def __init__(self, r=0, position=vector(0,0,0), forward=vector(0,0,1), velocity=vector(0,0,0), mass=1, length=.5*c.radiusEarth, fuel=10000, ammo=10, exhaustSpeed=60000, name="craft"):
+	def __init__(self, r=0, position=vector(0,0,0), forward=vector(0,0,1), velocity=vector(0,0,0), mass=1, length=.5*c.radiusEarth, fuel=10000, ammo=10, exhaustSpeed=60000, name="craft", bodySet=None):
 		if(r==0):
 			r = length
 		shapes = list()
 		shapes.append(arrow(pos=position, axis=length*norm(forward), shaftwidth=.1*length, material=materials.marble, color=color.green))
 		shapes.append(cone(pos=position, axis=-.5*shapes[0].axis, radius=.75*shapes[0].shaftwidth, color=color.red, opacity=0))
-		Thing.__init__(self, shapes, r=r, position=position, forward=forward, velocity=velocity, mass=mass, collisionType="elastic", name=name)
-		self.fuel = fuel
+		#the mass stored in the body set includes the fuel
+		Thing.__init__(self, shapes, r=r, position=position, forward=forward, velocity=velocity, mass=mass + fuel, collisionType="elastic", name=name, bodySet=bodySet)
+		self.bodies.fuel[self.index] = fuel
 		self.ammo = ammo
 		self.exhaustSpeed = exhaustSpeed
 
 	#accessors
 	def getFuel(self):
-		return self.fuel
+		return float(self.bodies.fuel[self.index])
 
 	def getAmmo(self):
 		return self.ammo
@@ -220,16 +543,18 @@ class Craft(Thing):
 	def getExhaustSpeed(self):
 		return self.exhaustSpeed
 
-	def getMass(self):
-		return self.mass + self.fuel #has fuel and normal mass
-
 	def getLength(self):
 		return mag(shapes[0].axis)
 
 	#basic mutators
 	def setFuel(self, newFuel):
 		if(newFuel >= 0):
-			self.fuel = newFuel
+			self.bodies.mass[self.index] += newFuel - self.getFuel() #has fuel and normal mass
+			self.bodies.fuel[self.index] = newFuel
+
+	#sets the mass of the craft when empty
+	def setMass(self, mass):
+		Thing.setMass(self, mass + self.getFuel())
 
 	def setAmmo(self, newAmmo):
 		if newAmmo >= 0:
@@ -250,19 +575,23 @@ class Craft(Thing):
 	def turnUp(self, angle):
 		self.rotate(-angle, self.getLeft())
 
-	#creates a new object that will be fired away from the rocket
-	def fireAmmo(self, colour, radius, mass, speed, collisionType, trail):
+	#creates a new object that will be fired away from the rocket; if a ProjectilePool is given, a cleared projectile is reused if there is one
+	def fireAmmo(self, colour, radius, mass, speed, collisionType, trail, pool=None):
 		if self.getAmmo() == 0:
 			raise OutOfAmmoException('Out Of Ammunition')
 		else:
 			self.ammo -= 1
 
 		#create the projectile
-		temp = list()							#start position is further away
-		temp.append(sphere(pos=self.getPos() + ((2*radius + 2*self.r)*self.getForward()), radius=radius, material=materials.emissive, color=colour, trail=trail))
+		position = self.getPos() + ((2*radius + 2*self.r)*self.getForward()) #start position is further away
 		absoluteVelocity = (speed*self.getForward()) + self.getVelocity()
-		projectile = Thing(temp, r=radius, forward=self.getForward(), velocity=absoluteVelocity, mass=mass, name="projectile")
-		projectile.setCollisionType(collisionType)
+		if pool is not None:
+			projectile = pool.acquire(position, self.getForward(), absoluteVelocity, mass, radius, colour, collisionType)
+		else:
+			temp = list()
+			temp.append(sphere(pos=position, radius=radius, material=materials.emissive, color=colour, trail=trail))
+			projectile = Thing(temp, r=radius, forward=self.getForward(), velocity=absoluteVelocity, mass=mass, name="projectile", bodySet=self.bodies)
+			projectile.setCollisionType(collisionType)
 
 		#calculates the effect of the projectile
 		momentum = self.getVelocity()*self.getMass()
@@ -274,14 +603,20 @@ class Craft(Thing):
 
 	#returns the force that the rocket exerts
 	def rocketForce(self, burnRate, time):
-		#animate tail
+		self.animateTail(burnRate)
+		return self.thrustForce(burnRate, time)
+
+	#changes the length of the tail to reflect the burn rate
+	def animateTail(self, burnRate):
 		if(burnRate > 0):
 			self.shapes[1].opacity = .6
-			self.shapes[1].axis = -self.shapes[0].axis*burnRate #changes the length of the tail to reflect the burn rate
+			self.shapes[1].axis = -self.shapes[0].axis*burnRate
 		else:
 			#makes the tail invisible
 			self.shapes[1].opacity = 0
 
+	#burns fuel and returns the force that the rocket exerts, without touching the shapes so that it is safe to call from the physics thread
+	def thrustForce(self, burnRate, time):
 		#calculate amount of fuel used
 		burnt = burnRate*time
 		if burnt > self.getFuel():
@@ -308,7 +643,7 @@ class Craft(Thing):
 	#sets the camera angle to look the same direction as the craft
 	def setCameraAngle(self, scene, hOffset, vOffset, cameraZoom):
 		scene.forward = self.cameraVector(hOffset, vOffset)
-		scene.center = self.getPos()
+		scene.center = self.shapePos #where the craft is drawn, which may lag behind the physics
 		scene.up = self.getUp()
 		scene.range = cameraZoom
 
@@ -0,0 +1,92 @@
+"""
+This stores the trail left behind by a body in a fixed-size ring buffer, so that trails take the same amount of memory no matter how long the simulation runs.
+Points are decimated as they come in: a point is only kept if the path has turned by more than maxTurn since the last kept point, if it is more than maxGap away from it, or if the colour changed.
+Otherwise it only moves the "head" of the trail, which always follows the body. Straight stretches take two points, and an orbit takes about 2*pi/maxTurn points however small the time step is.
+"""
+
+from __future__ import division #does fun stuff
+import math
+import numpy as np
+
+defaultCapacity = 2000 #most points kept per trail; the oldest are overwritten first
+
+#the trail of one body
+class Trail(object):
+	#constructor
+	"""
+	capacity is the largest number of points kept
+	maxTurn is the angle, in radians, that the path must turn through before a new point is kept
+	maxGap is the longest distance allowed between kept points, in m
+	minGap is the shortest distance allowed between kept points, in m
+	"""
+	def __init__(self, capacity=defaultCapacity, maxTurn=0.02, maxGap=float("inf"), minGap=0):
+		self.capacity = capacity
+		self.maxTurn = maxTurn
+		self.cosMaxTurn = math.cos(maxTurn)
+		self.maxGap = maxGap
+		self.minGap = minGap
+		self.points = np.zeros((capacity, 3))
+		self.colours = np.zeros((capacity, 3))
+		self.start = 0 #index of the oldest point
+		self.size = 0 #number of points kept
+		self.head = None #(point, colour) of the newest, not yet kept, position
+
+	#returns the ith kept point, counting from the oldest; negative i counts back from the newest
+	def point(self, i):
+		if i < 0:
+			i += self.size
+		return self.points[(self.start + i) % self.capacity]
+
+	#keeps a point, overwriting the oldest one if the buffer is full
+	def keep(self, point, colour):
+		end = (self.start + self.size) % self.capacity
+		self.points[end] = point
+		self.colours[end] = colour
+		if self.size < self.capacity:
+			self.size += 1
+		else:
+			self.start = (self.start + 1) % self.capacity
+
+	#adds the newest position of the body; returns True if it was kept rather than just moving the head
+	def add(self, point, colour=(1, 1, 1)):
+		point = np.array((point[0], point[1], point[2]), dtype=float)
+		colour = np.array((colour[0], colour[1], colour[2]), dtype=float)
+		if self.size < 2:
+			self.keep(point, colour)
+			self.head = None
+			return True
+
+		last = self.point(-1)
+		d1 = last - self.point(-2)
+		d2 = point - last
+		n1 = math.sqrt(np.dot(d1, d1))
+		n2 = math.sqrt(np.dot(d2, d2))
+		keep = n2 > self.maxGap or np.any(colour != self.colours[(self.start + self.size - 1) % self.capacity]) #colour changes must stay visible
+		if not keep and n1 > 0 and n2 > 0:
+			keep = np.dot(d1, d2)/(n1*n2) < self.cosMaxTurn #the path has turned too far
+		if keep and n2 >= self.minGap:
+			self.keep(point, colour)
+			self.head = None
+			return True
+		self.head = (point, colour)
+		return False
+
+	#returns the kept points from oldest to newest, followed by the head, and their colours
+	def toArrays(self):
+		order = (self.start + np.arange(self.size)) % self.capacity
+		points = self.points[order]
+		colours = self.colours[order]
+		if self.head is not None:
+			points = np.vstack((points, self.head[0]))
+			colours = np.vstack((colours, self.head[1]))
+		return points, colours
+
+	#forgets every point
+	def clear(self):
+		self.start = 0
+		self.size = 0
+		self.head = None
+
+	#number of points in the trail, including the head
+	def __len__(self):
+		return self.size + (self.head is not None)
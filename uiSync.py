@@ -0,0 +1,93 @@
+"""
+This keeps the controls and the stats text in sync with the simulation without polling every widget every frame.
+Controls remembers the value of each slider and radio box. It updates them from the widget's own events, and calls listeners only when a value actually changes.
+StatsPanel rebuilds the stats strings at a lower rate than the frame rate, and only calls SetLabel on the lines whose text changed.
+Nothing here imports wx; the event types are passed in by whoever binds the widgets.
+"""
+
+from __future__ import division #does fun stuff
+import time
+
+#a widget and the value it had the last time it changed
+class Control(object):
+	def __init__(self, widget, getter, setter):
+		self.widget = widget
+		self.getter = getter
+		self.setter = setter
+		self.value = getter()
+		self.listeners = list()
+
+#the current values of a set of widgets
+class Controls(object):
+	def __init__(self):
+		self.controls = dict()
+
+	#starts tracking a widget under a name
+	"""
+	widget is the wx widget
+	eventType is the wx event that the widget sends when the user changes it, eg wx.EVT_SLIDER or wx.EVT_RADIOBOX
+	getter and setter read and write the value; they default to GetValue and SetValue
+	"""
+	def watch(self, name, widget, eventType, getter=None, setter=None):
+		if getter is None:
+			getter = widget.GetValue
+		if setter is None:
+			setter = widget.SetValue
+		self.controls[name] = Control(widget, getter, setter)
+		def handler(evt):
+			self.refresh(name)
+			evt.Skip()
+		widget.Bind(eventType, handler)
+
+	#calls listener with the new value whenever the named control changes; if now is true, it is also called with the current value straight away
+	def listen(self, name, listener, now=True):
+		self.controls[name].listeners.append(listener)
+		if now:
+			listener(self.controls[name].value)
+
+	#returns the value of the named control
+	def get(self, name):
+		return self.controls[name].value
+
+	#rereads the named control from its widget and tells the listeners if it changed
+	def refresh(self, name):
+		control = self.controls[name]
+		value = control.getter()
+		if value != control.value:
+			control.value = value
+			for listener in control.listeners:
+				listener(value)
+
+	#changes the named control from code; wx does not send events for changes made with SetValue, so this refreshes it by hand
+	def set(self, name, value):
+		control = self.controls[name]
+		if value != control.value:
+			control.setter(value)
+			self.refresh(name)
+
+#the lines of stats text
+class StatsPanel(object):
+	#constructor
+	"""
+	labels are the wx.StaticTexts to write the stats into, one line each
+	updateRate is the number of times per second that the stats are rebuilt
+	"""
+	def __init__(self, labels, updateRate=4):
+		self.labels = labels
+		self.updateRate = updateRate
+		self.shown = [None]*len(labels)
+		self.lastUpdate = 0
+
+	#rebuilds the stats if it is time to; makeStrings is only called if it is
+	def update(self, makeStrings, now=None):
+		if now is None:
+			now = time.time()
+		if now - self.lastUpdate < 1/self.updateRate:
+			return False
+		self.lastUpdate = now
+		strings = makeStrings()
+		for i in range(0, len(self.labels)):
+			if strings[i] != self.shown[i]:
+				self.labels[i].SetLabel(strings[i])
+				self.shown[i] = strings[i]
+		return True
@@ -0,0 +1,49 @@
+"""
+This works out which bodies the camera can see, and which of those are so far away that they would only cover a pixel or two, so that the display only has to move the shapes that are actually on screen.
+The view is treated as a cone around the direction the camera faces, wide enough to take in the corners of a square window; a body is in view if any part of its sphere is inside of the cone.
+Bodies in view are drawn in FULL if they would be at least minPixels across, and as a POINT otherwise; bodies out of view are CULLED.
+Nothing here imports VPython; the camera is described by the same numbers as a VPython display (center, forward, range and fov).
+"""
+
+from __future__ import division #does fun stuff
+import math
+import numpy as np
+
+FULL, POINT, CULLED = 0, 1, 2 #how a body is drawn
+
+#returns where the camera is, given what it is looking at
+"""
+centre is the point the camera looks at, forward the direction it faces, and viewRange the distance from the centre to the edge of the view at the centre
+fov is the field of view, in radians
+"""
+def eyePosition(centre, forward, viewRange, fov):
+	forward = np.asarray(forward, dtype=float)
+	forward = forward/math.sqrt(np.dot(forward, forward))
+	return np.asarray(centre, dtype=float) - forward*viewRange/math.tan(fov/2)
+
+#returns FULL, POINT or CULLED for every body
+"""
+pos is an (N, 3) array of positions and radius an array of the N radii that the bodies are drawn with
+pixels is the width of the view in pixels
+minPixels is the smallest size, in pixels, that a body is drawn in full at
+margin widens the view, so that bodies just outside of it already have their shapes in place when the camera turns
+"""
+def classify(pos, radius, centre, forward, viewRange, fov, pixels, minPixels=2, margin=1.1):
+	pos = np.asarray(pos, dtype=float)
+	radius = np.asarray(radius, dtype=float)
+	forward = np.asarray(forward, dtype=float)
+	forward = forward/math.sqrt(np.dot(forward, forward))
+	rel = pos - eyePosition(centre, forward, viewRange, fov)
+	depth = np.dot(rel, forward)
+	lateral = np.sqrt(np.maximum(np.einsum('ij,ij->i', rel, rel) - depth**2, 0))
+
+	#a sphere is inside of a cone if its centre is within r/cos(halfAngle) of the cone's surface
+	tanHalf = margin*math.sqrt(2)*math.tan(fov/2)
+	cosHalf = 1/math.sqrt(1 + tanHalf**2)
+	inView = lateral <= depth*tanHalf + radius/cosHalf
+
+	state = np.full(len(pos), CULLED, dtype=np.int8)
+	with np.errstate(divide='ignore', invalid='ignore'):
+		size = 2*radius/depth*(pixels/2)/math.tan(fov/2) #width on screen, in pixels
+	state[inView] = np.where((depth[inView] > radius[inView]) & (size[inView] < minPixels), POINT, FULL)
+	return state